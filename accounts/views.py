@@ -8,6 +8,9 @@ from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from dryclean_project.conditional import ConditionalRetrieveMixin
+from dryclean_project.stats import StatsQuery
+from orders.customer_stats import get_customer_stats
 from .models import UserProfile
 from .serializers import (
     UserSerializer, UserProfileSerializer, RegisterSerializer,
@@ -50,12 +53,17 @@ class LogoutView(generics.GenericAPIView):
             return Response({'error': 'Error logging out.'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(ConditionalRetrieveMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Saving the user re-saves the profile, so this covers the nested user too
+    version_timestamps = ['updated_at']
     
     def get_object(self):
         return self.request.user.userprofile
+    
+    def get_validator_queryset(self):
+        return UserProfile.objects.filter(user=self.request.user)
 
 
 class UserDetailView(generics.RetrieveUpdateAPIView):
@@ -152,6 +160,12 @@ def user_dashboard(request):
     # Get user's notifications
     recent_notifications = user.notifications.filter(is_read=False).order_by('-created_at')[:5]
     
+    # Order counters from the customer's stats row, unread notifications in one query
+    order_stats = get_customer_stats(user)
+    notification_stats = (StatsQuery()
+                          .count('unread_notifications', is_read=False)
+                          .evaluate(user.notifications.all()))
+    
     dashboard_data = {
         'user': {
             'id': user.id,
@@ -169,10 +183,10 @@ def user_dashboard(request):
             'pincode': profile.pincode,
         },
         'stats': {
-            'total_orders': user.orders.count(),
-            'pending_orders': user.orders.filter(status='pending').count(),
-            'completed_orders': user.orders.filter(status='delivered').count(),
-            'unread_notifications': user.notifications.filter(is_read=False).count(),
+            'total_orders': order_stats['total_orders'],
+            'pending_orders': order_stats['status_counts']['pending'],
+            'completed_orders': order_stats['status_counts']['delivered'],
+            'unread_notifications': notification_stats['unread_notifications'],
         },
         'recent_orders': [
             {
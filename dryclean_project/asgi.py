@@ -3,6 +3,10 @@ ASGI config for dryclean_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live order status streams (``/api/orders/events/`` and
+``/api/orders/<id>/events/``) are async views and are only served through this
+application, e.g. ``uvicorn dryclean_project.asgi:application``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
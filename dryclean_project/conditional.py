@@ -0,0 +1,84 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalRetrieveMixin:
+    """
+    ETag and Last-Modified validators for a retrieve view, computed without
+    serializing the object.
+
+    The view lists the timestamps its representation depends on
+    (``version_timestamps``) and the related rows whose number changes it
+    (``version_counts``). Both are read for the requested object in one
+    aggregate query; the ETag is a hash of the results and the query string,
+    and Last-Modified is the latest timestamp once its second has passed
+    (HTTP dates have no fractions, so a change later in the same second
+    would otherwise keep the same Last-Modified). A request whose
+    ``If-None-Match`` / ``If-Modified-Since`` still matches is answered with
+    304 Not Modified before the object is loaded.
+
+        class ServiceDetailView(ConditionalRetrieveMixin, generics.RetrieveAPIView):
+            version_timestamps = ['updated_at', 'variants__updated_at']
+            version_counts = ['variants']
+
+    Writes that bypass ``auto_now`` (``queryset.update()``) must set
+    ``updated_at`` themselves for the validators to change.
+    """
+    version_timestamps = ('updated_at',)
+    version_counts = ()
+
+    def get_validator_queryset(self):
+        """The requested object as a one-row queryset, with the view's filtering"""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+
+    def get_validators(self):
+        """Return ``(etag, last_modified)``, or None when the object does not exist"""
+        expressions = {
+            f'_ts_{index}': Max(lookup) for index, lookup in enumerate(self.version_timestamps)
+        }
+        expressions.update({
+            f'_count_{index}': Count(lookup, distinct=True) for index, lookup in enumerate(self.version_counts)
+        })
+        queryset = self.get_validator_queryset().prefetch_related(None).order_by()
+        row = queryset.values('pk').annotate(**expressions).first()
+        if row is None:
+            return None
+
+        timestamps = [row[f'_ts_{index}'] for index in range(len(self.version_timestamps))]
+        present = [value for value in timestamps if value is not None]
+        last_modified = None
+        if present and max(present) < timezone.now().replace(microsecond=0):
+            last_modified = int(max(present).timestamp())
+
+        digest = hashlib.md5(usedforsecurity=False)
+        digest.update(type(self).__name__.encode())
+        digest.update(self.request.META.get('QUERY_STRING', '').encode())
+        for key in sorted(row):
+            value = row[key]
+            digest.update(f'|{key}={value.isoformat() if hasattr(value, "isoformat") else value}'.encode())
+        return quote_etag(digest.hexdigest()), last_modified
+
+    def retrieve(self, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag, last_modified = validators
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is None:
+            response = super().retrieve(request, *args, **kwargs)
+        else:
+            response = not_modified
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        # Clients may keep the body but must revalidate before reusing it
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,114 @@
+from rest_framework import serializers
+
+
+def _param_set(request, name):
+    """Comma separated query param as a set, or None when it is absent"""
+    value = request.query_params.get(name) if request is not None else None
+    if value is None:
+        return None
+    return {part.strip() for part in value.split(',') if part.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    ``?fields=`` and ``?expand=`` for a model serializer.
+
+    ``?fields=id,status,items`` renders only the listed top-level fields.
+    ``?expand=items`` renders only the listed nested relations; the other
+    ``expandable_fields`` fall back to their primary key (forward foreign keys,
+    read from the ``_id`` column) or are left out (reverse relations). Without
+    either param the full representation is rendered as before.
+
+    ``related_lookups`` maps a field to the ``select_related`` /
+    ``prefetch_related`` lookups it needs, so ``shape_queryset`` only joins and
+    prefetches what will actually be rendered:
+
+        class PaymentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+            expandable_fields = {'transactions': False}
+            related_lookups = {
+                'order_number': (['order'], []),
+                'transactions': ([], ['transactions']),
+            }
+
+    Only the top-level serializer of a request is pruned; nested use and
+    serializers built without a request render in full.
+    """
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+    # Nested field name -> True when it collapses to the primary key, False to drop it
+    expandable_fields = {}
+    # Field name -> (select_related lookups, prefetch_related lookups)
+    related_lookups = {}
+
+    @classmethod
+    def rendered_field_names(cls, request):
+        """Top-level fields rendered for ``request``, and those shown expanded"""
+        names = list(cls.Meta.fields)
+        requested = _param_set(request, cls.fields_query_param)
+        if requested is not None:
+            names = [name for name in names if name in requested]
+        expand = _param_set(request, cls.expand_query_param)
+        if expand is None:
+            return names, set(names)
+        names = [
+            name for name in names
+            if name not in cls.expandable_fields or name in expand or cls.expandable_fields[name]
+        ]
+        return names, {name for name in names if name not in cls.expandable_fields or name in expand}
+
+    @classmethod
+    def shape_queryset(cls, queryset, request=None, fields=None):
+        """
+        Add the joins and prefetches the rendered fields need to ``queryset``.
+
+        The fields come from ``request``, or from ``fields`` when code other
+        than a view reads a known subset of them.
+        """
+        if fields is None:
+            _, expanded = cls.rendered_field_names(request)
+        else:
+            expanded = set(fields)
+        select, prefetch = [], []
+        for name in cls.Meta.fields:
+            if name not in expanded or name not in cls.related_lookups:
+                continue
+            select_lookups, prefetch_lookups = cls.related_lookups[name]
+            select.extend(lookup for lookup in select_lookups if lookup not in select)
+            prefetch.extend(lookup for lookup in prefetch_lookups if lookup not in prefetch)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or not self._is_root():
+            return fields
+        if self.fields_query_param not in request.query_params and self.expand_query_param not in request.query_params:
+            return fields
+
+        names, expanded = self.rendered_field_names(request)
+        pruned = {}
+        for name in names:
+            if name not in fields:
+                continue
+            if name in expanded:
+                pruned[name] = fields[name]
+            else:
+                pruned[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+        return pruned
+
+
+def shape_queryset(queryset, serializer_class, request):
+    """``serializer_class.shape_queryset`` for serializers that support sparse fieldsets"""
+    if issubclass(serializer_class, SparseFieldsetMixin):
+        return serializer_class.shape_queryset(queryset, request)
+    return queryset
@@ -0,0 +1,77 @@
+"""
+SQLite FTS5 helpers shared by the order and service search.
+
+Each app keeps its own tables and backends; this module holds what they have
+in common: splitting a query into words the way the FTS5 tokenizer does,
+turning them into a prefix ``MATCH`` expression, running raw statements, and
+picking the backend named by a setting once per process.
+"""
+import re
+import threading
+
+from django.conf import settings
+from django.db import connection
+
+
+_WORD_RE = re.compile(r'[^\W_]+')
+
+
+def query_words(query):
+    """The words of ``query`` as the FTS5 tokenizer splits them"""
+    return _WORD_RE.findall((query or '').lower())
+
+
+def match_expression(query):
+    """Every word as a quoted prefix term, or None when there are no words"""
+    words = query_words(query)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def placeholders(values):
+    """``%s, %s, ...`` for an ``IN (...)`` over ``values``"""
+    return ', '.join(['%s'] * len(values))
+
+
+class FTS5Backend:
+    """Base for backends that keep SQLite FTS5 tables"""
+
+    def _execute(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def _optimize(self, *tables):
+        # Merge the index segments left behind by a rebuild
+        for table in tables:
+            self._execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+
+    def match_expression(self, query):
+        return match_expression(query)
+
+
+def backend_getter(setting, backends, default='fts5'):
+    """
+    A ``get_search_backend()`` for ``setting``.
+
+    ``backends`` maps the setting's values to backend classes. The backend is
+    created on first use and shared by every thread of the process; ``fts5``
+    needs an SQLite database.
+    """
+    backend = None
+    lock = threading.Lock()
+
+    def get_search_backend():
+        nonlocal backend
+        if backend is None:
+            with lock:
+                if backend is None:
+                    name = getattr(settings, setting, default)
+                    if name not in backends:
+                        raise ValueError(f"Unknown {setting} '{name}'")
+                    if name == 'fts5' and connection.vendor != 'sqlite':
+                        raise ValueError(f"{setting} 'fts5' needs an SQLite database")
+                    backend = backends[name]()
+        return backend
+
+    return get_search_backend
@@ -11,8 +11,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -94,6 +95,10 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Tests run on a file in the temp directory rather than SQLite's shared
+        # in-memory database, so the order number tests can write from other
+        # threads and forked processes
+        "TEST": {"NAME": Path(tempfile.gettempdir()) / "dryclean_project_test.sqlite3"},
     }
 }
 
@@ -185,6 +190,16 @@ TWILIO_PHONE_NUMBER = config('TWILIO_PHONE_NUMBER', default='')
 # Redis Configuration
 REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 
+# Cache Configuration
+# Use django.core.cache.backends.redis.RedisCache with CACHE_LOCATION=REDIS_URL when
+# running more than one worker so cache invalidations reach every process
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='dryclean'),
+    }
+}
+
 # Celery Configuration
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
@@ -196,6 +211,33 @@ CELERY_TIMEZONE = TIME_ZONE
 # Frontend URL
 FRONTEND_URL = config('FRONTEND_URL', default='https://anushri-choubey04.github.io/DryCleaning/')
 
+# Order Configuration
+# Order numbers are reserved from the sequence table in blocks of this size per worker
+ORDER_NUMBER_BLOCK_SIZE = config('ORDER_NUMBER_BLOCK_SIZE', default=20, cast=int)
+# Seconds a cached order tracking snapshot is kept when nothing invalidates it
+ORDER_TRACKING_CACHE_TIMEOUT = config('ORDER_TRACKING_CACHE_TIMEOUT', default=300, cast=int)
+# Bookable pickup/delivery time slots and how many orders each one takes by default
+ORDER_TIME_SLOTS = config(
+    'ORDER_TIME_SLOTS',
+    default='9:00 AM - 12:00 PM,12:00 PM - 3:00 PM,3:00 PM - 6:00 PM',
+    cast=Csv(),
+)
+ORDER_SLOT_CAPACITY = config('ORDER_SLOT_CAPACITY', default=20, cast=int)
+# Fan-out for the live order status streams: 'local' (single worker) or 'redis' (REDIS_URL)
+ORDER_EVENTS_BACKEND = config('ORDER_EVENTS_BACKEND', default='local')
+# Seconds between keepalive comments on an idle order status stream
+ORDER_EVENTS_KEEPALIVE = config('ORDER_EVENTS_KEEPALIVE', default=15, cast=int)
+# Order and customer search: 'fts5' (SQLite full-text index) or 'database' (unindexed icontains)
+ORDER_SEARCH_BACKEND = config('ORDER_SEARCH_BACKEND', default='fts5')
+
+# Service Catalog Configuration
+# Seconds between a worker's checks of the shared catalog version
+SERVICE_CATALOG_CHECK_INTERVAL = config('SERVICE_CATALOG_CHECK_INTERVAL', default=5, cast=int)
+# Seconds after which a worker rebuilds its catalog even if no change reached it
+SERVICE_CATALOG_MAX_AGE = config('SERVICE_CATALOG_MAX_AGE', default=300, cast=int)
+# Service search and autocomplete: 'fts5' (SQLite full-text index) or 'database' (substring match)
+SERVICE_SEARCH_BACKEND = config('SERVICE_SEARCH_BACKEND', default='fts5')
+
 # Jazzmin Configuration
 JAZZMIN_SETTINGS = {
     # title of the window (Will default to current_admin_site.site_title if absent or None)
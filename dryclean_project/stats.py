@@ -0,0 +1,56 @@
+from django.db.models import Count, Q, Sum
+
+
+class StatsQuery:
+    """
+    Collects counts, sums and breakdowns over one queryset and evaluates them
+    in a single query using conditional aggregates.
+
+        stats = (StatsQuery()
+                 .count('total_orders')
+                 .count('pending_orders', status='pending')
+                 .sum('total_spent', 'total_amount', payment_status='paid')
+                 .breakdown('status_breakdown', 'status', Order.STATUS_CHOICES)
+                 .evaluate(user.orders.all()))
+    """
+
+    def __init__(self):
+        self._aggregates = {}
+        self._defaults = {}
+        self._breakdowns = {}
+
+    @staticmethod
+    def _condition(filters):
+        return Q(**filters) if filters else None
+
+    def count(self, name, q=None, **filters):
+        condition = q if q is not None else self._condition(filters)
+        self._aggregates[name] = Count('pk', filter=condition)
+        self._defaults[name] = 0
+        return self
+
+    def sum(self, name, field, q=None, default=0, **filters):
+        condition = q if q is not None else self._condition(filters)
+        self._aggregates[name] = Sum(field, filter=condition)
+        self._defaults[name] = default
+        return self
+
+    def breakdown(self, name, field, choices):
+        """Count rows per value of ``field``; only non-zero values are returned"""
+        keys = []
+        for value, _ in choices:
+            key = f'__{name}__{value}'
+            self._aggregates[key] = Count('pk', filter=Q(**{field: value}))
+            keys.append((value, key))
+        self._breakdowns[name] = keys
+        return self
+
+    def evaluate(self, queryset):
+        results = queryset.order_by().aggregate(**self._aggregates)
+        stats = {}
+        for name, default in self._defaults.items():
+            value = results[name]
+            stats[name] = default if value is None else value
+        for name, keys in self._breakdowns.items():
+            stats[name] = {value: results[key] for value, key in keys if results[key]}
+        return stats
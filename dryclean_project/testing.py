@@ -0,0 +1,64 @@
+"""
+Test helpers shared by the apps.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+# "SCAN orders_order", "SCAN orders_order USING INDEX ..." (or "SCAN TABLE"
+# before SQLite 3.36): every row of the table is visited, in index order or not
+_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+
+
+def _is_top_n(sql):
+    # An unfiltered page walks an index in order and stops at its LIMIT
+    return ' WHERE ' not in sql and ' LIMIT ' in sql
+
+
+class APIGetMixin:
+    """``get`` for ``TestCase`` classes that call the API as a given user"""
+
+    def get(self, user, url, params=None):
+        """GET ``url`` as ``user``, assert a 200 and return the response data"""
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+
+class QueryPlanAssertions:
+    """Mixin for ``TestCase`` classes that check the query plans of a request"""
+
+    @contextmanager
+    def assertNoFullScans(self, *tables):
+        """
+        Fail if a SELECT run inside the block scans one of ``tables`` instead
+        of searching an index.
+
+        Each captured query is run again through ``EXPLAIN QUERY PLAN``, so the
+        plans checked are those of the SQL the code actually sent. Unfiltered
+        pages with a LIMIT, such as "the ten newest orders", are allowed to
+        walk an index.
+        """
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plans are only checked on SQLite')
+        with CaptureQueriesContext(connection) as queries:
+            yield
+
+        scans = []
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or _is_top_n(sql):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                for row in cursor.fetchall():
+                    match = _SCAN_RE.match(row[-1])
+                    if match and match.group(1) in tables:
+                        scans.append(f'{row[-1]}: {sql}')
+        self.assertEqual(scans, [], 'Full table scans:\n' + '\n'.join(scans))
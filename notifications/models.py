@@ -41,6 +41,21 @@ class Notification(models.Model):
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
         ordering = ['-created_at']
+        indexes = [
+            # User notification list, filtered by read state
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_read_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='notif_user_created_idx'),
+            # Unread badge counts
+            models.Index(
+                fields=['user'],
+                condition=models.Q(is_read=False),
+                name='notif_user_unread_idx',
+            ),
+            # Admin list filters and keyset pagination
+            models.Index(fields=['notification_type', '-created_at'], name='notif_type_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='notif_status_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='notif_created_id_idx'),
+        ]
 
 
 class EmailTemplate(models.Model):
@@ -1,11 +1,17 @@
 from rest_framework import serializers
+from dryclean_project.fieldsets import SparseFieldsetMixin
 from .models import Notification, EmailTemplate, SMSTemplate, NotificationPreference, NotificationLog
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     order_number = serializers.CharField(source='order.order_number', read_only=True)
     customer_name = serializers.CharField(source='user.get_full_name', read_only=True)
     
+    related_lookups = {
+        'order_number': (['order'], []),
+        'customer_name': (['user'], []),
+    }
+    
     class Meta:
         model = Notification
         fields = [
@@ -19,9 +25,13 @@ class NotificationSerializer(serializers.ModelSerializer):
         ]
 
 
-class NotificationListSerializer(serializers.ModelSerializer):
+class NotificationListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     order_number = serializers.CharField(source='order.order_number', read_only=True)
     
+    related_lookups = {
+        'order_number': (['order'], []),
+    }
+    
     class Meta:
         model = Notification
         fields = [
@@ -1,3 +1,67 @@
+from datetime import date
+
+from django.contrib.auth.models import User
 from django.test import TestCase
 
-# Create your tests here.
+from dryclean_project.testing import APIGetMixin, QueryPlanAssertions
+from orders.models import Order
+from .models import Notification
+
+
+class NotificationQueryPlanTests(APIGetMixin, QueryPlanAssertions, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        order = Order.objects.create(
+            customer=cls.customer, pickup_address='12 Main Street',
+            pickup_date=date(2026, 1, 5), pickup_time_slot='9:00 AM - 12:00 PM',
+        )
+        Notification.objects.create(
+            user=cls.customer, order=order, notification_type='email', title='Order placed', message='Thanks',
+        )
+
+    def test_user_list_and_stats_use_indexes(self):
+        with self.assertNoFullScans('notifications_notification'):
+            self.get(self.customer, '/api/notifications/')
+            self.get(self.customer, '/api/notifications/', {'is_read': 'false'})
+            self.get(self.customer, '/api/notifications/', {'cursor': ''})
+            self.get(self.customer, '/api/notifications/stats/')
+
+    def test_admin_filters_use_indexes(self):
+        for params in (
+            {'user_id': self.customer.id},
+            {'type': 'email'},
+            {'status': 'pending'},
+            {'status': 'pending', 'cursor': ''},
+        ):
+            with self.subTest(params=params), self.assertNoFullScans('notifications_notification'):
+                self.get(self.staff, '/api/notifications/admin/', params)
+
+
+class NotificationStatsQueryCountTests(APIGetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        for index, (notification_type, status) in enumerate(
+            [('email', 'sent'), ('email', 'pending'), ('sms', 'failed'), ('push', 'sent')]
+        ):
+            Notification.objects.create(
+                user=cls.customer, notification_type=notification_type, status=status,
+                title=f'Notification {index}', message='Hello', is_read=index == 0,
+            )
+
+    def test_user_stats_take_one_aggregate_and_the_recent_list(self):
+        with self.assertNumQueries(2):
+            data = self.get(self.customer, '/api/notifications/stats/')
+        self.assertEqual((data['total_notifications'], data['unread_notifications']), (4, 3))
+        self.assertIn({'notification_type': 'email', 'count': 2}, data['notifications_by_type'])
+        self.assertEqual(len(data['recent_notifications']), 4)
+
+    def test_admin_stats_take_one_aggregate_and_the_recent_list(self):
+        with self.assertNumQueries(2):
+            data = self.get(self.staff, '/api/notifications/admin/stats/')
+        self.assertEqual(data['today_notifications'], 4)
+        self.assertEqual(data['status_breakdown'], {'pending': 1, 'sent': 2, 'failed': 1})
+        self.assertEqual(data['type_breakdown'], {'email': 2, 'sms': 1, 'push': 1})
@@ -1,8 +1,8 @@
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Q, Count
 from django.utils import timezone
+from datetime import datetime, time
 from .models import Notification, EmailTemplate, SMSTemplate, NotificationPreference, NotificationLog
 from .serializers import (
     NotificationSerializer, NotificationListSerializer, MarkNotificationReadSerializer,
@@ -11,11 +11,15 @@ from .serializers import (
     TestNotificationSerializer
 )
 from .tasks import send_email_notification
+from dryclean_project.fieldsets import shape_queryset
+from dryclean_project.pagination import OptionalKeysetPagination
+from dryclean_project.stats import StatsQuery
 
 
 class NotificationListView(generics.ListAPIView):
     serializer_class = NotificationListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
     
     def get_queryset(self):
         user = self.request.user
@@ -33,6 +37,7 @@ class NotificationListView(generics.ListAPIView):
         if is_read is not None:
             queryset = queryset.filter(is_read=is_read.lower() == 'true')
         
+        queryset = shape_queryset(queryset, self.get_serializer_class(), self.request)
         return queryset.order_by('-created_at')
 
 
@@ -43,8 +48,10 @@ class NotificationDetailView(generics.RetrieveUpdateAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.is_staff:
-            return Notification.objects.all()
-        return Notification.objects.filter(user=user)
+            queryset = Notification.objects.all()
+        else:
+            queryset = Notification.objects.filter(user=user)
+        return shape_queryset(queryset, self.get_serializer_class(), self.request)
     
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -77,15 +84,25 @@ def notification_stats(request):
     
     notifications = Notification.objects.filter(user=user)
     
+    # Counts and breakdowns in a single query
+    counts = (StatsQuery()
+              .count('total_notifications')
+              .count('unread_notifications', is_read=False)
+              .breakdown('by_type', 'notification_type', Notification.NOTIFICATION_TYPE_CHOICES)
+              .breakdown('by_status', 'status', Notification.STATUS_CHOICES)
+              .evaluate(notifications))
+    
     stats = {
-        'total_notifications': notifications.count(),
-        'unread_notifications': notifications.filter(is_read=False).count(),
-        'notifications_by_type': notifications.values('notification_type').annotate(
-            count=Count('id')
-        ),
-        'notifications_by_status': notifications.values('status').annotate(
-            count=Count('id')
-        ),
+        'total_notifications': counts['total_notifications'],
+        'unread_notifications': counts['unread_notifications'],
+        'notifications_by_type': [
+            {'notification_type': notification_type, 'count': count}
+            for notification_type, count in counts['by_type'].items()
+        ],
+        'notifications_by_status': [
+            {'status': status_value, 'count': count}
+            for status_value, count in counts['by_status'].items()
+        ],
         'recent_notifications': NotificationListSerializer(
             notifications.order_by('-created_at')[:5], many=True
         ).data
@@ -109,6 +126,7 @@ class NotificationPreferenceView(generics.RetrieveUpdateAPIView):
 class AdminNotificationListView(generics.ListCreateAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = OptionalKeysetPagination
     
     def get_queryset(self):
         queryset = Notification.objects.all()
@@ -125,13 +143,16 @@ class AdminNotificationListView(generics.ListCreateAPIView):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
         
+        queryset = shape_queryset(queryset, self.get_serializer_class(), self.request)
         return queryset.order_by('-created_at')
 
 
 class AdminNotificationDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAdminUser]
+    
+    def get_queryset(self):
+        return shape_queryset(Notification.objects.all(), self.get_serializer_class(), self.request)
 
 
 @api_view(['POST'])
@@ -306,28 +327,27 @@ def admin_notification_stats(request):
     today = timezone.now().date()
     last_week = today - timezone.timedelta(days=7)
     
-    # Notification statistics
-    total_notifications = Notification.objects.count()
-    today_notifications = Notification.objects.filter(created_at__date=today).count()
-    week_notifications = Notification.objects.filter(created_at__date__gte=last_week).count()
-    
-    # Status breakdown
-    status_counts = Notification.objects.values('status').annotate(count=Count('id'))
-    status_breakdown = {item['status']: item['count'] for item in status_counts}
+    today_start = timezone.make_aware(datetime.combine(today, time.min))
+    week_start = timezone.make_aware(datetime.combine(last_week, time.min))
     
-    # Type breakdown
-    type_counts = Notification.objects.values('notification_type').annotate(count=Count('id'))
-    type_breakdown = {item['notification_type']: item['count'] for item in type_counts}
+    # Notification statistics in a single query
+    counts = (StatsQuery()
+              .count('total_notifications')
+              .count('today_notifications', created_at__gte=today_start)
+              .count('week_notifications', created_at__gte=week_start)
+              .breakdown('status_breakdown', 'status', Notification.STATUS_CHOICES)
+              .breakdown('type_breakdown', 'notification_type', Notification.NOTIFICATION_TYPE_CHOICES)
+              .evaluate(Notification.objects.all()))
     
     # Recent notifications
     recent_notifications = Notification.objects.select_related('user').order_by('-created_at')[:10]
     
     stats = {
-        'total_notifications': total_notifications,
-        'today_notifications': today_notifications,
-        'week_notifications': week_notifications,
-        'status_breakdown': status_breakdown,
-        'type_breakdown': type_breakdown,
+        'total_notifications': counts['total_notifications'],
+        'today_notifications': counts['today_notifications'],
+        'week_notifications': counts['week_notifications'],
+        'status_breakdown': counts['status_breakdown'],
+        'type_breakdown': counts['type_breakdown'],
         'recent_notifications': NotificationListSerializer(recent_notifications, many=True).data
     }
     
@@ -1,5 +1,74 @@
+from django import forms
 from django.contrib import admin
-from .models import Order, OrderItem, OrderStatusHistory, PickupSchedule, DeliverySchedule
+from django.utils.text import capfirst
+from .models import Order, OrderItem, OrderStatusHistory, PickupSchedule, DeliverySchedule, TimeSlotCapacity
+from .customer_stats import refresh_customer_stats
+from .search import get_search_backend
+from .slots import SLOT_FIELDS, configured_time_slots, move_order_slots, slot_state
+from .transitions import apply_status_changes
+
+
+class TimeSlotAdminForm(forms.ModelForm):
+    """Refuses to move a booking while it keeps a slot that is no longer offered"""
+    time_slot_fields = {}
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        for slot_field, date_field in self.time_slot_fields.items():
+            slot = cleaned_data.get(slot_field)
+            moved = slot_field in self.changed_data or date_field in self.changed_data
+            if slot and moved and slot not in configured_time_slots():
+                self.add_error(slot_field, f"{slot} is no longer bookable; pick one of the current time slots.")
+        return cleaned_data
+
+
+class TimeSlotChoicesMixin:
+    """
+    Time slot fields offer the configured ``ORDER_TIME_SLOTS``.
+    
+    ``time_slot_fields`` maps each slot field to its date field. A booking
+    made under an older slot list keeps its slot as a choice, so editing
+    anything else leaves it alone.
+    """
+    form = TimeSlotAdminForm
+    time_slot_fields = {}
+    
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        if db_field.name not in self.time_slot_fields:
+            return super().formfield_for_dbfield(db_field, request, **kwargs)
+        choices = [(slot, slot) for slot in configured_time_slots()]
+        if db_field.blank:
+            choices.insert(0, ('', '---------'))
+        return forms.ChoiceField(
+            choices=choices, required=not db_field.blank, label=capfirst(db_field.verbose_name)
+        )
+    
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+        form.time_slot_fields = self.time_slot_fields
+        for name in self.time_slot_fields:
+            field = form.base_fields.get(name)
+            current = getattr(obj, name, None)
+            if field is not None and current and current not in dict(field.choices):
+                field.choices = [*field.choices, (current, current)]
+        return form
+
+
+class ScheduleAdmin(TimeSlotChoicesMixin, admin.ModelAdmin):
+    """Moving a schedule moves the order's booked slot with it"""
+    time_slot_fields = {'scheduled_time_slot': 'scheduled_date'}
+    order_date_field = order_time_slot_field = None
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        order = Order.objects.select_for_update().get(pk=obj.order_id)
+        before = slot_state(order)
+        setattr(order, self.order_date_field, obj.scheduled_date)
+        setattr(order, self.order_time_slot_field, obj.scheduled_time_slot)
+        if slot_state(order) != before:
+            order.save(update_fields=[self.order_date_field, self.order_time_slot_field, 'updated_at'])
+            # Staff may overbook a slot; the admin view is atomic
+            move_order_slots(before, order, overbook=True)
 
 
 class OrderItemInline(admin.TabularInline):
@@ -17,11 +86,12 @@ class OrderStatusHistoryInline(admin.TabularInline):
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
-    list_display = ('order_number', 'customer', 'status', 'order_type', 'total_amount', 'payment_status', 'created_at')
+class OrderAdmin(TimeSlotChoicesMixin, admin.ModelAdmin):
+    list_display = ('order_number', 'customer', 'status', 'order_type', 'item_count', 'total_amount', 'payment_status', 'created_at')
+    list_select_related = ('customer',)
     list_filter = ('status', 'order_type', 'payment_status', 'created_at', 'pickup_date')
     search_fields = ('order_number', 'customer__username', 'customer__email', 'pickup_address')
-    readonly_fields = ('order_number', 'subtotal', 'tax', 'delivery_fee', 'total_amount', 'created_at', 'updated_at')
+    readonly_fields = ('order_number', 'item_count', 'subtotal', 'tax', 'delivery_fee', 'total_amount', 'created_at', 'updated_at')
     inlines = [OrderItemInline, OrderStatusHistoryInline]
     
     fieldsets = (
@@ -35,7 +105,7 @@ class OrderAdmin(admin.ModelAdmin):
             'fields': ('delivery_address', 'delivery_date', 'delivery_time_slot')
         }),
         ('Pricing', {
-            'fields': ('subtotal', 'tax', 'delivery_fee', 'total_amount')
+            'fields': ('item_count', 'subtotal', 'tax', 'delivery_fee', 'total_amount')
         }),
         ('Payment', {
             'fields': ('payment_status', 'payment_method')
@@ -50,75 +120,61 @@ class OrderAdmin(admin.ModelAdmin):
     )
     
     actions = ['mark_as_confirmed', 'mark_as_picked_up', 'mark_as_in_process', 'mark_as_ready', 'mark_as_delivered']
+    time_slot_fields = {'pickup_time_slot': 'pickup_date', 'delivery_time_slot': 'delivery_date'}
+    
+    def save_model(self, request, obj, form, change):
+        before = Order.objects.filter(pk=obj.pk).values(*SLOT_FIELDS, 'status').first() if change else None
+        super().save_model(request, obj, form, change)
+        # New dates, slots or a cancellation move the booked places; staff may overbook
+        move_order_slots(before, obj, overbook=True)
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Status or payment changes made in the form; the admin view is atomic
+        refresh_customer_stats(form.instance.customer_id)
+    
+    def get_search_results(self, request, queryset, search_term):
+        # search_fields only turns the search box on; matching runs against the search index
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(get_search_backend().order_filter(search_term)), False
+    
+    def _transition(self, request, queryset, paths, notes):
+        """Move the selected orders along ``paths`` ({from_status: [status, ...]})"""
+        orders = queryset.filter(status__in=paths).values_list('id', 'status')
+        result = apply_status_changes(
+            [(order_id, step) for order_id, current in orders for step in paths[current]],
+            user=request.user,
+            notes=notes
+        )
+        return len(result['applied'])
     
     def mark_as_confirmed(self, request, queryset):
-        for order in queryset:
-            if order.status == 'pending':
-                order.status = 'confirmed'
-                order.save()
-                OrderStatusHistory.objects.create(
-                    order=order,
-                    status='confirmed',
-                    notes='Order confirmed by admin',
-                    updated_by=request.user
-                )
-        self.message_user(request, f"{queryset.count()} orders marked as confirmed.")
+        count = self._transition(request, queryset, {'pending': ['confirmed']}, 'Order confirmed by admin')
+        self.message_user(request, f"{count} orders marked as confirmed.")
     mark_as_confirmed.short_description = "Mark selected orders as confirmed"
     
     def mark_as_picked_up(self, request, queryset):
-        for order in queryset:
-            if order.status == 'confirmed':
-                order.status = 'picked_up'
-                order.save()
-                OrderStatusHistory.objects.create(
-                    order=order,
-                    status='picked_up',
-                    notes='Order picked up',
-                    updated_by=request.user
-                )
-        self.message_user(request, f"{queryset.count()} orders marked as picked up.")
+        count = self._transition(request, queryset, {'confirmed': ['picked_up']}, 'Order picked up')
+        self.message_user(request, f"{count} orders marked as picked up.")
     mark_as_picked_up.short_description = "Mark selected orders as picked up"
     
     def mark_as_in_process(self, request, queryset):
-        for order in queryset:
-            if order.status == 'picked_up':
-                order.status = 'in_process'
-                order.save()
-                OrderStatusHistory.objects.create(
-                    order=order,
-                    status='in_process',
-                    notes='Order in processing',
-                    updated_by=request.user
-                )
-        self.message_user(request, f"{queryset.count()} orders marked as in process.")
+        count = self._transition(request, queryset, {'picked_up': ['in_process']}, 'Order in processing')
+        self.message_user(request, f"{count} orders marked as in process.")
     mark_as_in_process.short_description = "Mark selected orders as in process"
     
     def mark_as_ready(self, request, queryset):
-        for order in queryset:
-            if order.status == 'in_process':
-                order.status = 'ready'
-                order.save()
-                OrderStatusHistory.objects.create(
-                    order=order,
-                    status='ready',
-                    notes='Order ready for delivery',
-                    updated_by=request.user
-                )
-        self.message_user(request, f"{queryset.count()} orders marked as ready.")
+        count = self._transition(request, queryset, {'in_process': ['ready']}, 'Order ready for delivery')
+        self.message_user(request, f"{count} orders marked as ready.")
     mark_as_ready.short_description = "Mark selected orders as ready"
     
     def mark_as_delivered(self, request, queryset):
-        for order in queryset:
-            if order.status == 'ready':
-                order.status = 'delivered'
-                order.save()
-                OrderStatusHistory.objects.create(
-                    order=order,
-                    status='delivered',
-                    notes='Order delivered',
-                    updated_by=request.user
-                )
-        self.message_user(request, f"{queryset.count()} orders marked as delivered.")
+        count = self._transition(request, queryset, {
+            'ready': ['out_for_delivery', 'delivered'],
+            'out_for_delivery': ['delivered'],
+        }, 'Order delivered')
+        self.message_user(request, f"{count} orders marked as delivered.")
     mark_as_delivered.short_description = "Mark selected orders as delivered"
 
 
@@ -171,10 +227,11 @@ class OrderStatusHistoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(PickupSchedule)
-class PickupScheduleAdmin(admin.ModelAdmin):
+class PickupScheduleAdmin(ScheduleAdmin):
     list_display = ('order', 'scheduled_date', 'scheduled_time_slot', 'pickup_agent', 'is_completed')
     list_filter = ('scheduled_date', 'is_completed', 'created_at')
     search_fields = ('order__order_number', 'pickup_agent__username')
+    order_date_field, order_time_slot_field = 'pickup_date', 'pickup_time_slot'
     readonly_fields = ('created_at', 'updated_at')
     
     fieldsets = (
@@ -198,10 +255,11 @@ class PickupScheduleAdmin(admin.ModelAdmin):
 
 
 @admin.register(DeliverySchedule)
-class DeliveryScheduleAdmin(admin.ModelAdmin):
+class DeliveryScheduleAdmin(ScheduleAdmin):
     list_display = ('order', 'scheduled_date', 'scheduled_time_slot', 'delivery_agent', 'is_completed')
     list_filter = ('scheduled_date', 'is_completed', 'created_at')
     search_fields = ('order__order_number', 'delivery_agent__username')
+    order_date_field, order_time_slot_field = 'delivery_date', 'delivery_time_slot'
     readonly_fields = ('created_at', 'updated_at')
     
     fieldsets = (
@@ -222,3 +280,12 @@ class DeliveryScheduleAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(TimeSlotCapacity)
+class TimeSlotCapacityAdmin(admin.ModelAdmin):
+    list_display = ('date', 'kind', 'time_slot', 'capacity', 'reserved', 'available')
+    list_filter = ('kind', 'date')
+    list_editable = ('capacity',)
+    readonly_fields = ('reserved', 'updated_at')
+    date_hierarchy = 'date'
@@ -0,0 +1,283 @@
+"""
+Batch assignment of pickup and delivery stops to agents.
+
+``plan_assignments`` is a pure function: it groups the stops of each time slot
+into areas (pincode, then city, then the locality part of the address) and
+gives each agent an even share of the slot as a run of neighbouring areas,
+topping up agents that already have fewer stops first. ``auto_assign`` loads the unassigned stops for a
+date, runs the planner and writes every assignment in one transaction.
+"""
+import heapq
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Order, PickupSchedule, DeliverySchedule
+
+
+DEFAULT_DELIVERY_TIME_SLOT = '9:00 AM - 12:00 PM'
+
+ASSIGNMENT_KINDS = {
+    'pickup': {
+        'model': PickupSchedule,
+        'related_name': 'pickup_schedule',
+        'agent_field': 'pickup_agent',
+        'order_date': 'pickup_date',
+        'order_time_slot': 'pickup_time_slot',
+        'address': 'pickup_address',
+        'open_statuses': ['pending', 'confirmed'],
+    },
+    'delivery': {
+        'model': DeliverySchedule,
+        'related_name': 'delivery_schedule',
+        'agent_field': 'delivery_agent',
+        'order_date': 'delivery_date',
+        'order_time_slot': 'delivery_time_slot',
+        'address': 'delivery_address',
+        'open_statuses': ['picked_up', 'in_process', 'ready', 'out_for_delivery'],
+    },
+}
+
+# Where a stop's location comes from, relative to the order
+LOCATION_FIELDS = {
+    'stop_pincode': 'customer__userprofile__pincode',
+    'stop_city': 'customer__userprofile__city',
+    'stop_pickup_address': 'pickup_address',
+    'stop_profile_address': 'customer__userprofile__address',
+}
+
+BATCH_SIZE = 500
+
+
+def area_key(pincode=None, city=None, address=None):
+    """Area a stop belongs to: its pincode, else its city, else its locality"""
+    if pincode and pincode.strip():
+        return f'pin:{pincode.strip()}'
+    if city and city.strip():
+        return f'city:{city.strip().lower()}'
+    if address and address.strip():
+        # "12 MG Road, Indiranagar, Bangalore" -> "indiranagar"
+        parts = [part.strip().lower() for part in address.split(',') if part.strip()]
+        return f'addr:{parts[1] if len(parts) > 1 else parts[0]}'
+    return 'unknown'
+
+
+def _targets(loads, count):
+    """Split ``count`` new stops so the agents' loads end up as even as possible"""
+    heap = list(loads)
+    heapq.heapify(heap)
+    targets = defaultdict(int)
+    for _ in range(count):
+        load, agent_id = heapq.heappop(heap)
+        targets[agent_id] += 1
+        heapq.heappush(heap, (load + 1, agent_id))
+    return targets
+
+
+def plan_assignments(stops, agent_ids, existing_load=None):
+    """
+    Assign ``stops`` to ``agent_ids``.
+
+    ``stops`` is an iterable of dicts with ``key``, ``time_slot`` and ``area``;
+    ``existing_load`` maps ``(agent_id, time_slot)`` to the stops an agent
+    already has in that slot. Returns ``{stop key: agent_id}``.
+
+    Within a slot every agent gets an even share of the stops. Areas are
+    walked in key order and each agent takes the next run of stops, so an
+    agent covers a few neighbouring areas and only the boundaries are split.
+    """
+    if not agent_ids:
+        return {}
+    existing_load = existing_load or {}
+
+    slots = defaultdict(lambda: defaultdict(list))
+    for stop in stops:
+        slots[stop['time_slot']][stop['area']].append(stop['key'])
+
+    plan = {}
+    for time_slot, areas in slots.items():
+        loads = [(existing_load.get((agent_id, time_slot), 0), agent_id) for agent_id in agent_ids]
+        keys = [key for area in sorted(areas) for key in areas[area]]
+        targets = _targets(loads, len(keys))
+
+        position = 0
+        for agent_id in agent_ids:
+            for key in keys[position:position + targets[agent_id]]:
+                plan[key] = agent_id
+            position += targets[agent_id]
+
+    return plan
+
+
+def _row_area(row):
+    address = row['stop_address'] or row['stop_pickup_address'] or row['stop_profile_address']
+    return area_key(row['stop_pincode'], row['stop_city'], address)
+
+
+def _load_stops(kind, date, time_slot=None):
+    """Unassigned stops for ``date``, including orders without a schedule yet"""
+    config = ASSIGNMENT_KINDS[kind]
+    model = config['model']
+    agent_field = config['agent_field']
+    location = dict(LOCATION_FIELDS, stop_address=config['address'])
+
+    schedules = model.objects.filter(
+        scheduled_date=date,
+        is_completed=False,
+        **{f'{agent_field}__isnull': True}
+    )
+    if time_slot:
+        schedules = schedules.filter(scheduled_time_slot=time_slot)
+
+    stops = []
+    schedule_location = {name: F(f'order__{path}') for name, path in location.items()}
+    for row in schedules.values('id', 'order_id', 'scheduled_time_slot', **schedule_location).order_by('id'):
+        stops.append({
+            'key': ('schedule', row['id']),
+            'order_id': row['order_id'],
+            'time_slot': row['scheduled_time_slot'],
+            'area': _row_area(row),
+        })
+
+    # Orders due on this date that have no schedule row yet
+    orders = Order.objects.filter(
+        status__in=config['open_statuses'],
+        **{config['order_date']: date, f"{config['related_name']}__isnull": True}
+    )
+    if time_slot:
+        orders = orders.filter(**{config['order_time_slot']: time_slot})
+    order_location = {name: F(path) for name, path in location.items()}
+    for row in orders.values('id', slot=F(config['order_time_slot']), **order_location).order_by('id'):
+        stops.append({
+            'key': ('order', row['id']),
+            'order_id': row['id'],
+            'time_slot': row['slot'] or DEFAULT_DELIVERY_TIME_SLOT,
+            'area': _row_area(row),
+        })
+
+    return stops
+
+
+def _existing_load(kind, date, agent_ids):
+    config = ASSIGNMENT_KINDS[kind]
+    agent_field = config['agent_field']
+    rows = config['model'].objects.filter(
+        scheduled_date=date,
+        is_completed=False,
+        **{f'{agent_field}_id__in': agent_ids}
+    ).values(f'{agent_field}_id', 'scheduled_time_slot').annotate(count=Count('id')).order_by()
+    return {
+        (row[f'{agent_field}_id'], row['scheduled_time_slot']): row['count']
+        for row in rows
+    }
+
+
+def _write_plan(kind, date, stops, plan):
+    config = ASSIGNMENT_KINDS[kind]
+    model = config['model']
+    agent_field = config['agent_field']
+
+    updates = []
+    creates = []
+    for stop in stops:
+        agent_id = plan.get(stop['key'])
+        if agent_id is None:
+            continue
+        source, pk = stop['key']
+        if source == 'schedule':
+            schedule = model(id=pk, order_id=stop['order_id'])
+            setattr(schedule, f'{agent_field}_id', agent_id)
+            updates.append(schedule)
+        else:
+            creates.append(model(**{
+                'order_id': pk,
+                'scheduled_date': date,
+                'scheduled_time_slot': stop['time_slot'],
+                f'{agent_field}_id': agent_id,
+            }))
+
+    with transaction.atomic():
+        if updates:
+            # Skip schedules that were assigned by hand since they were read
+            still_open = set(
+                model.objects.select_for_update()
+                .filter(id__in=[schedule.id for schedule in updates], **{f'{agent_field}__isnull': True})
+                .values_list('id', flat=True)
+            )
+            updates = [schedule for schedule in updates if schedule.id in still_open]
+            # bulk_update skips auto_now, so touch updated_at explicitly
+            now = timezone.now()
+            for schedule in updates:
+                schedule.updated_at = now
+            model.objects.bulk_update(updates, [agent_field, 'updated_at'], batch_size=BATCH_SIZE)
+        if creates:
+            # Lock the orders so no schedule can be inserted for them until we
+            # commit, then skip those that got one since they were read: that
+            # schedule wins, and only the rows written here are counted
+            order_ids = [schedule.order_id for schedule in creates]
+            list(Order.objects.select_for_update().filter(id__in=order_ids).values_list('id', flat=True))
+            scheduled = set(model.objects.filter(order_id__in=order_ids).values_list('order_id', flat=True))
+            creates = [schedule for schedule in creates if schedule.order_id not in scheduled]
+            model.objects.bulk_create(creates, batch_size=BATCH_SIZE)
+        order_ids = [schedule.order_id for schedule in updates] + [schedule.order_id for schedule in creates]
+        _after_bulk_assignment(date, order_ids, bool(creates))
+
+    return len(updates), len(creates)
+
+
+def _after_bulk_assignment(date, order_ids, created):
+    """Run the post_save side effects that bulk writes skip"""
+    from .rollups import schedule_rollup_refresh
+    from .tracking import invalidate_tracking_snapshot
+
+    if created:
+        schedule_rollup_refresh(date)
+    for order_id in order_ids:
+        invalidate_tracking_snapshot(order_id)
+
+
+def auto_assign(date, kinds=('pickup', 'delivery'), time_slot=None, agent_ids=None, dry_run=False):
+    """
+    Assign every unassigned pickup and/or delivery stop on ``date``.
+
+    Agents are all active staff users unless ``agent_ids`` is given. With
+    ``dry_run`` the plan is computed and summarised but nothing is written.
+    """
+    agents = User.objects.filter(is_staff=True, is_active=True)
+    if agent_ids is not None:
+        agents = agents.filter(id__in=agent_ids)
+    agent_ids = list(agents.order_by('id').values_list('id', flat=True))
+
+    summary = {'date': date, 'dry_run': dry_run, 'agents': len(agent_ids)}
+    # Both kinds are written in one transaction
+    with transaction.atomic():
+        for kind in kinds:
+            stops = _load_stops(kind, date, time_slot)
+            plan = plan_assignments(stops, agent_ids, _existing_load(kind, date, agent_ids)) if stops else {}
+
+            per_agent = defaultdict(lambda: {'stops': 0, 'areas': set()})
+            for stop in stops:
+                agent_id = plan.get(stop['key'])
+                if agent_id is not None:
+                    per_agent[agent_id]['stops'] += 1
+                    per_agent[agent_id]['areas'].add(stop['area'])
+
+            updated = created = 0
+            if plan and not dry_run:
+                updated, created = _write_plan(kind, date, stops, plan)
+
+            summary[kind] = {
+                'stops': len(stops),
+                'assigned': len(plan),
+                'unassigned': len(stops) - len(plan),
+                'schedules_updated': updated,
+                'schedules_created': created,
+                'per_agent': [
+                    {'agent_id': agent_id, 'stops': values['stops'], 'areas': len(values['areas'])}
+                    for agent_id, values in sorted(per_agent.items())
+                ],
+            }
+    return summary
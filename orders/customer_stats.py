@@ -0,0 +1,131 @@
+"""
+Per-customer order statistics for the order history and user dashboard.
+
+Each ``CustomerOrderStats`` row holds one customer's order count, paid total
+and status breakdown. It is recomputed inside the transaction that creates an
+order, changes a status or completes a payment, so the counters commit or
+roll back together with the change. The row is locked before it is recomputed,
+so concurrent changes for one customer are applied one after the other.
+Rows can be rebuilt in bulk with ``manage.py rebuild_customer_stats``.
+"""
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import CustomerOrderStats, Order
+from .rollups import STATUS_FIELDS
+
+
+COUNTER_FIELDS = ['total_orders', 'total_spent', *STATUS_FIELDS.values()]
+
+REBUILD_BATCH_SIZE = 500
+
+
+def _counters(orders):
+    """``{customer_id: {field: value}}`` for ``orders``, in one grouped query"""
+    rows = orders.values('customer_id').annotate(
+        total_orders=Count('id'),
+        total_spent=Sum('total_amount', filter=Q(payment_status='paid')),
+        **{
+            field: Count('id', filter=Q(status=status))
+            for status, field in STATUS_FIELDS.items()
+        }
+    ).order_by()
+    counters = {}
+    for values in rows:
+        customer_id = values.pop('customer_id')
+        values['total_spent'] = values['total_spent'] or 0
+        counters[customer_id] = values
+    return counters
+
+
+def _zero_counters():
+    return dict.fromkeys(COUNTER_FIELDS, 0)
+
+
+def refresh_customer_stats(*customer_ids, create=True):
+    """
+    Recompute the stats rows of ``customer_ids`` in the current transaction.
+
+    With ``create=False`` only existing rows are updated, which is what a
+    delete needs: the customer itself may be on its way out.
+    """
+    customer_ids = sorted({customer_id for customer_id in customer_ids if customer_id is not None})
+    if not customer_ids:
+        return
+
+    with transaction.atomic():
+        if create:
+            CustomerOrderStats.objects.bulk_create(
+                [CustomerOrderStats(customer_id=customer_id) for customer_id in customer_ids],
+                ignore_conflicts=True,
+            )
+        stats = list(
+            CustomerOrderStats.objects.select_for_update()
+            .filter(customer_id__in=customer_ids)
+            .order_by('customer_id')
+        )
+        if not stats:
+            return
+
+        counters = _counters(Order.objects.filter(customer_id__in=[row.customer_id for row in stats]))
+        now = timezone.now()
+        for row in stats:
+            for field, value in counters.get(row.customer_id, _zero_counters()).items():
+                setattr(row, field, value)
+            # bulk_update skips auto_now
+            row.updated_at = now
+        CustomerOrderStats.objects.bulk_update(stats, COUNTER_FIELDS + ['updated_at'])
+
+
+def rebuild_customer_stats(batch_size=REBUILD_BATCH_SIZE):
+    """
+    Recompute every stats row from the full order history.
+
+    Customers are read in primary-key batches, one grouped query each, and
+    rows of customers without orders are removed. Returns the number of rows
+    written.
+    """
+    written = 0
+    last_id = 0
+    while True:
+        customer_ids = list(
+            Order.objects.filter(customer_id__gt=last_id)
+            .order_by('customer_id')
+            .values_list('customer_id', flat=True)
+            .distinct()[:batch_size]
+        )
+        if not customer_ids:
+            break
+        counters = _counters(Order.objects.filter(customer_id__in=customer_ids))
+        CustomerOrderStats.objects.bulk_create(
+            [CustomerOrderStats(customer_id=customer_id, **values) for customer_id, values in counters.items()],
+            update_conflicts=True,
+            unique_fields=['customer'],
+            update_fields=COUNTER_FIELDS + ['updated_at'],
+        )
+        written += len(counters)
+        last_id = customer_ids[-1]
+
+    CustomerOrderStats.objects.exclude(customer_id__in=Order.objects.values('customer_id')).delete()
+    return written
+
+
+def get_customer_stats(customer):
+    """
+    The stats of ``customer`` as a dict, read with a single primary-key lookup.
+
+    A customer without a row has no orders yet.
+    """
+    stats = CustomerOrderStats.objects.filter(pk=customer.pk).first()
+    values = {field: getattr(stats, field) for field in COUNTER_FIELDS} if stats else _zero_counters()
+    return {
+        'total_orders': values['total_orders'],
+        'total_spent': values['total_spent'],
+        'status_breakdown': {
+            status: values[field]
+            for status, field in STATUS_FIELDS.items()
+            if values[field]
+        },
+        'status_counts': {status: values[field] for status, field in STATUS_FIELDS.items()},
+    }
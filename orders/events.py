@@ -0,0 +1,194 @@
+"""
+Order status events for the server-sent events stream.
+
+Status changes are published once their transaction commits, to one topic per
+order, one per customer and a staff-wide topic. ``ORDER_EVENTS_BACKEND``
+selects how they are fanned out to the open streams:
+
+- ``local`` (default) keeps the subscribers in process memory. Events only
+  reach streams served by the worker that made the change, so this is for a
+  single ASGI worker.
+- ``redis`` publishes to Redis pub/sub on ``REDIS_URL`` so every worker sees
+  every event.
+
+Each stream gets a bounded queue; a client that stops reading loses its oldest
+events rather than growing the worker's memory. Every event carries the full
+current status, so a dropped event is corrected by the next one.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order
+
+
+ORDER_EVENTS_CHANNEL_PREFIX = 'orders:events'
+SUBSCRIBER_QUEUE_SIZE = 100
+
+STAFF_TOPIC = 'staff'
+
+
+def order_topic(order_id):
+    return f'order:{order_id}'
+
+
+def customer_topic(customer_id):
+    return f'customer:{customer_id}'
+
+
+class LocalSubscription:
+    """Events for a set of topics, delivered to one asyncio event loop"""
+
+    def __init__(self, broker, topics):
+        self.broker = broker
+        self.topics = list(topics)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def _put(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    def deliver(self, event):
+        # Called from the publishing thread
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    async def get(self, timeout):
+        """Return the next event, or None after ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process fan-out to the streams served by this worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    async def subscribe(self, topics):
+        subscription = LocalSubscription(self, topics)
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    def publish(self, topics, event):
+        with self._lock:
+            targets = {
+                subscription
+                for topic in topics
+                for subscription in self._subscribers.get(topic, ())
+            }
+        for subscription in targets:
+            subscription.deliver(event)
+
+
+class RedisSubscription:
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    async def get(self, timeout):
+        """Return the next event, or None after ``timeout`` seconds"""
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+    async def close(self):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisBroker:
+    """Fan-out across workers through Redis pub/sub"""
+
+    def __init__(self, url):
+        import redis
+
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+
+    @staticmethod
+    def _channel(topic):
+        return f'{ORDER_EVENTS_CHANNEL_PREFIX}:{topic}'
+
+    async def subscribe(self, topics):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(*[self._channel(topic) for topic in topics])
+        return RedisSubscription(client, pubsub)
+
+    def publish(self, topics, event):
+        payload = json.dumps(event, cls=DjangoJSONEncoder)
+        with self._client.pipeline(transaction=False) as pipe:
+            for topic in topics:
+                pipe.publish(self._channel(topic), payload)
+            pipe.execute()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = getattr(settings, 'ORDER_EVENTS_BACKEND', 'local')
+                if backend == 'redis':
+                    _broker = RedisBroker(settings.REDIS_URL)
+                elif backend == 'local':
+                    _broker = LocalBroker()
+                else:
+                    raise ValueError(f"Unknown ORDER_EVENTS_BACKEND '{backend}'")
+    return _broker
+
+
+def status_event(order_id, order_number, customer_id, status, updated_at=None):
+    return {
+        'order_id': order_id,
+        'order_number': order_number,
+        'customer_id': customer_id,
+        'status': status,
+        'status_display': dict(Order.STATUS_CHOICES).get(status, status),
+        'updated_at': (updated_at or timezone.now()).isoformat(),
+    }
+
+
+def publish_status_change(order_id, order_number, customer_id, status, updated_at=None):
+    """Publish a status event once the current transaction commits"""
+    event = status_event(order_id, order_number, customer_id, status, updated_at)
+    topics = [order_topic(order_id), customer_topic(customer_id), STAFF_TOPIC]
+    # robust: a broker outage must not fail a request whose change is committed
+    transaction.on_commit(lambda: get_broker().publish(topics, event), robust=True)
+
+
+def publish_order_status(order):
+    publish_status_change(order.id, order.order_number, order.customer_id, order.status, order.updated_at)
@@ -0,0 +1,128 @@
+"""
+Streaming order exports for accounting.
+
+Orders are read with a server-side iterator in chunks of
+``EXPORT_CHUNK_SIZE``; each chunk prefetches its own items and payments, so
+memory use depends on the chunk size rather than on the size of the export.
+Rows are written to the response one at a time as CSV (one line per order
+item) or NDJSON (one object per order).
+"""
+import csv
+import json
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .models import OrderItem
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+ORDER_COLUMNS = [
+    'order_number', 'created_at', 'customer_email', 'customer_name', 'status',
+    'order_type', 'payment_status', 'payment_method', 'subtotal', 'tax',
+    'delivery_fee', 'total_amount', 'paid_amount', 'payment_references',
+]
+
+ITEM_COLUMNS = ['service', 'variant', 'quantity', 'unit_price', 'line_total']
+
+CSV_COLUMNS = ORDER_COLUMNS + ITEM_COLUMNS
+
+
+class Echo:
+    """File-like object whose ``write`` returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def export_queryset(queryset):
+    """Restrict ``queryset`` to what the export reads, in a stable order"""
+    from payments.models import Payment
+
+    return queryset.select_related('customer').only(
+        'id', 'order_number', 'created_at', 'status', 'order_type', 'payment_status',
+        'payment_method', 'subtotal', 'tax', 'delivery_fee', 'total_amount',
+        'customer__email', 'customer__first_name', 'customer__last_name',
+    ).prefetch_related(
+        Prefetch(
+            'items',
+            queryset=OrderItem.objects.select_related('service', 'variant').only(
+                'order_id', 'quantity', 'unit_price', 'total_price', 'service__name', 'variant__name',
+            ).order_by('id'),
+        ),
+        Prefetch(
+            'payments',
+            queryset=Payment.objects.only(
+                'order_id', 'amount', 'status', 'payment_method', 'gateway_payment_id', 'created_at',
+            ).order_by('created_at'),
+        ),
+    ).order_by('created_at', 'id')
+
+
+def _order_data(order):
+    payments = list(order.payments.all())
+    return {
+        'order_number': order.order_number,
+        'created_at': order.created_at,
+        'customer_email': order.customer.email,
+        'customer_name': order.customer.get_full_name(),
+        'status': order.status,
+        'order_type': order.order_type,
+        'payment_status': order.payment_status,
+        'payment_method': order.payment_method,
+        'subtotal': order.subtotal,
+        'tax': order.tax,
+        'delivery_fee': order.delivery_fee,
+        'total_amount': order.total_amount,
+        'paid_amount': sum(
+            (payment.amount for payment in payments if payment.status == 'completed'), Decimal('0.00')
+        ),
+        'payments': [
+            {
+                'method': payment.payment_method,
+                'amount': payment.amount,
+                'status': payment.status,
+                'reference': payment.gateway_payment_id,
+                'created_at': payment.created_at,
+            }
+            for payment in payments
+        ],
+        'items': [
+            {
+                'service': item.service.name,
+                'variant': item.variant.name if item.variant else '',
+                'quantity': item.quantity,
+                'unit_price': item.unit_price,
+                'line_total': item.total_price,
+            }
+            for item in order.items.all()
+        ],
+    }
+
+
+def iter_export_orders(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield one dict per order, with its items and payments"""
+    for order in export_queryset(queryset).iterator(chunk_size=chunk_size):
+        yield _order_data(order)
+
+
+def iter_csv(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield CSV lines: a header, then one line per order item"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for data in iter_export_orders(queryset, chunk_size):
+        references = ' '.join(
+            payment['reference'] for payment in data['payments'] if payment['reference']
+        )
+        order_row = [data[column] for column in ORDER_COLUMNS[:-1]] + [references]
+        # Orders without items still get a line so their totals are exported
+        for item in data['items'] or [dict.fromkeys(ITEM_COLUMNS, '')]:
+            yield writer.writerow(order_row + [item[column] for column in ITEM_COLUMNS])
+
+
+def iter_ndjson(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield one JSON line per order"""
+    for data in iter_export_orders(queryset, chunk_size):
+        yield json.dumps(data, cls=DjangoJSONEncoder) + '\n'
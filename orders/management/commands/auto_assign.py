@@ -0,0 +1,91 @@
+import random
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from orders.assignment import auto_assign, plan_assignments
+
+
+class Command(BaseCommand):
+    help = "Assign unassigned pickups and deliveries for a date to staff agents"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to assign (YYYY-MM-DD, default today)')
+        parser.add_argument('--kind', choices=['pickup', 'delivery', 'both'], default='both')
+        parser.add_argument('--time-slot', dest='time_slot', help='Only assign stops in this time slot')
+        parser.add_argument('--agent', dest='agent_ids', type=int, action='append', help='Agent user ID (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Plan the assignments without saving them')
+        parser.add_argument(
+            '--benchmark', type=int, metavar='STOPS',
+            help='Time the planner on STOPS synthetic stops instead of touching the database',
+        )
+        parser.add_argument('--agents', type=int, default=50, help='Synthetic agents for --benchmark')
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            return self.benchmark(options['benchmark'], options['agents'])
+
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+
+        kinds = ('pickup', 'delivery') if options['kind'] == 'both' else (options['kind'],)
+        started = time.perf_counter()
+        summary = auto_assign(
+            day,
+            kinds=kinds,
+            time_slot=options['time_slot'],
+            agent_ids=options['agent_ids'],
+            dry_run=options['dry_run'],
+        )
+        elapsed = time.perf_counter() - started
+
+        if not summary['agents']:
+            raise CommandError("No active staff agents available.")
+
+        for kind in kinds:
+            result = summary[kind]
+            self.stdout.write(
+                f"{kind}: {result['assigned']}/{result['stops']} stops assigned "
+                f"({result['schedules_updated']} updated, {result['schedules_created']} created)"
+            )
+            for agent in result['per_agent']:
+                self.stdout.write(f"  agent {agent['agent_id']}: {agent['stops']} stops in {agent['areas']} areas")
+
+        prefix = "Planned" if options['dry_run'] else "Assigned"
+        self.stdout.write(self.style.SUCCESS(f"{prefix} in {elapsed:.2f}s."))
+
+    def benchmark(self, stop_count, agent_count):
+        if agent_count < 1:
+            raise CommandError("--agents must be at least 1.")
+
+        rng = random.Random(42)
+        time_slots = ['9:00 AM - 12:00 PM', '12:00 PM - 3:00 PM', '3:00 PM - 6:00 PM', '6:00 PM - 9:00 PM']
+        # Skewed area sizes, like a few busy pincodes and a long tail
+        pincodes = [f'5600{n:02d}' for n in range(max(1, stop_count // 40))]
+        weights = [1 / (rank + 1) for rank in range(len(pincodes))]
+        stops = [
+            {
+                'key': ('schedule', n),
+                'time_slot': rng.choice(time_slots),
+                'area': f"pin:{rng.choices(pincodes, weights)[0]}",
+            }
+            for n in range(stop_count)
+        ]
+        agent_ids = list(range(1, agent_count + 1))
+
+        started = time.perf_counter()
+        plan = plan_assignments(stops, agent_ids)
+        elapsed = time.perf_counter() - started
+
+        loads = {}
+        for agent_id in plan.values():
+            loads[agent_id] = loads.get(agent_id, 0) + 1
+        self.stdout.write(
+            f"{len(plan)} stops, {len(pincodes)} areas, {agent_count} agents: "
+            f"load min {min(loads.values())} / max {max(loads.values())} stops per agent"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Planned in {elapsed * 1000:.1f}ms."))
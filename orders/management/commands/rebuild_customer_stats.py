@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.customer_stats import REBUILD_BATCH_SIZE, rebuild_customer_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-customer order statistics used by the order history and dashboard"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=REBUILD_BATCH_SIZE,
+            help=f'Customers recomputed per query (default {REBUILD_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        count = rebuild_customer_stats(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt order stats for {count} customers."))
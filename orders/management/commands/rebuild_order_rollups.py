@@ -0,0 +1,26 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.rollups import rebuild_daily_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily order rollups used by the admin dashboard"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last day to rebuild (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['date_from']) if options['date_from'] else None
+            end = date.fromisoformat(options['date_to']) if options['date_to'] else None
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+
+        if start and end and start > end:
+            raise CommandError("--from must not be after --to.")
+
+        count = rebuild_daily_rollups(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} daily rollup rows."))
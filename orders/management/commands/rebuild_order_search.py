@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from orders.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the order and customer search index used by support search and the admin"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = get_search_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} orders for search."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.totals import RECALCULATE_BATCH_SIZE, recalculate_all_order_totals
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored subtotal, tax, delivery fee and total of every order from its items"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=RECALCULATE_BATCH_SIZE,
+            help=f'Orders recomputed per query (default {RECALCULATE_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        count = recalculate_all_order_totals(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Updated the totals of {count} orders."))
@@ -0,0 +1,112 @@
+"""
+Route manifests for pickup and delivery agents.
+
+All stops in a date range are read with two queries (pickups and deliveries),
+each ordered by agent, and merged into one stream of plain dicts. The stream
+can be grouped per agent for a JSON payload or written out line by line.
+"""
+import heapq
+
+from django.db.models import F
+
+from .models import PickupSchedule, DeliverySchedule
+
+
+MANIFEST_CHUNK_SIZE = 2000
+
+_STOP_FIELDS = {
+    'schedule_id': F('id'),
+    'date': F('scheduled_date'),
+    'time_slot': F('scheduled_time_slot'),
+    'completed': F('is_completed'),
+    'order_ref': F('order_id'),
+    'order_number': F('order__order_number'),
+    'customer_first_name': F('order__customer__first_name'),
+    'customer_last_name': F('order__customer__last_name'),
+    'customer_phone': F('order__customer__userprofile__phone_number'),
+    'pickup_address': F('order__pickup_address'),
+    'delivery_address': F('order__delivery_address'),
+    'special_instructions': F('order__special_instructions'),
+}
+
+
+def _full_name(first_name, last_name):
+    return f"{first_name or ''} {last_name or ''}".strip()
+
+
+def _stops(model, stop_type, agent_field, date_from, date_to, agent_id=None, include_completed=False):
+    queryset = model.objects.filter(scheduled_date__gte=date_from, scheduled_date__lte=date_to)
+    if not include_completed:
+        queryset = queryset.filter(is_completed=False)
+    if agent_id is not None:
+        queryset = queryset.filter(**{f'{agent_field}_id': agent_id})
+
+    rows = queryset.order_by(
+        F(f'{agent_field}_id').asc(nulls_last=True), 'scheduled_date', 'id'
+    ).values(
+        agent_ref=F(f'{agent_field}_id'),
+        agent_first_name=F(f'{agent_field}__first_name'),
+        agent_last_name=F(f'{agent_field}__last_name'),
+        **_STOP_FIELDS
+    )
+
+    for row in rows.iterator(chunk_size=MANIFEST_CHUNK_SIZE):
+        if stop_type == 'delivery':
+            address = row['delivery_address'] or row['pickup_address']
+        else:
+            address = row['pickup_address']
+        yield {
+            'agent_id': row['agent_ref'],
+            'agent_name': _full_name(row['agent_first_name'], row['agent_last_name']) if row['agent_ref'] else None,
+            'type': stop_type,
+            'schedule_id': row['schedule_id'],
+            'order_id': row['order_ref'],
+            'order_number': row['order_number'],
+            'customer_name': _full_name(row['customer_first_name'], row['customer_last_name']),
+            'customer_phone': row['customer_phone'],
+            'address': address,
+            'date': row['date'],
+            'time_slot': row['time_slot'],
+            'special_instructions': row['special_instructions'],
+            'is_completed': row['completed'],
+        }
+
+
+def _sort_key(stop):
+    # Matches the ORDER BY of both querysets: agent (unassigned last), date, id
+    return (stop['agent_id'] is None, stop['agent_id'] or 0, stop['date'], stop['type'], stop['schedule_id'])
+
+
+def iter_manifest_stops(date_from, date_to, agent_id=None, include_completed=False):
+    """Yield every stop in the range, ordered by agent and date"""
+    pickups = _stops(PickupSchedule, 'pickup', 'pickup_agent', date_from, date_to, agent_id, include_completed)
+    deliveries = _stops(DeliverySchedule, 'delivery', 'delivery_agent', date_from, date_to, agent_id, include_completed)
+    return heapq.merge(pickups, deliveries, key=_sort_key)
+
+
+def build_manifest(date_from, date_to, agent_id=None, include_completed=False):
+    """Group the stops in the range per agent"""
+    agents = []
+    unassigned = []
+    current = None
+
+    for stop in iter_manifest_stops(date_from, date_to, agent_id, include_completed):
+        agent_ref = stop.pop('agent_id')
+        agent_name = stop.pop('agent_name')
+        if agent_ref is None:
+            unassigned.append(stop)
+            continue
+        if current is None or current['agent_id'] != agent_ref:
+            current = {'agent_id': agent_ref, 'agent_name': agent_name, 'stops': []}
+            agents.append(current)
+        current['stops'].append(stop)
+
+    for agent in agents:
+        agent['stop_count'] = len(agent['stops'])
+
+    return {
+        'date_from': date_from,
+        'date_to': date_to,
+        'agents': agents,
+        'unassigned': unassigned,
+    }
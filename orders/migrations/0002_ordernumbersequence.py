@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-16 20:45
+
+from django.db import migrations, models
+
+
+def seed_order_number_sequence(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    OrderNumberSequence = apps.get_model("orders", "OrderNumberSequence")
+
+    last_value = 0
+    for order_number in Order.objects.values_list("order_number", flat=True).iterator():
+        suffix = order_number[3:]  # Remove "ORD" prefix
+        if suffix.isdigit():
+            last_value = max(last_value, int(suffix))
+
+    OrderNumberSequence.objects.create(name="order_number", last_value=last_value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderNumberSequence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("last_value", models.PositiveBigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Order Number Sequence",
+                "verbose_name_plural": "Order Number Sequences",
+            },
+        ),
+        migrations.RunPython(seed_order_number_sequence, migrations.RunPython.noop),
+    ]
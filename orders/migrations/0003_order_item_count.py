@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-16 20:46
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_order_totals(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+
+    item_totals = {
+        row["order_id"]: row
+        for row in OrderItem.objects.values("order_id").annotate(
+            count=Count("id"), subtotal=Sum("total_price")
+        )
+    }
+
+    batch = []
+    for order in Order.objects.only("id").iterator():
+        row = item_totals.get(order.id, {})
+        subtotal = row.get("subtotal") or Decimal("0.00")
+        order.item_count = row.get("count", 0)
+        order.subtotal = subtotal
+        order.tax = subtotal * Decimal("0.05")
+        order.delivery_fee = Decimal("0.00") if subtotal >= 500 else Decimal("50.00")
+        order.total_amount = order.subtotal + order.tax + order.delivery_fee
+        batch.append(order)
+        if len(batch) >= 500:
+            Order.objects.bulk_update(
+                batch,
+                ["item_count", "subtotal", "tax", "delivery_fee", "total_amount"],
+            )
+            batch = []
+
+    if batch:
+        Order.objects.bulk_update(
+            batch, ["item_count", "subtotal", "tax", "delivery_fee", "total_amount"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0002_ordernumbersequence"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="item_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_order_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.4 on 2026-10-16 20:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0003_order_item_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="deliveryschedule",
+            index=models.Index(
+                fields=["scheduled_date", "is_completed"],
+                name="delivery_date_completed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="deliveryschedule",
+            index=models.Index(
+                condition=models.Q(("is_completed", False)),
+                fields=["scheduled_date"],
+                name="delivery_open_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["customer", "-created_at"], name="order_customer_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "-created_at"], name="order_status_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["payment_status", "-created_at"],
+                name="order_payment_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="order_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pickupschedule",
+            index=models.Index(
+                fields=["scheduled_date", "is_completed"],
+                name="pickup_date_completed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pickupschedule",
+            index=models.Index(
+                condition=models.Q(("is_completed", False)),
+                fields=["scheduled_date"],
+                name="pickup_open_date_idx",
+            ),
+        ),
+    ]
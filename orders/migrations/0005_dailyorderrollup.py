@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-16 20:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_deliveryschedule_delivery_date_completed_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyOrderRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True)),
+                ("order_count", models.PositiveIntegerField(default=0)),
+                ("paid_order_count", models.PositiveIntegerField(default=0)),
+                (
+                    "paid_revenue",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=14),
+                ),
+                ("pending_count", models.PositiveIntegerField(default=0)),
+                ("confirmed_count", models.PositiveIntegerField(default=0)),
+                ("picked_up_count", models.PositiveIntegerField(default=0)),
+                ("in_process_count", models.PositiveIntegerField(default=0)),
+                ("ready_count", models.PositiveIntegerField(default=0)),
+                ("out_for_delivery_count", models.PositiveIntegerField(default=0)),
+                ("delivered_count", models.PositiveIntegerField(default=0)),
+                ("cancelled_count", models.PositiveIntegerField(default=0)),
+                ("pending_pickups", models.PositiveIntegerField(default=0)),
+                ("pending_deliveries", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Daily Order Rollup",
+                "verbose_name_plural": "Daily Order Rollups",
+                "ordering": ["-date"],
+            },
+        ),
+    ]
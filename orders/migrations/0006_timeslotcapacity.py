@@ -0,0 +1,94 @@
+# Generated by Django 5.2.4 on 2026-10-16 21:00
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_slot_reservations(apps, schema_editor):
+    """Count the places already taken by open orders"""
+    Order = apps.get_model("orders", "Order")
+    TimeSlotCapacity = apps.get_model("orders", "TimeSlotCapacity")
+    default_capacity = getattr(settings, "ORDER_SLOT_CAPACITY", 20)
+
+    open_orders = Order.objects.exclude(status="cancelled")
+    reserved = {}
+    for row in (
+        open_orders.values("pickup_date", "pickup_time_slot")
+        .annotate(count=Count("id"))
+        .order_by()
+    ):
+        key = ("pickup", row["pickup_date"], row["pickup_time_slot"])
+        reserved[key] = row["count"]
+    for row in (
+        open_orders.exclude(delivery_date=None)
+        .exclude(delivery_time_slot=None)
+        .exclude(delivery_time_slot="")
+        .values("delivery_date", "delivery_time_slot")
+        .annotate(count=Count("id"))
+        .order_by()
+    ):
+        key = ("delivery", row["delivery_date"], row["delivery_time_slot"])
+        reserved[key] = row["count"]
+
+    TimeSlotCapacity.objects.bulk_create(
+        [
+            TimeSlotCapacity(
+                kind=kind,
+                date=date,
+                time_slot=time_slot,
+                capacity=max(default_capacity, count),
+                reserved=count,
+            )
+            for (kind, date, time_slot), count in reserved.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0005_dailyorderrollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TimeSlotCapacity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("pickup", "Pickup"), ("delivery", "Delivery")],
+                        max_length=10,
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("time_slot", models.CharField(max_length=50)),
+                ("capacity", models.PositiveIntegerField()),
+                ("reserved", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Time Slot Capacity",
+                "verbose_name_plural": "Time Slot Capacities",
+                "ordering": ["date", "kind", "time_slot"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("kind", "date", "time_slot"),
+                        name="unique_slot_capacity",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_slot_reservations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.4 on 2026-10-16 22:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+STATUSES = [
+    "pending",
+    "confirmed",
+    "picked_up",
+    "in_process",
+    "ready",
+    "out_for_delivery",
+    "delivered",
+    "cancelled",
+]
+
+
+def backfill_customer_stats(apps, schema_editor):
+    """Compute the stats of every customer that has orders"""
+    Order = apps.get_model("orders", "Order")
+    CustomerOrderStats = apps.get_model("orders", "CustomerOrderStats")
+
+    rows = (
+        Order.objects.values("customer_id")
+        .annotate(
+            total_orders=Count("id"),
+            total_spent=Sum("total_amount", filter=Q(payment_status="paid")),
+            **{
+                f"{status}_count": Count("id", filter=Q(status=status))
+                for status in STATUSES
+            },
+        )
+        .order_by()
+    )
+    stats = []
+    for values in rows:
+        values["total_spent"] = values["total_spent"] or 0
+        stats.append(CustomerOrderStats(**values))
+    CustomerOrderStats.objects.bulk_create(stats, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("orders", "0006_timeslotcapacity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerOrderStats",
+            fields=[
+                (
+                    "customer",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="order_stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("total_orders", models.PositiveIntegerField(default=0)),
+                (
+                    "total_spent",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=14),
+                ),
+                ("pending_count", models.PositiveIntegerField(default=0)),
+                ("confirmed_count", models.PositiveIntegerField(default=0)),
+                ("picked_up_count", models.PositiveIntegerField(default=0)),
+                ("in_process_count", models.PositiveIntegerField(default=0)),
+                ("ready_count", models.PositiveIntegerField(default=0)),
+                ("out_for_delivery_count", models.PositiveIntegerField(default=0)),
+                ("delivered_count", models.PositiveIntegerField(default=0)),
+                ("cancelled_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Customer Order Stats",
+                "verbose_name_plural": "Customer Order Stats",
+            },
+        ),
+        migrations.RunPython(backfill_customer_stats, migrations.RunPython.noop),
+    ]
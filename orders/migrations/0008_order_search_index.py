@@ -0,0 +1,53 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:10
+
+from django.db import migrations
+
+
+TOKENIZE = "unicode61 remove_diacritics 2"
+
+
+def create_search_tables(apps, schema_editor):
+    """Create and fill the FTS5 order and customer search tables on SQLite"""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS orders_order_search USING fts5("
+        "order_number, username, email, full_name, pickup_address, "
+        f"tokenize = '{TOKENIZE}', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS orders_customer_search USING fts5("
+        "username, email, full_name, "
+        f"tokenize = '{TOKENIZE}', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO orders_customer_search (rowid, username, email, full_name) "
+        "SELECT u.id, u.username, u.email, u.first_name || ' ' || u.last_name "
+        "FROM auth_user u"
+    )
+    schema_editor.execute(
+        "INSERT INTO orders_order_search "
+        "(rowid, order_number, username, email, full_name, pickup_address) "
+        "SELECT o.id, o.order_number || ' ' || ltrim(substr(o.order_number, 4), '0'), "
+        "u.username, u.email, u.first_name || ' ' || u.last_name, o.pickup_address "
+        "FROM orders_order o JOIN auth_user u ON u.id = o.customer_id"
+    )
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS orders_order_search")
+    schema_editor.execute("DROP TABLE IF EXISTS orders_customer_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("orders", "0007_customerorderstats"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -1,7 +1,22 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
 from services.models import Service, ServiceVariant
-from decimal import Decimal
+
+
+class OrderNumberSequence(models.Model):
+    """Counter row backing the block allocator in ``orders.sequences``"""
+    name = models.CharField(max_length=50, unique=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.last_value})"
+
+    class Meta:
+        verbose_name = "Order Number Sequence"
+        verbose_name_plural = "Order Number Sequences"
 
 
 class Order(models.Model):
@@ -39,6 +54,7 @@ class Order(models.Model):
     tax = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     delivery_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    item_count = models.PositiveIntegerField(default=0)
     
     # Payment
     payment_status = models.CharField(max_length=20, choices=[
@@ -62,43 +78,52 @@ class Order(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.order_number:
-            # Generate order number
-            last_order = Order.objects.order_by('-id').first()
-            if last_order:
-                last_number = int(last_order.order_number[3:])  # Remove "ORD" prefix
-                self.order_number = f"ORD{last_number + 1:06d}"
-            else:
-                self.order_number = "ORD000001"
+            # Generate order number from the per-worker block allocator
+            from .sequences import next_order_number
+            self.order_number = next_order_number()
         
-        # Calculate totals
-        self.calculate_totals()
+        # Totals are only recalculated when items change (see update_totals);
+        # a new order starts from the totals of an empty cart.
+        if self._state.adding:
+            self.calculate_totals(items=[])
         super().save(*args, **kwargs)
     
-    def calculate_totals(self):
+    def calculate_totals(self, items=None):
         """Calculate order totals based on items"""
-        try:
-            subtotal = sum(item.total_price for item in self.items.all())
-        except ValueError:
-            # Handle case when order doesn't have a primary key yet
-            subtotal = Decimal('0.00')
-        
-        self.subtotal = subtotal
+        from services.pricing import cart_totals
+        if items is None:
+            items = list(self.items.all())
         
-        # Calculate tax (assuming 5% GST)
-        self.tax = subtotal * Decimal('0.05')
-        
-        # Calculate delivery fee (free for orders above ₹500, else ₹50)
-        if subtotal >= 500:
-            self.delivery_fee = Decimal('0.00')
-        else:
-            self.delivery_fee = Decimal('50.00')
-        
-        self.total_amount = self.subtotal + self.tax + self.delivery_fee
+        totals = cart_totals(item.total_price for item in items)
+        self.item_count = totals.item_count
+        self.subtotal = totals.subtotal
+        self.tax = totals.tax
+        self.delivery_fee = totals.delivery_fee
+        self.total_amount = totals.total_amount
+    
+    def update_totals(self, items=None):
+        """Recalculate and store the totals after the order's items changed"""
+        self.calculate_totals(items)
+        self.save(update_fields=[
+            'item_count', 'subtotal', 'tax', 'delivery_fee', 'total_amount', 'updated_at'
+        ])
+        if self.payment_status == 'paid':
+            # A paid order's total counts towards the customer's total spent
+            from .customer_stats import refresh_customer_stats
+            refresh_customer_stats(self.customer_id)
     
     class Meta:
         verbose_name = "Order"
         verbose_name_plural = "Orders"
         ordering = ['-created_at']
+        indexes = [
+            # Customer order list and history
+            models.Index(fields=['customer', '-created_at'], name='order_customer_created_idx'),
+            # Admin list filters and keyset pagination
+            models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+            models.Index(fields=['payment_status', '-created_at'], name='order_payment_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+        ]
 
 
 class OrderItem(models.Model):
@@ -122,13 +147,22 @@ class OrderItem(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.unit_price:
-            if self.variant:
-                self.unit_price = self.variant.final_price
-            else:
-                self.unit_price = self.service.base_price
+            from services.pricing import load_tier_indexes, tier_unit_price
+            list_price = self.variant.final_price if self.variant else self.service.base_price
+            tiers = load_tier_indexes([self.service_id]).get((self.service_id, self.variant_id))
+            self.unit_price = tier_unit_price(list_price, tiers, self.quantity)
         
         self.total_price = self.unit_price * self.quantity
         super().save(*args, **kwargs)
+        
+        # Keep the stored order totals in sync
+        self.order.update_totals()
+    
+    def delete(self, *args, **kwargs):
+        order = self.order
+        result = super().delete(*args, **kwargs)
+        order.update_totals()
+        return result
     
     class Meta:
         verbose_name = "Order Item"
@@ -168,6 +202,15 @@ class PickupSchedule(models.Model):
     class Meta:
         verbose_name = "Pickup Schedule"
         verbose_name_plural = "Pickup Schedules"
+        indexes = [
+            models.Index(fields=['scheduled_date', 'is_completed'], name='pickup_date_completed_idx'),
+            # Open pickups for the day and the dashboard's pending count
+            models.Index(
+                fields=['scheduled_date'],
+                condition=models.Q(is_completed=False),
+                name='pickup_open_date_idx',
+            ),
+        ]
 
 
 class DeliverySchedule(models.Model):
@@ -187,3 +230,174 @@ class DeliverySchedule(models.Model):
     class Meta:
         verbose_name = "Delivery Schedule"
         verbose_name_plural = "Delivery Schedules"
+        indexes = [
+            models.Index(fields=['scheduled_date', 'is_completed'], name='delivery_date_completed_idx'),
+            # Open deliveries for the day and the dashboard's pending count
+            models.Index(
+                fields=['scheduled_date'],
+                condition=models.Q(is_completed=False),
+                name='delivery_open_date_idx',
+            ),
+        ]
+
+
+class DailyOrderRollup(models.Model):
+    """Per-day order counters behind the admin dashboard, maintained by ``orders.rollups``"""
+    date = models.DateField(unique=True)
+    order_count = models.PositiveIntegerField(default=0)
+    paid_order_count = models.PositiveIntegerField(default=0)
+    paid_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    
+    # Status breakdown of the orders created that day
+    pending_count = models.PositiveIntegerField(default=0)
+    confirmed_count = models.PositiveIntegerField(default=0)
+    picked_up_count = models.PositiveIntegerField(default=0)
+    in_process_count = models.PositiveIntegerField(default=0)
+    ready_count = models.PositiveIntegerField(default=0)
+    out_for_delivery_count = models.PositiveIntegerField(default=0)
+    delivered_count = models.PositiveIntegerField(default=0)
+    cancelled_count = models.PositiveIntegerField(default=0)
+    
+    # Open pickups and deliveries scheduled for that day
+    pending_pickups = models.PositiveIntegerField(default=0)
+    pending_deliveries = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Rollup for {self.date}"
+    
+    class Meta:
+        verbose_name = "Daily Order Rollup"
+        verbose_name_plural = "Daily Order Rollups"
+        ordering = ['-date']
+
+
+class CustomerOrderStats(models.Model):
+    """Order counters for one customer, maintained by ``orders.customer_stats``"""
+    customer = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='order_stats')
+    total_orders = models.PositiveIntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    
+    # Status breakdown of the customer's orders
+    pending_count = models.PositiveIntegerField(default=0)
+    confirmed_count = models.PositiveIntegerField(default=0)
+    picked_up_count = models.PositiveIntegerField(default=0)
+    in_process_count = models.PositiveIntegerField(default=0)
+    ready_count = models.PositiveIntegerField(default=0)
+    out_for_delivery_count = models.PositiveIntegerField(default=0)
+    delivered_count = models.PositiveIntegerField(default=0)
+    cancelled_count = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Order stats for {self.customer_id}"
+    
+    class Meta:
+        verbose_name = "Customer Order Stats"
+        verbose_name_plural = "Customer Order Stats"
+
+
+class TimeSlotCapacity(models.Model):
+    """Booking counter for one pickup or delivery time slot, maintained by ``orders.slots``"""
+    KIND_CHOICES = [
+        ('pickup', 'Pickup'),
+        ('delivery', 'Delivery'),
+    ]
+    
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    date = models.DateField()
+    time_slot = models.CharField(max_length=50)
+    capacity = models.PositiveIntegerField()
+    reserved = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.date} {self.time_slot} ({self.reserved}/{self.capacity})"
+    
+    @property
+    def available(self):
+        return max(self.capacity - self.reserved, 0)
+    
+    class Meta:
+        verbose_name = "Time Slot Capacity"
+        verbose_name_plural = "Time Slot Capacities"
+        ordering = ['date', 'kind', 'time_slot']
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'date', 'time_slot'], name='unique_slot_capacity'),
+        ]
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def refresh_order_rollup(sender, instance, **kwargs):
+    from .rollups import schedule_rollup_refresh
+    schedule_rollup_refresh(instance.created_at)
+
+
+@receiver(post_delete, sender=Order)
+def refresh_customer_order_stats(sender, instance, **kwargs):
+    from .customer_stats import refresh_customer_stats
+    refresh_customer_stats(instance.customer_id, create=False)
+
+
+@receiver(pre_save, sender=PickupSchedule)
+@receiver(pre_save, sender=DeliverySchedule)
+def remember_scheduled_date(sender, instance, update_fields=None, **kwargs):
+    # A schedule moved to another day also has to leave the old day's rollup
+    instance._previous_scheduled_date = None
+    if instance._state.adding or (update_fields is not None and 'scheduled_date' not in update_fields):
+        return
+    instance._previous_scheduled_date = (
+        sender.objects.filter(pk=instance.pk).values_list('scheduled_date', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=PickupSchedule)
+@receiver(post_delete, sender=PickupSchedule)
+@receiver(post_save, sender=DeliverySchedule)
+@receiver(post_delete, sender=DeliverySchedule)
+def refresh_schedule_rollup(sender, instance, **kwargs):
+    from .rollups import schedule_rollup_refresh
+    schedule_rollup_refresh(instance.scheduled_date, getattr(instance, '_previous_scheduled_date', None))
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=OrderStatusHistory)
+@receiver(post_save, sender=PickupSchedule)
+@receiver(post_save, sender=DeliverySchedule)
+def invalidate_order_tracking(sender, instance, **kwargs):
+    from .tracking import invalidate_tracking_snapshot
+    order_id = instance.pk if sender is Order else instance.order_id
+    invalidate_tracking_snapshot(order_id)
+
+
+@receiver(post_save, sender=Order)
+def index_order_for_search(sender, instance, update_fields=None, **kwargs):
+    from .search import ORDER_INDEXED_FIELDS, get_search_backend
+    if update_fields is not None and not ORDER_INDEXED_FIELDS & set(update_fields):
+        return
+    get_search_backend().index_orders([instance.pk])
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_from_search(sender, instance, **kwargs):
+    from .search import get_search_backend
+    get_search_backend().remove_orders([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def index_customer_for_search(sender, instance, created, update_fields=None, **kwargs):
+    from .search import CUSTOMER_INDEXED_FIELDS, get_search_backend
+    # Logins only save last_login
+    if update_fields is not None and not CUSTOMER_INDEXED_FIELDS & set(update_fields):
+        return
+    # A new user has no orders to rewrite yet
+    get_search_backend().index_customers([instance.pk], with_orders=not created)
+
+
+@receiver(post_delete, sender=User)
+def remove_customer_from_search(sender, instance, **kwargs):
+    from .search import get_search_backend
+    get_search_backend().remove_customers([instance.pk])
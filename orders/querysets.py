@@ -0,0 +1,26 @@
+"""
+Order querysets shaped for ``OrderSerializer``.
+
+``OrderSerializer.related_lookups`` declares the joins and prefetches each
+field needs: the customer and both schedules with their agents are joined,
+the items are prefetched with their service, category and variant, and the
+status history with ``updated_by``. ``order_detail_queryset`` applies them, so
+loading and serializing one order costs the same few queries however many
+items and history rows it has.
+"""
+from .models import Order
+from .serializers import OrderSerializer
+
+
+# What the tracking snapshot reads besides the order row
+TRACKING_FIELDS = ('status_history', 'pickup_schedule', 'delivery_schedule')
+
+
+def order_detail_queryset(queryset=None, request=None, fields=None):
+    """
+    ``queryset`` (all orders by default) with what ``OrderSerializer`` renders
+    for ``request`` joined and prefetched, or only what ``fields`` need.
+    """
+    if queryset is None:
+        queryset = Order.objects.all()
+    return OrderSerializer.shape_queryset(queryset, request=request, fields=fields)
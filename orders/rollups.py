@@ -0,0 +1,166 @@
+"""
+Daily order rollups for the admin dashboard.
+
+Each ``DailyOrderRollup`` row holds the counters for the orders created on one
+day and the pickups/deliveries scheduled for it. Rows are refreshed after the
+transaction that changed an order or schedule commits, one day at a time, and
+can be rebuilt in bulk with ``manage.py rebuild_order_rollups``.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyOrderRollup, DeliverySchedule, Order, PickupSchedule
+
+
+STATUS_FIELDS = {status: f'{status}_count' for status, _ in Order.STATUS_CHOICES}
+
+COUNTER_FIELDS = [
+    'order_count', 'paid_order_count', 'paid_revenue',
+    *STATUS_FIELDS.values(),
+    'pending_pickups', 'pending_deliveries',
+]
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class _RollupRefresh:
+    """on_commit callback for one day; equal callbacks are only queued once"""
+
+    def __init__(self, day):
+        self.day = day
+
+    def __call__(self):
+        rebuild_daily_rollups(self.day, self.day)
+
+    def __eq__(self, other):
+        return isinstance(other, _RollupRefresh) and other.day == self.day
+
+    def __hash__(self):
+        return hash(self.day)
+
+
+def schedule_rollup_refresh(*days, using=None):
+    """Refresh the rollup rows for ``days`` once the current transaction commits"""
+    connection = transaction.get_connection(using)
+    for day in {_as_date(day) for day in days if day is not None}:
+        refresh = _RollupRefresh(day)
+        if any(callback[1] == refresh for callback in connection.run_on_commit):
+            continue
+        transaction.on_commit(refresh, using=using)
+
+
+def rebuild_daily_rollups(start=None, end=None):
+    """
+    Recompute the rollup rows between ``start`` and ``end`` (inclusive).
+
+    Without bounds every row is rebuilt from the full order history.
+    Returns the number of rollup rows written.
+    """
+    orders = Order.objects.all()
+    pickups = PickupSchedule.objects.filter(is_completed=False)
+    deliveries = DeliverySchedule.objects.filter(is_completed=False)
+    rollups = DailyOrderRollup.objects.all()
+
+    if start is not None:
+        orders = orders.filter(created_at__gte=_start_of_day(start))
+        pickups = pickups.filter(scheduled_date__gte=start)
+        deliveries = deliveries.filter(scheduled_date__gte=start)
+        rollups = rollups.filter(date__gte=start)
+    if end is not None:
+        orders = orders.filter(created_at__lt=_start_of_day(end + timedelta(days=1)))
+        pickups = pickups.filter(scheduled_date__lte=end)
+        deliveries = deliveries.filter(scheduled_date__lte=end)
+        rollups = rollups.filter(date__lte=end)
+
+    paid = Q(payment_status='paid')
+    order_rows = orders.annotate(day=TruncDate('created_at')).values('day').annotate(
+        order_count=Count('id'),
+        paid_order_count=Count('id', filter=paid),
+        paid_revenue=Sum('total_amount', filter=paid),
+        **{
+            field: Count('id', filter=Q(status=status))
+            for status, field in STATUS_FIELDS.items()
+        }
+    ).order_by()
+
+    rows = {}
+
+    def row_for(day):
+        if day not in rows:
+            rows[day] = DailyOrderRollup(date=day)
+        return rows[day]
+
+    for values in order_rows:
+        rollup = row_for(values.pop('day'))
+        values['paid_revenue'] = values['paid_revenue'] or 0
+        for field, value in values.items():
+            setattr(rollup, field, value)
+
+    for schedules, field in ((pickups, 'pending_pickups'), (deliveries, 'pending_deliveries')):
+        for values in schedules.values('scheduled_date').annotate(count=Count('id')).order_by():
+            setattr(row_for(values['scheduled_date']), field, values['count'])
+
+    # A single-day refresh always writes its row, even if it is all zeros
+    if start is not None and start == end:
+        row_for(start)
+
+    with transaction.atomic():
+        rollups.exclude(date__in=list(rows)).delete()
+        DailyOrderRollup.objects.bulk_create(
+            rows.values(),
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=COUNTER_FIELDS + ['updated_at'],
+        )
+    return len(rows)
+
+
+def dashboard_totals(today=None):
+    """Order, revenue, status and pending-action totals for the admin dashboard"""
+    today = today or timezone.localdate()
+    last_week = today - timedelta(days=7)
+    last_month = today - timedelta(days=30)
+
+    periods = {
+        'total': None,
+        'today': Q(date=today),
+        'week': Q(date__gte=last_week),
+        'month': Q(date__gte=last_month),
+    }
+    aggregates = {}
+    for period, condition in periods.items():
+        aggregates[f'orders_{period}'] = Sum('order_count', filter=condition)
+        aggregates[f'revenue_{period}'] = Sum('paid_revenue', filter=condition)
+    for status, field in STATUS_FIELDS.items():
+        aggregates[f'status_{status}'] = Sum(field)
+    aggregates['pending_pickups'] = Sum('pending_pickups', filter=Q(date__gte=today))
+    aggregates['pending_deliveries'] = Sum('pending_deliveries', filter=Q(date__gte=today))
+
+    totals = DailyOrderRollup.objects.aggregate(**aggregates)
+
+    return {
+        'orders': {period: totals[f'orders_{period}'] or 0 for period in periods},
+        'revenue': {period: totals[f'revenue_{period}'] or 0 for period in periods},
+        'status_breakdown': {
+            status: totals[f'status_{status}']
+            for status in STATUS_FIELDS
+            if totals[f'status_{status}']
+        },
+        'pending_actions': {
+            'pickups': totals['pending_pickups'] or 0,
+            'deliveries': totals['pending_deliveries'] or 0,
+        },
+    }
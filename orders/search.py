@@ -0,0 +1,216 @@
+"""
+Order and customer search for support agents.
+
+``ORDER_SEARCH_BACKEND`` selects where the search runs:
+
+- ``fts5`` (default) keeps two SQLite FTS5 tables, one row per order and one
+  per customer, and answers queries from them ranked by BM25. Every word of
+  the query is matched as a prefix, so ``jan 0004`` finds Jane's order
+  ``ORD000042``. Rows are rewritten in the transaction that saves the order or
+  user, and can be rebuilt with ``manage.py rebuild_order_search``.
+- ``database`` runs the ``icontains`` lookups the admin used to, on any
+  database, without an index or ranking.
+"""
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from dryclean_project.fts import FTS5Backend, backend_getter, placeholders, query_words
+from .models import Order
+from .sequences import ORDER_NUMBER_PREFIX
+
+
+ORDER_TABLE = 'orders_order_search'
+CUSTOMER_TABLE = 'orders_customer_search'
+
+# Fields whose change needs the order or customer row to be rewritten
+ORDER_INDEXED_FIELDS = {'order_number', 'customer', 'pickup_address'}
+CUSTOMER_INDEXED_FIELDS = {'username', 'email', 'first_name', 'last_name'}
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class DatabaseSearchBackend:
+    """Unindexed ``icontains`` search over the model fields"""
+
+    order_fields = ('order_number', 'customer__username', 'customer__email', 'pickup_address')
+    customer_fields = ('username', 'email', 'first_name', 'last_name')
+
+    def index_orders(self, order_ids):
+        pass
+
+    def index_customers(self, customer_ids, with_orders=True):
+        pass
+
+    def remove_orders(self, order_ids):
+        pass
+
+    def remove_customers(self, customer_ids):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def _filter(self, fields, query):
+        condition = Q()
+        for word in query_words(query):
+            condition &= Q(*[Q(**{f'{field}__icontains': word}) for field in fields], _connector=Q.OR)
+        return condition
+
+    def order_filter(self, query):
+        return self._filter(self.order_fields, query)
+
+    def customer_filter(self, query):
+        return self._filter(self.customer_fields, query)
+
+    def search_orders(self, query, limit=DEFAULT_LIMIT):
+        if not query_words(query):
+            return []
+        orders = Order.objects.filter(self.order_filter(query)).order_by('-created_at')
+        return list(orders.values_list('id', flat=True)[:limit])
+
+    def search_customers(self, query, limit=DEFAULT_LIMIT):
+        if not query_words(query):
+            return []
+        customers = User.objects.filter(self.customer_filter(query)).order_by('username')
+        return list(customers.values_list('id', flat=True)[:limit])
+
+
+class FTS5SearchBackend(FTS5Backend):
+    """
+    SQLite FTS5 tables keyed by the order and user primary keys.
+
+    Order rows hold the order number (with its bare number, so ``42`` matches
+    ``ORD000042``), the customer's username, email and name, and the pickup
+    address. Rows are written with ``INSERT ... SELECT`` straight from the
+    order and user tables, so indexing never loads model instances.
+    """
+
+    # BM25 weights per column: order number, username, email, name, address
+    order_weights = (10.0, 5.0, 5.0, 3.0, 1.0)
+    # username, email, name
+    customer_weights = (5.0, 5.0, 3.0)
+
+    def _write_orders(self, where, params):
+        self._execute(f"DELETE FROM {ORDER_TABLE} WHERE rowid IN (SELECT o.id FROM orders_order o WHERE {where})", params)
+        self._execute(
+            f"""
+            INSERT INTO {ORDER_TABLE} (rowid, order_number, username, email, full_name, pickup_address)
+            SELECT o.id,
+                   o.order_number || ' ' || ltrim(substr(o.order_number, %s), '0'),
+                   u.username, u.email, u.first_name || ' ' || u.last_name, o.pickup_address
+            FROM orders_order o JOIN auth_user u ON u.id = o.customer_id
+            WHERE {where}
+            """,
+            [len(ORDER_NUMBER_PREFIX) + 1, *params],
+        )
+
+    def _write_customers(self, where, params):
+        self._execute(f"DELETE FROM {CUSTOMER_TABLE} WHERE rowid IN (SELECT u.id FROM auth_user u WHERE {where})", params)
+        self._execute(
+            f"""
+            INSERT INTO {CUSTOMER_TABLE} (rowid, username, email, full_name)
+            SELECT u.id, u.username, u.email, u.first_name || ' ' || u.last_name
+            FROM auth_user u
+            WHERE {where}
+            """,
+            params,
+        )
+
+    def _remove(self, table, ids):
+        ids = list(ids)
+        if ids:
+            self._execute(f"DELETE FROM {table} WHERE rowid IN ({placeholders(ids)})", ids)
+
+    def index_orders(self, order_ids):
+        order_ids = list(order_ids)
+        if order_ids:
+            self._write_orders(f"o.id IN ({placeholders(order_ids)})", order_ids)
+
+    def index_customers(self, customer_ids, with_orders=True):
+        """Rewrite the customer rows, and unless told otherwise the rows of their orders"""
+        customer_ids = list(customer_ids)
+        if not customer_ids:
+            return
+        self._write_customers(f"u.id IN ({placeholders(customer_ids)})", customer_ids)
+        if with_orders:
+            self._write_orders(f"o.customer_id IN ({placeholders(customer_ids)})", customer_ids)
+
+    def remove_orders(self, order_ids):
+        self._remove(ORDER_TABLE, order_ids)
+
+    def remove_customers(self, customer_ids):
+        self._remove(CUSTOMER_TABLE, customer_ids)
+
+    def rebuild(self):
+        """Rewrite both tables from scratch; returns the number of orders indexed"""
+        self._execute(f"DELETE FROM {ORDER_TABLE}")
+        self._execute(f"DELETE FROM {CUSTOMER_TABLE}")
+        self._write_customers('1 = 1', [])
+        self._write_orders('1 = 1', [])
+        self._optimize(ORDER_TABLE, CUSTOMER_TABLE)
+        return Order.objects.count()
+
+    def _matching_ids(self, table, query):
+        match = self.match_expression(query)
+        if match is None:
+            return None
+        return RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [match])
+
+    def order_filter(self, query):
+        ids = self._matching_ids(ORDER_TABLE, query)
+        return Q() if ids is None else Q(id__in=ids)
+
+    def customer_filter(self, query):
+        ids = self._matching_ids(CUSTOMER_TABLE, query)
+        return Q() if ids is None else Q(id__in=ids)
+
+    def _ranked(self, table, weights, query, limit):
+        match = self.match_expression(query)
+        if match is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT rowid FROM {table} WHERE {table} MATCH %s
+                ORDER BY bm25({table}, {', '.join(str(weight) for weight in weights)}), rowid DESC
+                LIMIT %s
+                """,
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def search_orders(self, query, limit=DEFAULT_LIMIT):
+        return self._ranked(ORDER_TABLE, self.order_weights, query, limit)
+
+    def search_customers(self, query, limit=DEFAULT_LIMIT):
+        return self._ranked(CUSTOMER_TABLE, self.customer_weights, query, limit)
+
+
+get_search_backend = backend_getter(
+    'ORDER_SEARCH_BACKEND', {'fts5': FTS5SearchBackend, 'database': DatabaseSearchBackend}
+)
+
+
+def _in_order(objects, ids):
+    by_id = {obj.pk: obj for obj in objects}
+    return [by_id[pk] for pk in ids if pk in by_id]
+
+
+def search_orders(query, limit=DEFAULT_LIMIT, queryset=None):
+    """The orders matching ``query``, best match first"""
+    ids = get_search_backend().search_orders(query, limit)
+    if not ids:
+        return []
+    queryset = Order.objects.all() if queryset is None else queryset
+    return _in_order(queryset.filter(id__in=ids), ids)
+
+
+def search_customers(query, limit=DEFAULT_LIMIT):
+    """The users matching ``query``, best match first"""
+    ids = get_search_backend().search_customers(query, limit)
+    if not ids:
+        return []
+    return _in_order(User.objects.filter(id__in=ids), ids)
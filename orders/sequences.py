@@ -0,0 +1,114 @@
+"""
+Block-based allocator for human readable order numbers.
+
+Each worker thread reserves a block of numbers from the ``OrderNumberSequence``
+counter row with a single atomic UPDATE and then hands them out from memory, so
+creating an order never scans the orders table and concurrent checkouts can
+never be given the same number.
+
+A block reserved inside a transaction only becomes reusable once that
+transaction commits. If it is rolled back the counter update is rolled back too,
+so the rest of the block is dropped instead of being handed out a second time.
+A forked worker process starts without a block, so it never shares one with
+its parent.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import OrderNumberSequence
+
+
+ORDER_NUMBER_PREFIX = 'ORD'
+ORDER_SEQUENCE_NAME = 'order_number'
+
+
+class _Block:
+    __slots__ = ('next_value', 'last_value', 'committed')
+
+    def __init__(self, first_value, last_value):
+        self.next_value = first_value
+        self.last_value = last_value
+        self.committed = False
+
+    def mark_committed(self):
+        self.committed = True
+
+    def is_pending(self, connection):
+        # Django drops on_commit callbacks of rolled back transactions and
+        # savepoints, so a missing callback means the reservation is gone.
+        return any(
+            callback[1] == self.mark_committed
+            for callback in connection.run_on_commit
+        )
+
+
+class SequenceAllocator:
+    """Hands out increasing integers for a named sequence, one block at a time"""
+
+    def __init__(self, name, block_size=None):
+        self.name = name
+        self._block_size = block_size
+        self._local = threading.local()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.reset)
+
+    @property
+    def block_size(self):
+        if self._block_size is not None:
+            return self._block_size
+        return max(1, getattr(settings, 'ORDER_NUMBER_BLOCK_SIZE', 20))
+
+    def next_value(self, using=None):
+        connection = transaction.get_connection(using)
+        block = getattr(self._local, 'block', None)
+
+        # A block that was never committed is only usable while the
+        # transaction that reserved it is still open.
+        if block is not None and not block.committed and not block.is_pending(connection):
+            block = None
+
+        if block is None or block.next_value > block.last_value:
+            block = self._reserve_block(using)
+            self._local.block = block
+
+        value = block.next_value
+        block.next_value += 1
+        return value
+
+    def reset(self):
+        """Drop the cached block for the current thread"""
+        self._local.block = None
+
+    def _reserve_block(self, using=None):
+        size = self.block_size
+        with transaction.atomic(using=using):
+            sequences = OrderNumberSequence.objects.using(using).filter(name=self.name)
+            updated = sequences.update(last_value=F('last_value') + size)
+            if not updated:
+                try:
+                    with transaction.atomic(using=using):
+                        OrderNumberSequence.objects.using(using).create(name=self.name, last_value=size)
+                except IntegrityError:
+                    # Another worker created the row first
+                    sequences.update(last_value=F('last_value') + size)
+            last_value = sequences.values_list('last_value', flat=True).get()
+
+        block = _Block(last_value - size + 1, last_value)
+        transaction.on_commit(block.mark_committed, using=using)
+        return block
+
+
+order_number_allocator = SequenceAllocator(ORDER_SEQUENCE_NAME)
+
+
+def format_order_number(value):
+    return f"{ORDER_NUMBER_PREFIX}{value:06d}"
+
+
+def next_order_number(using=None):
+    """Return the next unused order number, e.g. ``ORD000042``"""
+    return format_order_number(order_number_allocator.next_value(using=using))
@@ -1,8 +1,19 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Prefetch
+from .customer_stats import refresh_customer_stats
+from .events import publish_order_status
 from .models import Order, OrderItem, OrderStatusHistory, PickupSchedule, DeliverySchedule
+from .slots import (
+    SlotUnavailable, UnknownTimeSlot, configured_time_slots, move_order_slots, release_order_slots,
+    reserve_order_slots, slot_state,
+)
+from .transitions import can_transition, transition_error
 from services.models import Service, ServiceVariant
+from services.pricing import load_tier_indexes, tier_unit_price
 from accounts.serializers import UserSerializer
+from dryclean_project.fieldsets import SparseFieldsetMixin
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -55,13 +66,58 @@ class DeliveryScheduleSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class TimeSlotFieldsMixin:
+    """
+    New pickup and delivery slots must be one of ``ORDER_TIME_SLOTS``.
+    
+    An order booked under an older slot list may send its own slot back
+    unchanged.
+    """
+    
+    def validate_time_slot(self, field, value):
+        if value and value != getattr(self.instance, field, None) and value not in configured_time_slots():
+            raise serializers.ValidationError(f"{value} is not a bookable time slot.")
+        return value
+    
+    def validate_pickup_time_slot(self, value):
+        return self.validate_time_slot('pickup_time_slot', value)
+    
+    def validate_delivery_time_slot(self, value):
+        return self.validate_time_slot('delivery_time_slot', value)
+    
+    def slot_unavailable(self, error):
+        field = 'pickup_time_slot' if error.kind == 'pickup' else 'delivery_time_slot'
+        return serializers.ValidationError({field: [str(error)]})
+
+
+ORDER_ITEMS_PREFETCH = Prefetch(
+    'items', queryset=OrderItem.objects.select_related('service__category', 'variant')
+)
+
+
+class OrderSerializer(TimeSlotFieldsMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     customer = UserSerializer(read_only=True)
     items = OrderItemSerializer(many=True, read_only=True)
     status_history = OrderStatusHistorySerializer(many=True, read_only=True)
     pickup_schedule = PickupScheduleSerializer(read_only=True)
     delivery_schedule = DeliveryScheduleSerializer(read_only=True)
-    total_amount = serializers.SerializerMethodField()
+    
+    expandable_fields = {
+        'customer': True,
+        'items': False,
+        'status_history': False,
+        'pickup_schedule': False,
+        'delivery_schedule': False,
+    }
+    related_lookups = {
+        'customer': (['customer'], []),
+        'items': ([], [ORDER_ITEMS_PREFETCH]),
+        'status_history': ([], [Prefetch(
+            'status_history', queryset=OrderStatusHistory.objects.select_related('updated_by')
+        )]),
+        'pickup_schedule': (['pickup_schedule__pickup_agent'], []),
+        'delivery_schedule': (['delivery_schedule__delivery_agent'], []),
+    }
     
     class Meta:
         model = Order
@@ -75,54 +131,34 @@ class OrderSerializer(serializers.ModelSerializer):
             'pickup_schedule', 'delivery_schedule', 'created_at', 'updated_at'
         ]
         read_only_fields = [
-            'id', 'order_number', 'subtotal', 'tax', 'delivery_fee', 'created_at', 'updated_at'
+            'id', 'order_number', 'subtotal', 'tax', 'delivery_fee', 'total_amount',
+            'created_at', 'updated_at'
         ]
     
-    def get_total_amount(self, obj):
-        """Calculate total amount dynamically from order items"""
-        try:
-            # Calculate subtotal from order items
-            subtotal = sum(item.total_price for item in obj.items.all())
-            
-            # Calculate tax (5% GST)
-            tax = subtotal * 0.05
-            
-            # Calculate delivery fee (free for orders above ₹500, else ₹50)
-            delivery_fee = 0 if subtotal >= 500 else 50
-            
-            # Calculate total
-            total = subtotal + tax + delivery_fee
-            
-            return total
-        except Exception:
-            # Fallback to stored value if calculation fails
-            return obj.total_amount
+    def update(self, instance, validated_data):
+        before = slot_state(instance)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            # A new date or slot (or a cancellation) moves the booked places;
+            # a retired slot cannot be taken on another day
+            try:
+                move_order_slots(before, instance)
+            except (SlotUnavailable, UnknownTimeSlot) as e:
+                raise self.slot_unavailable(e)
+        return instance
 
 
 class CreateOrderItemSerializer(serializers.Serializer):
+    # Services and variants are looked up for the whole cart at once in
+    # CreateOrderSerializer.validate_items
     service_id = serializers.IntegerField()
     variant_id = serializers.IntegerField(required=False, allow_null=True)
     quantity = serializers.IntegerField(min_value=1)
     description = serializers.CharField(required=False, allow_blank=True)
     special_instructions = serializers.CharField(required=False, allow_blank=True)
-    
-    def validate_service_id(self, value):
-        try:
-            Service.objects.get(id=value, is_active=True)
-        except Service.DoesNotExist:
-            raise serializers.ValidationError("Service not found or inactive.")
-        return value
-    
-    def validate_variant_id(self, value):
-        if value:
-            try:
-                ServiceVariant.objects.get(id=value, is_active=True)
-            except ServiceVariant.DoesNotExist:
-                raise serializers.ValidationError("Service variant not found or inactive.")
-        return value
 
 
-class CreateOrderSerializer(serializers.ModelSerializer):
+class CreateOrderSerializer(TimeSlotFieldsMixin, serializers.ModelSerializer):
     items = CreateOrderItemSerializer(many=True)
     
     class Meta:
@@ -136,6 +172,25 @@ class CreateOrderSerializer(serializers.ModelSerializer):
     def validate_items(self, value):
         if not value:
             raise serializers.ValidationError("At least one item is required.")
+        
+        # Load every service, variant and quantity tier in the cart with one query each
+        service_ids = {item['service_id'] for item in value}
+        variant_ids = {item['variant_id'] for item in value if item.get('variant_id')}
+        self._services = Service.objects.filter(is_active=True).in_bulk(service_ids)
+        self._variants = ServiceVariant.objects.filter(is_active=True).select_related('service').in_bulk(variant_ids)
+        self._tiers = load_tier_indexes(service_ids)
+        
+        errors = []
+        for item in value:
+            item_errors = {}
+            if item['service_id'] not in self._services:
+                item_errors['service_id'] = ["Service not found or inactive."]
+            if item.get('variant_id') and item['variant_id'] not in self._variants:
+                item_errors['variant_id'] = ["Service variant not found or inactive."]
+            errors.append(item_errors)
+        
+        if any(errors):
+            raise serializers.ValidationError(errors)
         return value
     
     def validate_pickup_date(self, value):
@@ -157,32 +212,51 @@ class CreateOrderSerializer(serializers.ModelSerializer):
         items_data = validated_data.pop('items')
         user = self.context['request'].user
         
-        # Create order
-        order = Order.objects.create(customer=user, **validated_data)
-        
-        # Create order items
-        for item_data in items_data:
-            service = Service.objects.get(id=item_data['service_id'])
-            variant = None
-            if item_data.get('variant_id'):
-                variant = ServiceVariant.objects.get(id=item_data['variant_id'])
+        with transaction.atomic():
+            # Take a place in the pickup (and delivery) slot; rolled back with the order
+            try:
+                reserve_order_slots(validated_data)
+            except SlotUnavailable as e:
+                raise self.slot_unavailable(e)
+            
+            # Create order
+            order = Order.objects.create(customer=user, **validated_data)
             
-            OrderItem.objects.create(
+            # Price the items in memory and insert them in one statement
+            order_items = []
+            for item_data in items_data:
+                service = self._services[item_data['service_id']]
+                variant = None
+                if item_data.get('variant_id'):
+                    variant = self._variants[item_data['variant_id']]
+                
+                list_price = variant.final_price if variant else service.base_price
+                unit_price = tier_unit_price(
+                    list_price, self._tiers.get((service.id, variant.id if variant else None)), item_data['quantity']
+                )
+                order_items.append(OrderItem(
+                    order=order,
+                    service=service,
+                    variant=variant,
+                    quantity=item_data['quantity'],
+                    unit_price=unit_price,
+                    total_price=unit_price * item_data['quantity'],
+                    description=item_data.get('description', ''),
+                    special_instructions=item_data.get('special_instructions', '')
+                ))
+            OrderItem.objects.bulk_create(order_items)
+            
+            # Calculate the totals once for the whole cart
+            order.update_totals(order_items)
+            
+            # Create initial status history
+            OrderStatusHistory.objects.create(
                 order=order,
-                service=service,
-                variant=variant,
-                quantity=item_data['quantity'],
-                description=item_data.get('description', ''),
-                special_instructions=item_data.get('special_instructions', '')
+                status='pending',
+                notes='Order created',
+                updated_by=user
             )
-        
-        # Create initial status history
-        OrderStatusHistory.objects.create(
-            order=order,
-            status='pending',
-            notes='Order created',
-            updated_by=user
-        )
+            refresh_customer_stats(user.id)
         
         return order
 
@@ -195,24 +269,9 @@ class UpdateOrderStatusSerializer(serializers.ModelSerializer):
         fields = ['status', 'notes']
     
     def validate_status(self, value):
-        valid_transitions = {
-            'pending': ['confirmed', 'cancelled'],
-            'confirmed': ['picked_up', 'cancelled'],
-            'picked_up': ['in_process', 'cancelled'],
-            'in_process': ['ready', 'cancelled'],
-            'ready': ['out_for_delivery', 'cancelled'],
-            'out_for_delivery': ['delivered', 'cancelled'],
-            'delivered': [],
-            'cancelled': [],
-        }
-        
         current_status = self.instance.status if self.instance else 'pending'
-        allowed_transitions = valid_transitions.get(current_status, [])
-        
-        if value not in allowed_transitions:
-            raise serializers.ValidationError(
-                f"Cannot transition from '{current_status}' to '{value}'"
-            )
+        if not can_transition(current_status, value):
+            raise serializers.ValidationError(transition_error(current_status, value))
         
         return value
     
@@ -222,23 +281,30 @@ class UpdateOrderStatusSerializer(serializers.ModelSerializer):
         
         # Update order status
         instance.status = validated_data['status']
-        instance.save()
-        
-        # Create status history entry
-        OrderStatusHistory.objects.create(
-            order=instance,
-            status=instance.status,
-            notes=notes,
-            updated_by=self.context['request'].user
-        )
+        with transaction.atomic():
+            instance.save(update_fields=['status', 'updated_at'])
+            if instance.status == 'cancelled':
+                release_order_slots([instance])
+            
+            # Create status history entry
+            OrderStatusHistory.objects.create(
+                order=instance,
+                status=instance.status,
+                notes=notes,
+                updated_by=self.context['request'].user
+            )
+            refresh_customer_stats(instance.customer_id)
+            publish_order_status(instance)
         
         return instance
 
 
-class OrderListSerializer(serializers.ModelSerializer):
+class OrderListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     customer_name = serializers.CharField(source='customer.get_full_name', read_only=True)
-    item_count = serializers.SerializerMethodField()
-    total_amount = serializers.SerializerMethodField()
+    
+    related_lookups = {
+        'customer_name': (['customer'], []),
+    }
     
     class Meta:
         model = Order
@@ -247,30 +313,31 @@ class OrderListSerializer(serializers.ModelSerializer):
             'pickup_date', 'delivery_date', 'total_amount', 'payment_status',
             'item_count', 'created_at'
         ]
-        read_only_fields = ['id', 'order_number', 'customer_name', 'created_at']
+        read_only_fields = ['id', 'order_number', 'customer_name', 'total_amount', 'item_count', 'created_at']
+
+
+class BulkStatusUpdateItemSerializer(serializers.Serializer):
+    order_id = serializers.IntegerField(required=False)
+    order_number = serializers.CharField(required=False)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+    notes = serializers.CharField(required=False, allow_blank=True)
     
-    def get_item_count(self, obj):
-        return obj.items.count()
+    def validate(self, attrs):
+        if not attrs.get('order_id') and not attrs.get('order_number'):
+            raise serializers.ValidationError("Either order_id or order_number is required.")
+        return attrs
+
+
+class BulkStatusUpdateSerializer(serializers.Serializer):
+    updates = BulkStatusUpdateItemSerializer(many=True)
+    notes = serializers.CharField(required=False, allow_blank=True)
     
-    def get_total_amount(self, obj):
-        """Calculate total amount dynamically from order items"""
-        try:
-            # Calculate subtotal from order items
-            subtotal = sum(item.total_price for item in obj.items.all())
-            
-            # Calculate tax (5% GST)
-            tax = subtotal * 0.05
-            
-            # Calculate delivery fee (free for orders above ₹500, else ₹50)
-            delivery_fee = 0 if subtotal >= 500 else 50
-            
-            # Calculate total
-            total = subtotal + tax + delivery_fee
-            
-            return total
-        except Exception:
-            # Fallback to stored value if calculation fails
-            return obj.total_amount
+    def validate_updates(self, value):
+        if not value:
+            raise serializers.ValidationError("At least one update is required.")
+        if len(value) > 1000:
+            raise serializers.ValidationError("At most 1000 updates can be sent at once.")
+        return value
 
 
 class OrderFilterSerializer(serializers.Serializer):
@@ -0,0 +1,164 @@
+"""
+Pickup and delivery time-slot capacity.
+
+Every (kind, date, time slot) has a ``TimeSlotCapacity`` row with a capacity
+and a reserved counter. A booking takes a place with a single conditional
+UPDATE (``reserved < capacity``), so concurrent bookings can never overfill a
+slot, and availability is read straight from the counters. Rows are created
+on first use with ``ORDER_SLOT_CAPACITY`` places, and only for the slots
+listed in ``ORDER_TIME_SLOTS``.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from .models import TimeSlotCapacity
+
+
+AVAILABILITY_DAYS = 14
+
+# Order fields needed to work out which slots an order holds
+SLOT_FIELDS = ['pickup_date', 'pickup_time_slot', 'delivery_date', 'delivery_time_slot']
+
+
+class SlotUnavailable(Exception):
+    def __init__(self, kind, date, time_slot):
+        self.kind = kind
+        self.date = date
+        self.time_slot = time_slot
+        super().__init__(f"The {kind} slot {time_slot} on {date} is fully booked.")
+
+
+class UnknownTimeSlot(ValueError):
+    def __init__(self, kind, time_slot):
+        self.kind = kind
+        self.time_slot = time_slot
+        super().__init__(f"{time_slot} is not a bookable time slot.")
+
+
+def default_capacity():
+    return getattr(settings, 'ORDER_SLOT_CAPACITY', 20)
+
+
+def configured_time_slots():
+    return list(getattr(settings, 'ORDER_TIME_SLOTS', []))
+
+
+def reserve_slot(kind, date, time_slot, overbook=False):
+    """
+    Take one place in a slot or raise ``SlotUnavailable``.
+
+    Raises ``UnknownTimeSlot`` for a slot that is not configured. With
+    ``overbook`` the place is taken even if the slot is full (staff edits).
+    Call inside the transaction that creates the booking so the place is
+    given back if that transaction rolls back.
+    """
+    if time_slot not in configured_time_slots():
+        raise UnknownTimeSlot(kind, time_slot)
+
+    slots = TimeSlotCapacity.objects.filter(kind=kind, date=date, time_slot=time_slot)
+    open_slots = slots if overbook else slots.filter(reserved__lt=F('capacity'))
+    if open_slots.update(reserved=F('reserved') + 1):
+        return
+
+    # Either the slot is full or nobody has booked it yet
+    TimeSlotCapacity.objects.get_or_create(
+        kind=kind, date=date, time_slot=time_slot,
+        defaults={'capacity': default_capacity()},
+    )
+    if open_slots.update(reserved=F('reserved') + 1):
+        return
+    raise SlotUnavailable(kind, date, time_slot)
+
+
+def order_slots(order):
+    """
+    The slots an order holds: its pickup slot and, if booked, its delivery
+    slot. ``order`` may be an instance or a ``values()`` dict.
+    """
+    get = order.get if isinstance(order, dict) else lambda field: getattr(order, field)
+    slots = [('pickup', get('pickup_date'), get('pickup_time_slot'))]
+    if get('delivery_date') and get('delivery_time_slot'):
+        slots.append(('delivery', get('delivery_date'), get('delivery_time_slot')))
+    return slots
+
+
+def reserve_order_slots(order):
+    for slot in order_slots(order):
+        reserve_slot(*slot)
+
+
+def _release(counts):
+    for (kind, date, time_slot), count in counts.items():
+        TimeSlotCapacity.objects.filter(
+            kind=kind, date=date, time_slot=time_slot, reserved__gt=0
+        ).update(reserved=Greatest(F('reserved') - count, Value(0)))
+
+
+def release_order_slots(orders):
+    """Give back the places held by ``orders``, one UPDATE per slot"""
+    _release(Counter(slot for order in orders for slot in order_slots(order)))
+
+
+def slot_state(order):
+    """The fields ``move_order_slots`` compares, copied off ``order``"""
+    return {field: getattr(order, field) for field in SLOT_FIELDS + ['status']}
+
+
+def move_order_slots(before, after, overbook=False):
+    """
+    Move an order's places from its ``before`` state to ``after``.
+
+    Both are instances or ``slot_state`` dicts; ``before`` is None for an
+    order that held nothing yet. Cancelled orders hold no places, so a
+    cancellation gives them back. Places in slots that did not change are
+    left alone; new ones are taken as ``reserve_slot`` does.
+    """
+    def held(order):
+        if order is None:
+            return Counter()
+        status = order['status'] if isinstance(order, dict) else order.status
+        return Counter() if status == 'cancelled' else Counter(order_slots(order))
+
+    old, new = held(before), held(after)
+    _release(old - new)
+    for slot in (new - old).elements():
+        reserve_slot(*slot, overbook=overbook)
+
+
+def slot_availability(kind, start, days=AVAILABILITY_DAYS):
+    """
+    Availability per day and slot for ``days`` days from ``start``.
+
+    Answered from the capacity rows alone: slots nobody has booked yet are
+    reported with the default capacity.
+    """
+    end = start + timedelta(days=days - 1)
+    rows = TimeSlotCapacity.objects.filter(
+        kind=kind, date__gte=start, date__lte=end
+    ).values_list('date', 'time_slot', 'capacity', 'reserved')
+    counters = {(date, time_slot): (capacity, reserved) for date, time_slot, capacity, reserved in rows}
+
+    time_slots = configured_time_slots()
+    extra = sorted({time_slot for _, time_slot in counters} - set(time_slots))
+    capacity = default_capacity()
+
+    result = []
+    for offset in range(days):
+        date = start + timedelta(days=offset)
+        slots = []
+        for time_slot in time_slots + extra:
+            if (date, time_slot) not in counters and time_slot in extra:
+                continue
+            slot_capacity, reserved = counters.get((date, time_slot), (capacity, 0))
+            slots.append({
+                'time_slot': time_slot,
+                'capacity': slot_capacity,
+                'reserved': reserved,
+                'available': max(slot_capacity - reserved, 0),
+            })
+        result.append({'date': date, 'slots': slots})
+    return result
@@ -1,3 +1,988 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import multiprocessing
+import os
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.admin import site
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.forms import model_to_dict
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from accounts.models import UserProfile
+from dryclean_project.testing import APIGetMixin, QueryPlanAssertions
+from payments.models import Payment
+from services.models import Service, ServiceCategory, ServiceVariant
+from .admin import OrderAdmin, PickupScheduleAdmin
+from .assignment import _load_stops, _write_plan, plan_assignments
+from .customer_stats import get_customer_stats, rebuild_customer_stats, refresh_customer_stats
+from .events import SUBSCRIBER_QUEUE_SIZE, STAFF_TOPIC, LocalBroker, customer_topic, order_topic, status_event
+from .export import CSV_COLUMNS
+from .models import (
+    CustomerOrderStats, DailyOrderRollup, DeliverySchedule, Order, OrderItem, OrderStatusHistory, PickupSchedule,
+    TimeSlotCapacity,
+)
+from .querysets import order_detail_queryset
+from .rollups import rebuild_daily_rollups
+from .sequences import ORDER_NUMBER_PREFIX, order_number_allocator
+from .serializers import CreateOrderSerializer, OrderSerializer
+from .slots import UnknownTimeSlot, reserve_slot
+from .totals import recalculate_order_totals
+from .transitions import apply_status_changes
+
+
+def make_order(customer, **fields):
+    """An order for ``customer`` with default pickup details; ``fields`` override them"""
+    return Order.objects.create(**{
+        'customer': customer,
+        'pickup_address': '12 Main Street',
+        'pickup_date': date(2026, 1, 5),
+        'pickup_time_slot': '9:00 AM - 12:00 PM',
+        **fields,
+    })
+
+
+class OrderDetailQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.agent = User.objects.create_user('agent', 'agent@example.com', 'password', is_staff=True)
+        category = ServiceCategory.objects.create(name='Laundry')
+        cls.services = [
+            Service.objects.create(category=category, name=f'Service {index}', base_price=Decimal('40.00'))
+            for index in range(3)
+        ]
+        cls.variant = ServiceVariant.objects.create(
+            service=cls.services[0], name='Silk', price_modifier=Decimal('10.00')
+        )
+
+    def make_order_with_items(self, item_count):
+        order = make_order(self.customer)
+        for index in range(item_count):
+            service = self.services[index % len(self.services)]
+            OrderItem.objects.create(
+                order=order,
+                service=service,
+                variant=self.variant if service == self.services[0] else None,
+                quantity=index + 1,
+                unit_price=Decimal('40.00'),
+                total_price=Decimal('40.00') * (index + 1),
+            )
+        for status in ('pending', 'confirmed'):
+            OrderStatusHistory.objects.create(order=order, status=status, updated_by=self.agent)
+        PickupSchedule.objects.create(
+            order=order, scheduled_date=order.pickup_date,
+            scheduled_time_slot=order.pickup_time_slot, pickup_agent=self.agent,
+        )
+        DeliverySchedule.objects.create(
+            order=order, scheduled_date=date(2026, 1, 7),
+            scheduled_time_slot=order.pickup_time_slot, delivery_agent=self.agent,
+        )
+        return order
+
+    def count_detail_queries(self, order):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/api/orders/{order.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['items']), order.item_count)
+        return len(queries)
+
+    def test_detail_view_query_count_does_not_grow_with_items(self):
+        small = self.count_detail_queries(self.make_order_with_items(1))
+        large = self.count_detail_queries(self.make_order_with_items(12))
+        self.assertLessEqual(large, 6)
+        self.assertEqual(small, large)
+
+    def test_serializing_a_shaped_order_needs_no_further_queries(self):
+        order = self.make_order_with_items(8)
+        with self.assertNumQueries(3):
+            # The order with its joins, then the items and history prefetches
+            order = order_detail_queryset().get(id=order.id)
+            data = OrderSerializer(order).data
+        self.assertEqual(len(data['items']), 8)
+        self.assertEqual(len(data['status_history']), 2)
+        self.assertEqual(data['pickup_schedule']['pickup_agent'], self.agent.id)
+
+
+class OrderDetailConditionalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.other = User.objects.create_user('other', 'other@example.com', 'password')
+        category = ServiceCategory.objects.create(name='Laundry')
+        cls.service = Service.objects.create(category=category, name='Shirt', base_price=Decimal('40.00'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        self.order = make_order(self.customer)
+        self.item = self.add_item()
+
+    def add_item(self):
+        return OrderItem.objects.create(
+            order=self.order, service=self.service, quantity=1,
+            unit_price=Decimal('40.00'), total_price=Decimal('40.00'),
+        )
+
+    def detail(self, **headers):
+        return self.client.get(f'/api/orders/{self.order.id}/', headers=headers)
+
+    def etag(self):
+        response = self.detail()
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_matching_if_none_match_is_not_modified(self):
+        etag = self.etag()
+        response = self.detail(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.detail(if_none_match='"stale"').status_code, 200)
+
+    def test_items_and_history_change_the_etag(self):
+        etags = [self.etag()]
+        self.add_item()
+        etags.append(self.etag())
+        self.item.delete()
+        etags.append(self.etag())
+        OrderStatusHistory.objects.create(order=self.order, status='confirmed')
+        etags.append(self.etag())
+        self.assertEqual(len(set(etags)), 4)
+
+    def test_another_customer_gets_404(self):
+        etag = self.etag()
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.detail().status_code, 404)
+        self.assertEqual(self.detail(if_none_match=etag).status_code, 404)
+
+    def test_last_modified_waits_for_the_second_to_pass(self):
+        self.assertNotIn('Last-Modified', self.detail())
+        self.assertEqual(self.detail(if_modified_since=http_date()).status_code, 200)
+
+        earlier = timezone.now() - timedelta(hours=1)
+        Order.objects.filter(id=self.order.id).update(updated_at=earlier)
+        OrderItem.objects.filter(order=self.order).update(updated_at=earlier)
+        Service.objects.filter(id=self.service.id).update(updated_at=earlier)
+        ServiceCategory.objects.filter(id=self.service.category_id).update(updated_at=earlier)
+        UserProfile.objects.filter(user=self.customer).update(updated_at=earlier)
+        last_modified = self.detail()['Last-Modified']
+        self.assertEqual(self.detail(if_modified_since=last_modified).status_code, 304)
+
+        # A change in the current second cannot be told apart by an HTTP date
+        OrderStatusHistory.objects.create(order=self.order, status='confirmed')
+        response = self.detail(if_modified_since=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+
+
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        category = ServiceCategory.objects.create(name='Laundry')
+        cls.service = Service.objects.create(category=category, name='Shirt', base_price=Decimal('40.00'))
+        cls.order = make_order(cls.customer)
+        OrderItem.objects.create(
+            order=cls.order, service=cls.service, quantity=1,
+            unit_price=Decimal('40.00'), total_price=Decimal('40.00'),
+        )
+
+    def detail(self, params=None):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        response = client.get(f'/api/orders/{self.order.id}/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def shaped(self, params):
+        request = Request(RequestFactory().get('/', params))
+        queryset = OrderSerializer.shape_queryset(Order.objects.all(), request)
+        prefetched = [getattr(lookup, 'prefetch_to', lookup) for lookup in queryset._prefetch_related_lookups]
+        return queryset.query.select_related, prefetched
+
+    def test_fields_keeps_only_known_requested_names(self):
+        data = self.detail({'fields': 'id,status,no_such_field'})
+        self.assertEqual(list(data), ['id', 'status'])
+        self.assertEqual(list(self.detail({'fields': 'no_such_field'})), [])
+
+    def test_expand_swaps_the_customer_id_for_the_object(self):
+        full = self.detail()
+        self.assertEqual(full['customer']['username'], 'customer')
+        self.assertEqual(len(full['items']), 1)
+
+        collapsed = self.detail({'expand': 'items'})
+        self.assertEqual(collapsed['customer'], self.customer.id)
+        self.assertEqual(len(collapsed['items']), 1)
+        self.assertNotIn('status_history', collapsed)
+
+        expanded = self.detail({'expand': 'customer', 'fields': 'id,customer,items'})
+        self.assertEqual(list(expanded), ['id', 'customer'])
+        self.assertEqual(expanded['customer']['username'], 'customer')
+
+    def test_shape_queryset_joins_only_rendered_fields(self):
+        self.assertEqual(self.shaped({'fields': 'id,status'}), (False, []))
+        self.assertEqual(self.shaped({'expand': 'customer'}), ({'customer': {}}, []))
+        # The collapsed customer is read from customer_id
+        self.assertEqual(self.shaped({'expand': 'items'}), (False, ['items']))
+        select_related, prefetched = self.shaped({})
+        self.assertIn('customer', select_related)
+        self.assertEqual(prefetched, ['items', 'status_history'])
+
+
+class CustomerOrderStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+
+    def test_stats_follow_status_changes_and_payments(self):
+        first = make_order(self.customer)
+        second = make_order(self.customer)
+        refresh_customer_stats(self.customer.id)
+        apply_status_changes([(first.id, 'confirmed'), (second.id, 'cancelled')], user=self.staff)
+        first.refresh_from_db()
+        first.payment_status = 'paid'
+        first.save()
+        first.update_totals()
+
+        stats = get_customer_stats(self.customer)
+        self.assertEqual(stats['total_orders'], 2)
+        self.assertEqual(stats['total_spent'], first.total_amount)
+        self.assertEqual(stats['status_breakdown'], {'confirmed': 1, 'cancelled': 1})
+
+        second.delete()
+        self.assertEqual(get_customer_stats(self.customer)['total_orders'], 1)
+
+    def test_rebuild_matches_incremental_stats(self):
+        make_order(self.customer, status='delivered', payment_status='paid')
+        make_order(self.customer)
+        refresh_customer_stats(self.customer.id)
+        expected = get_customer_stats(self.customer)
+        CustomerOrderStats.objects.all().delete()
+        self.assertEqual(rebuild_customer_stats(batch_size=1), 1)
+        self.assertEqual(get_customer_stats(self.customer), expected)
+
+    def test_order_history_reads_a_single_stats_row(self):
+        make_order(self.customer)
+        refresh_customer_stats(self.customer.id)
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/orders/history/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['statistics']['total_orders'], 1)
+        self.assertFalse(any('GROUP BY' in query['sql'] for query in queries))
+
+
+class OrderSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        cls.jane = User.objects.create_user(
+            'jane', 'jane.doe@example.com', 'password', first_name='Jane', last_name='Doe'
+        )
+        cls.john = User.objects.create_user('johnny', 'john@example.org', 'password')
+
+    def search(self, query):
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        response = client.get('/api/orders/admin/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_prefix_search_over_orders_and_customers(self):
+        janes = make_order(self.jane, pickup_address='4 Baker Street')
+        johns = make_order(self.john)
+
+        data = self.search('jan')
+        self.assertEqual([order['id'] for order in data['orders']], [janes.id])
+        self.assertEqual([customer['username'] for customer in data['customers']], ['jane'])
+
+        number = johns.order_number[len('ORD'):].lstrip('0')
+        self.assertEqual([order['id'] for order in self.search(number)['orders']], [johns.id])
+        self.assertEqual([order['id'] for order in self.search('bake')['orders']], [janes.id])
+        self.assertEqual(self.search('example.org')['customers'][0]['id'], self.john.id)
+
+    def test_order_number_ranks_above_address(self):
+        first = make_order(self.john)
+        second = make_order(self.john, pickup_address=f'Near {first.order_number} corner')
+        data = self.search(first.order_number)
+        self.assertEqual([order['id'] for order in data['orders']], [first.id, second.id])
+
+    def test_index_follows_saves_and_deletes(self):
+        order = make_order(self.jane)
+        order.pickup_address = '9 Elm Road'
+        order.save()
+        self.assertEqual(self.search('main')['orders'], [])
+        self.assertEqual(len(self.search('elm')['orders']), 1)
+
+        self.jane.email = 'jd@dryclean.test'
+        self.jane.save()
+        self.assertEqual(len(self.search('dryclean')['orders']), 1)
+
+        order.delete()
+        self.assertEqual(self.search('elm')['orders'], [])
+
+    def test_admin_list_search_filter(self):
+        janes = make_order(self.jane)
+        make_order(self.john)
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        response = client.get('/api/orders/admin/', {'search': 'doe'})
+        self.assertEqual([order['id'] for order in response.data['results']], [janes.id])
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        cls.jane = User.objects.create_user('jane', 'jane@example.com', 'password')
+        cls.john = User.objects.create_user('john', 'john@example.com', 'password')
+        start = timezone.now()
+        for index in range(24):
+            order = make_order(
+                cls.jane, pickup_address=f'{index} Baker Street',
+                status='pending' if index % 2 else 'confirmed',
+            )
+            # Three orders share every created_at
+            Order.objects.filter(id=order.id).update(created_at=start - timedelta(minutes=index // 3))
+        for index in range(4):
+            make_order(cls.john, status='pending')
+        cls.expected = list(
+            Order.objects.filter(customer=cls.jane).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def walk(self, client, url, params):
+        pages = []
+        response = client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            if response.data['next'] is None:
+                return pages
+            response = client.get(response.data['next'])
+
+    def ids(self, page):
+        return [order['id'] for order in page['results']]
+
+    def test_walks_every_row_once_forward_and_back(self):
+        client = self.client_for(self.jane)
+        pages = self.walk(client, '/api/orders/', {'cursor': ''})
+        self.assertEqual([len(page['results']) for page in pages], [10, 10, 4])
+        self.assertEqual([order_id for page in pages for order_id in self.ids(page)], self.expected)
+        self.assertIsNone(pages[0]['previous'])
+
+        # Each previous link leads back to the page before it
+        page = pages[-1]
+        for earlier in reversed(pages[:-1]):
+            response = client.get(page['previous'])
+            self.assertEqual(response.status_code, 200)
+            page = response.data
+            self.assertEqual(self.ids(page), self.ids(earlier))
+            self.assertEqual(page['next'] is None, earlier['next'] is None)
+        self.assertIsNone(page['previous'])
+
+    def test_filters_carry_through_the_next_link(self):
+        client = self.client_for(self.staff)
+        pages = self.walk(client, '/api/orders/admin/', {'cursor': '', 'status': 'pending', 'search': 'baker'})
+        self.assertEqual(len(pages), 2)
+        self.assertIn('status=pending', pages[0]['next'])
+        self.assertIn('search=baker', pages[0]['next'])
+        expected = list(
+            Order.objects.filter(customer=self.jane, status='pending')
+            .order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual([order_id for page in pages for order_id in self.ids(page)], expected)
+
+    def test_malformed_cursor_is_404(self):
+        client = self.client_for(self.jane)
+        for cursor in ('garbage', 'eyJ0IjoieCIsImkiOjF9', 'W10='):  # bad base64, bad date, a list
+            with self.subTest(cursor=cursor):
+                self.assertEqual(client.get('/api/orders/', {'cursor': cursor}).status_code, 404)
+
+
+class OrderExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        cls.customer = User.objects.create_user(
+            'jane', 'jane@example.com', 'password', first_name='Jane', last_name='Doe'
+        )
+        category = ServiceCategory.objects.create(name='Laundry')
+        cls.shirt = Service.objects.create(category=category, name='Shirt', base_price=Decimal('40.00'))
+        cls.silk = ServiceVariant.objects.create(service=cls.shirt, name='Silk', price_modifier=Decimal('10.00'))
+        cls.suit = Service.objects.create(category=category, name='Suit', base_price=Decimal('150.00'))
+
+    def make_exported_order(self):
+        order = make_order(self.customer)
+        OrderItem.objects.create(
+            order=order, service=self.shirt, variant=self.silk, quantity=2,
+            unit_price=Decimal('50.00'), total_price=Decimal('100.00'),
+        )
+        OrderItem.objects.create(
+            order=order, service=self.suit, quantity=1, unit_price=Decimal('150.00'), total_price=Decimal('150.00'),
+        )
+        for reference, payment_status in ((f'pay_{order.id}_a', 'completed'), (f'pay_{order.id}_b', 'failed')):
+            Payment.objects.create(
+                order=order, user=self.customer, payment_method='razorpay', amount=Decimal('100.00'),
+                status=payment_status, gateway_payment_id=reference,
+            )
+        return order
+
+    def export(self, output):
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        response = client.get('/api/orders/admin/export/', {'output': output})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_has_a_line_per_item(self):
+        order = self.make_exported_order()
+        header, *rows = csv.reader(io.StringIO(self.export('csv')))
+        self.assertEqual(header, CSV_COLUMNS)
+        rows = [dict(zip(header, row)) for row in rows]
+        self.assertEqual([(row['service'], row['variant'], row['line_total']) for row in rows], [
+            ('Shirt', 'Silk', '100.00'), ('Suit', '', '150.00'),
+        ])
+        for row in rows:
+            self.assertEqual(row['order_number'], order.order_number)
+            self.assertEqual(row['customer_name'], 'Jane Doe')
+            self.assertEqual(row['paid_amount'], '100.00')
+            self.assertEqual(sorted(row['payment_references'].split()), [f'pay_{order.id}_a', f'pay_{order.id}_b'])
+
+    def test_ndjson_has_a_line_per_order(self):
+        order = self.make_exported_order()
+        lines = self.export('ndjson').splitlines()
+        self.assertEqual(len(lines), 1)
+        data = json.loads(lines[0])
+        self.assertEqual(data['order_number'], order.order_number)
+        self.assertEqual(data['paid_amount'], '100.00')
+        self.assertEqual([item['service'] for item in data['items']], ['Shirt', 'Suit'])
+        self.assertEqual(
+            sorted(payment['reference'] for payment in data['payments']),
+            [f'pay_{order.id}_a', f'pay_{order.id}_b'],
+        )
+
+    def count_export_queries(self, output):
+        with CaptureQueriesContext(connection) as queries:
+            self.export(output)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_orders(self):
+        self.make_exported_order()
+        small = {output: self.count_export_queries(output) for output in ('csv', 'ndjson')}
+        for _ in range(5):
+            self.make_exported_order()
+        large = {output: self.count_export_queries(output) for output in ('csv', 'ndjson')}
+        self.assertEqual(small, large)
+        # The orders, then the items and payments prefetches
+        self.assertEqual(large['csv'], 3)
+
+
+class OrderTotalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        category = ServiceCategory.objects.create(name='Laundry')
+        cls.service = Service.objects.create(category=category, name='Shirt', base_price=Decimal('33.35'))
+
+    def make_order_with_item(self, quantity):
+        order = make_order(self.customer)
+        OrderItem.objects.create(order=order, service=self.service, quantity=quantity)
+        order.refresh_from_db()
+        return order
+
+    def test_detail_returns_the_stored_decimal_totals(self):
+        order = self.make_order_with_item(3)
+        self.assertEqual(order.tax, Decimal('5.00'))
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        data = client.get(f'/api/orders/{order.id}/').data
+        self.assertEqual(data['total_amount'], str(order.total_amount))
+        self.assertEqual(data['total_amount'], '155.05')
+
+    def test_recalculate_fixes_drifted_totals(self):
+        drifted = self.make_order_with_item(1)
+        correct = self.make_order_with_item(2)
+        Order.objects.filter(id=drifted.id).update(tax=Decimal('0.00'), total_amount=Decimal('83.35'))
+        self.assertEqual(recalculate_order_totals([drifted.id, correct.id]), 1)
+        drifted.refresh_from_db()
+        self.assertEqual((drifted.tax, drifted.total_amount), (Decimal('1.67'), Decimal('85.02')))
+
+
+class AutoAssignTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.agent = User.objects.create_user('agent', 'agent@example.com', 'password', is_staff=True)
+
+    def test_counts_only_the_schedules_it_writes(self):
+        first, second = make_order(self.customer), make_order(self.customer)
+        stops = _load_stops('pickup', date(2026, 1, 5))
+        plan = plan_assignments(stops, [self.agent.id], {})
+        # Assigned by hand after the stops were read
+        PickupSchedule.objects.create(order=second, scheduled_date=date(2026, 1, 5),
+                                      scheduled_time_slot='9:00 AM - 12:00 PM')
+
+        self.assertEqual(_write_plan('pickup', date(2026, 1, 5), stops, plan), (0, 1))
+        self.assertEqual(PickupSchedule.objects.get(order=first).pickup_agent, self.agent)
+        self.assertIsNone(PickupSchedule.objects.get(order=second).pickup_agent)
+
+
+class OrderEventTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.order = make_order(cls.customer)
+
+    async def test_local_broker_fans_out_to_subscribed_topics(self):
+        broker = LocalBroker()
+        by_order = await broker.subscribe([order_topic(self.order.id)])
+        by_customer = await broker.subscribe([customer_topic(self.customer.id)])
+        staff = await broker.subscribe([STAFF_TOPIC])
+        someone_else = await broker.subscribe([customer_topic(self.customer.id + 1)])
+
+        event = status_event(self.order.id, self.order.order_number, self.customer.id, 'confirmed')
+        broker.publish([order_topic(self.order.id), customer_topic(self.customer.id), STAFF_TOPIC], event)
+        for subscription in (by_order, by_customer, staff):
+            self.assertEqual(await subscription.get(1), event)
+        self.assertIsNone(await someone_else.get(0.01))
+
+        await by_order.close()
+        broker.publish([order_topic(self.order.id)], event)
+        self.assertIsNone(await by_order.get(0.01))
+
+    async def test_a_full_queue_drops_events_instead_of_blocking(self):
+        broker = LocalBroker()
+        subscription = await broker.subscribe([STAFF_TOPIC])
+        for index in range(SUBSCRIBER_QUEUE_SIZE + 5):
+            broker.publish([STAFF_TOPIC], {'index': index})
+        # Let the deliveries scheduled on this loop run
+        await asyncio.sleep(0)
+        self.assertEqual(subscription.queue.qsize(), SUBSCRIBER_QUEUE_SIZE)
+        self.assertEqual((await subscription.get(1))['index'], 5)
+
+    def test_wsgi_requests_get_501(self):
+        self.client.force_login(self.customer)
+        for url in ('/api/orders/events/', f'/api/orders/{self.order.id}/events/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 501)
+
+    async def test_unauthenticated_streams_get_401(self):
+        for url in ('/api/orders/events/', f'/api/orders/{self.order.id}/events/'):
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 401)
+                response = await self.async_client.get(url, headers={'authorization': 'Token nope'})
+                self.assertEqual(response.status_code, 401)
+
+
+# The notification task is not what these tests are about
+@mock.patch('orders.views.send_order_notification')
+class TrackingSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.other = User.objects.create_user('other', 'other@example.com', 'password')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+
+    def setUp(self):
+        # Order ids are reused after each test's rollback
+        cache.clear()
+        self.order = make_order(self.customer)
+
+    def poll(self, user=None):
+        client = APIClient()
+        client.force_authenticate(user or self.customer)
+        return client.get(f'/api/orders/{self.order.id}/tracking/')
+
+    def assert_invalidated_after_commit(self, change):
+        """Run ``change``; the cached snapshot must survive until its transaction commits"""
+        before = self.poll().data
+        with self.captureOnCommitCallbacks() as callbacks:
+            change()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.poll().data, before)
+        for callback in callbacks:
+            callback()
+        after = self.poll().data
+        self.assertNotEqual(after, before)
+        return after
+
+    def test_second_poll_runs_no_queries(self, send_order_notification):
+        first = self.poll()
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            second = self.poll()
+        self.assertEqual(second.data, first.data)
+
+    def test_status_update_view_invalidates(self, send_order_notification):
+        def change():
+            client = APIClient()
+            client.force_authenticate(self.staff)
+            response = client.patch(f'/api/orders/{self.order.id}/status/', {'status': 'confirmed'}, format='json')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.assert_invalidated_after_commit(change)['order']['status'], 'confirmed')
+
+    def test_cancel_order_invalidates(self, send_order_notification):
+        def change():
+            client = APIClient()
+            client.force_authenticate(self.customer)
+            self.assertEqual(client.post(f'/api/orders/{self.order.id}/cancel/').status_code, 200)
+        self.assertEqual(self.assert_invalidated_after_commit(change)['order']['status'], 'cancelled')
+
+    def test_bulk_status_changes_invalidate(self, send_order_notification):
+        def change():
+            result = apply_status_changes([(self.order.id, 'confirmed')], user=self.staff)
+            self.assertEqual(len(result['applied']), 1)
+        self.assertEqual(self.assert_invalidated_after_commit(change)['order']['status'], 'confirmed')
+
+    def test_schedule_assignment_invalidates(self, send_order_notification):
+        def change():
+            stops = _load_stops('pickup', self.order.pickup_date)
+            plan = plan_assignments(stops, [self.staff.id], {})
+            self.assertEqual(_write_plan('pickup', self.order.pickup_date, stops, plan), (0, 1))
+        self.assertIsNotNone(self.assert_invalidated_after_commit(change)['pickup_schedule'])
+
+    def test_other_customers_get_404(self, send_order_notification):
+        self.assertEqual(self.poll().status_code, 200)
+        # Answered from the cached snapshot, which still checks the owner
+        self.assertEqual(self.poll(self.other).status_code, 404)
+        self.assertEqual(self.poll(self.staff).status_code, 200)
+
+
+class TimeSlotReservationTests(TestCase):
+    MORNING, AFTERNOON = '9:00 AM - 12:00 PM', '12:00 PM - 3:00 PM'
+    # Booked before ORDER_TIME_SLOTS changed, as create_fresh_test_data.py does
+    RETIRED = '2:00 PM - 5:00 PM'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        category = ServiceCategory.objects.create(name='Laundry')
+        cls.service = Service.objects.create(category=category, name='Shirt', base_price=Decimal('40.00'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        self.tomorrow = timezone.localdate() + timedelta(days=1)
+
+    def reserved(self, date, time_slot, kind='pickup'):
+        return TimeSlotCapacity.objects.filter(
+            kind=kind, date=date, time_slot=time_slot
+        ).values_list('reserved', flat=True).first() or 0
+
+    def place_order(self, **fields):
+        return self.client.post('/api/orders/', {
+            'pickup_address': '12 Main Street',
+            'pickup_date': self.tomorrow.isoformat(),
+            'pickup_time_slot': self.MORNING,
+            'items': [{'service_id': self.service.id, 'quantity': 1}],
+            **fields,
+        }, format='json')
+
+    def booked_order(self):
+        response = self.place_order()
+        self.assertEqual(response.status_code, 201)
+        return Order.objects.get(customer=self.customer)
+
+    def test_unknown_slots_are_rejected(self):
+        response = self.place_order(pickup_time_slot='Midnight')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pickup_time_slot', response.data)
+        self.assertFalse(Order.objects.exists())
+        with self.assertRaises(UnknownTimeSlot):
+            reserve_slot('pickup', self.tomorrow, 'Midnight')
+        self.assertFalse(TimeSlotCapacity.objects.exists())
+
+    def test_patching_the_slot_moves_the_place(self):
+        order = self.booked_order()
+        self.assertEqual(self.reserved(self.tomorrow, self.MORNING), 1)
+
+        response = self.client.patch(f'/api/orders/{order.id}/', {'pickup_time_slot': self.AFTERNOON}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.reserved(self.tomorrow, self.MORNING), 0)
+        self.assertEqual(self.reserved(self.tomorrow, self.AFTERNOON), 1)
+
+        response = self.client.patch(f'/api/orders/{order.id}/', {'pickup_time_slot': 'Midnight'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(ORDER_SLOT_CAPACITY=1)
+    def test_patching_into_a_full_slot_is_refused(self):
+        order = self.booked_order()
+        reserve_slot('pickup', self.tomorrow, self.AFTERNOON)
+
+        response = self.client.patch(f'/api/orders/{order.id}/', {'pickup_time_slot': self.AFTERNOON}, format='json')
+        self.assertEqual(response.status_code, 400)
+        order.refresh_from_db()
+        self.assertEqual(order.pickup_time_slot, self.MORNING)
+        self.assertEqual(self.reserved(self.tomorrow, self.MORNING), 1)
+
+    def test_orders_on_a_retired_slot_can_still_be_edited(self):
+        order = make_order(self.customer, pickup_date=self.tomorrow, pickup_time_slot=self.RETIRED)
+
+        response = self.client.patch(f'/api/orders/{order.id}/', {
+            'pickup_time_slot': self.RETIRED, 'special_instructions': 'Ring twice',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        order.refresh_from_db()
+        self.assertEqual((order.pickup_time_slot, order.special_instructions), (self.RETIRED, 'Ring twice'))
+        self.assertFalse(TimeSlotCapacity.objects.exists())
+
+        # Moving it to another day needs a slot that is still offered
+        response = self.client.patch(
+            f'/api/orders/{order.id}/', {'pickup_date': (self.tomorrow + timedelta(days=1)).isoformat()}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pickup_time_slot', response.data)
+        order.refresh_from_db()
+        self.assertEqual(order.pickup_date, self.tomorrow)
+
+    def test_admin_keeps_a_retired_slot_on_unrelated_edits(self):
+        order = make_order(self.customer, pickup_date=self.tomorrow, pickup_time_slot=self.RETIRED)
+        request = RequestFactory().get('/')
+        request.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        model_admin = OrderAdmin(Order, site)
+        form_class = model_admin.get_form(request, order)
+        data = {name: value for name, value in model_to_dict(order).items() if value is not None}
+
+        form = form_class({**data, 'status': 'confirmed'}, instance=order)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['pickup_time_slot'], self.RETIRED)
+
+        form = form_class({**data, 'pickup_date': self.tomorrow + timedelta(days=1)}, instance=order)
+        self.assertFalse(form.is_valid())
+        self.assertIn('pickup_time_slot', form.errors)
+
+    def test_admin_cancel_gives_the_place_back(self):
+        order = self.booked_order()
+        order.status = 'cancelled'
+        OrderAdmin(Order, site).save_model(None, order, None, change=True)
+        self.assertEqual(self.reserved(self.tomorrow, self.MORNING), 0)
+
+    def test_moving_a_schedule_moves_the_place(self):
+        order = self.booked_order()
+        schedule = PickupSchedule.objects.create(
+            order=order, scheduled_date=self.tomorrow, scheduled_time_slot=self.MORNING
+        )
+        schedule.scheduled_date = self.tomorrow + timedelta(days=1)
+        PickupScheduleAdmin(PickupSchedule, site).save_model(None, schedule, None, change=True)
+
+        order.refresh_from_db()
+        self.assertEqual(order.pickup_date, schedule.scheduled_date)
+        self.assertEqual(self.reserved(self.tomorrow, self.MORNING), 0)
+        self.assertEqual(self.reserved(schedule.scheduled_date, self.MORNING), 1)
+
+
+@skipUnless(hasattr(os, 'fork'), 'Needs fork() to run workers in separate processes')
+@override_settings(ORDER_NUMBER_BLOCK_SIZE=5, ORDER_SLOT_CAPACITY=1000)
+class OrderNumberConcurrencyTests(TransactionTestCase):
+    BLOCK_SIZE = 5
+    PROCESSES = 3
+    THREADS = 4
+    ORDERS_PER_THREAD = 8
+
+    def setUp(self):
+        self.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        category = ServiceCategory.objects.create(name='Laundry')
+        self.service = Service.objects.create(category=category, name='Shirt', base_price=Decimal('40.00'))
+        # Hold a block in this process, which forked workers must not reuse
+        order_number_allocator.reset()
+        make_order(self.customer)
+        connection.close()
+
+    def create_orders(self, order_numbers, errors):
+        request = type('Request', (), {'user': self.customer})()
+        data = {
+            'pickup_address': '12 Main Street',
+            'pickup_date': (timezone.localdate() + timedelta(days=1)).isoformat(),
+            'pickup_time_slot': '9:00 AM - 12:00 PM',
+            'items': [{'service_id': self.service.id, 'quantity': 2}],
+        }
+        try:
+            for _ in range(self.ORDERS_PER_THREAD):
+                serializer = CreateOrderSerializer(data=data, context={'request': request})
+                serializer.is_valid(raise_exception=True)
+                order_numbers.append(serializer.save().order_number)
+        except Exception as error:
+            errors.append(repr(error))
+        finally:
+            connection.close()
+
+    def run_worker(self, results):
+        order_numbers, errors = [], []
+        threads = [
+            threading.Thread(target=self.create_orders, args=(order_numbers, errors))
+            for _ in range(self.THREADS - 1)
+        ]
+        for thread in threads:
+            thread.start()
+        self.create_orders(order_numbers, errors)
+        for thread in threads:
+            thread.join()
+        results.put((order_numbers, errors))
+
+    def test_concurrent_checkouts_get_unique_numbers(self):
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [context.Process(target=self.run_worker, args=(results,)) for _ in range(self.PROCESSES)]
+        for worker in workers:
+            worker.start()
+        order_numbers, errors = [], []
+        for _ in workers:
+            worker_numbers, worker_errors = results.get(timeout=60)
+            order_numbers += worker_numbers
+            errors += worker_errors
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        total = self.PROCESSES * self.THREADS * self.ORDERS_PER_THREAD
+        self.assertEqual(len(set(order_numbers)), total)
+        self.assertEqual(Order.objects.exclude(order_number__in=order_numbers).count(), 1)
+        # Numbers are only skipped by the unused rest of each thread's block
+        values = sorted(int(number[len(ORDER_NUMBER_PREFIX):]) for number in order_numbers)
+        self.assertLess(values[-1] - values[0] + 1, total + self.PROCESSES * self.THREADS * self.BLOCK_SIZE)
+
+
+class DailyOrderRollupTests(TransactionTestCase):
+    # Rollups are refreshed on commit, so these tests commit for real
+
+    def pending(self, field):
+        return dict(DailyOrderRollup.objects.filter(**{f'{field}__gt': 0}).values_list('date', field))
+
+    def test_moving_a_schedule_refreshes_the_old_and_new_day(self):
+        order = make_order(User.objects.create_user('customer', 'customer@example.com', 'password'))
+        PickupSchedule.objects.create(
+            order=order, scheduled_date=date(2026, 1, 5), scheduled_time_slot=order.pickup_time_slot
+        )
+        DeliverySchedule.objects.create(
+            order=order, scheduled_date=date(2026, 1, 7), scheduled_time_slot=order.pickup_time_slot
+        )
+        self.assertEqual(self.pending('pending_pickups'), {date(2026, 1, 5): 1})
+
+        pickup = PickupSchedule.objects.get(order=order)
+        pickup.scheduled_date = date(2026, 1, 6)
+        pickup.save()
+        delivery = DeliverySchedule.objects.get(order=order)
+        delivery.scheduled_date = date(2026, 1, 9)
+        delivery.save(update_fields=['scheduled_date', 'updated_at'])
+        self.assertEqual(self.pending('pending_pickups'), {date(2026, 1, 6): 1})
+        self.assertEqual(self.pending('pending_deliveries'), {date(2026, 1, 9): 1})
+
+
+class OrderQueryPlanTests(APIGetMixin, QueryPlanAssertions, TestCase):
+    TABLES = ('orders_order', 'orders_pickupschedule', 'orders_deliveryschedule')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        order = make_order(cls.customer)
+        PickupSchedule.objects.create(
+            order=order, scheduled_date=order.pickup_date, scheduled_time_slot=order.pickup_time_slot
+        )
+        DeliverySchedule.objects.create(
+            order=order, scheduled_date=date(2026, 1, 7), scheduled_time_slot=order.pickup_time_slot
+        )
+
+    def test_customer_lists_use_indexes(self):
+        with self.assertNoFullScans(*self.TABLES):
+            self.get(self.customer, '/api/orders/')
+            self.get(self.customer, '/api/orders/', {'cursor': ''})
+            self.get(self.customer, '/api/orders/history/')
+            self.get(self.customer, '/api/auth/dashboard/')
+
+    def test_admin_filters_use_indexes(self):
+        for params in (
+            {'status': 'pending'},
+            {'payment_status': 'paid'},
+            {'date_from': '2026-01-01', 'date_to': '2026-01-31'},
+            {'status': 'pending', 'cursor': ''},
+        ):
+            with self.subTest(params=params), self.assertNoFullScans(*self.TABLES):
+                self.get(self.staff, '/api/orders/admin/', params)
+
+    def test_dashboard_uses_indexes(self):
+        with self.assertNoFullScans(*self.TABLES):
+            self.get(self.staff, '/api/orders/admin/dashboard/')
+
+    def test_schedules_use_indexes(self):
+        with self.assertNoFullScans(*self.TABLES):
+            self.get(self.staff, '/api/orders/admin/assignments/', {'date': '2026-01-05'})
+            self.get(self.staff, '/api/orders/admin/manifest/', {'date_from': '2026-01-05'})
+
+
+class DashboardQueryCountTests(APIGetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        for status in ('pending', 'confirmed', 'delivered'):
+            make_order(cls.customer, status=status)
+        rebuild_daily_rollups()
+
+    def test_admin_dashboard_reads_the_rollups_and_the_recent_orders(self):
+        with self.assertNumQueries(2):
+            data = self.get(self.staff, '/api/orders/admin/dashboard/')
+        self.assertEqual(data['statistics']['orders']['total'], 3)
+        self.assertEqual(
+            data['statistics']['status_breakdown'], {'pending': 1, 'confirmed': 1, 'delivered': 1}
+        )
+        self.assertEqual(len(data['recent_orders']), 3)
+
+    def test_order_history_reads_the_stats_row_and_the_recent_orders(self):
+        refresh_customer_stats(self.customer.id)
+        with self.assertNumQueries(2):
+            data = self.get(self.customer, '/api/orders/history/')
+        self.assertEqual(data['statistics']['total_orders'], 3)
+
+
+class OrderStatusSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        category = ServiceCategory.objects.create(name='Laundry')
+        cls.service = Service.objects.create(category=category, name='Shirt', base_price=Decimal('40.00'))
+
+    def make_order_with_items(self, item_count):
+        order = make_order(self.customer)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, service=self.service, quantity=1,
+                      unit_price=self.service.base_price, total_price=self.service.base_price)
+            for _ in range(item_count)
+        ])
+        return order
+
+    def test_status_saves_do_not_grow_with_item_count(self):
+        counts = {}
+        for item_count in (1, 50):
+            order = self.make_order_with_items(item_count)
+            with CaptureQueriesContext(connection) as queries:
+                order.status = 'confirmed'
+                order.save(update_fields=['status'])
+                order.payment_status = 'paid'
+                order.save()
+            counts[item_count] = len(queries)
+            self.assertFalse(any('orders_orderitem' in query['sql'] for query in queries))
+        self.assertEqual(counts[1], counts[50])
@@ -0,0 +1,75 @@
+"""
+Batch recalculation of the stored order totals.
+
+Orders keep their subtotal, GST, delivery fee and total on the row, written by
+``Order.update_totals`` whenever their items change, so lists and dashboards
+read them instead of recomputing per order. ``recalculate_order_totals``
+recomputes them for many orders at once from one query over their item rows,
+using the same ``services.pricing`` engine, and writes only the orders whose
+stored values differ.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from services.pricing import batch_totals
+
+from .customer_stats import refresh_customer_stats
+from .models import Order, OrderItem
+from .rollups import schedule_rollup_refresh
+
+
+TOTAL_FIELDS = ['item_count', 'subtotal', 'tax', 'delivery_fee', 'total_amount']
+
+RECALCULATE_BATCH_SIZE = 1000
+
+
+def recalculate_order_totals(order_ids):
+    """Recompute and store the totals of ``order_ids``; returns the number of orders changed"""
+    order_ids = list(order_ids)
+    if not order_ids:
+        return 0
+
+    totals = batch_totals(
+        OrderItem.objects.filter(order_id__in=order_ids).values_list('order_id', 'total_price'),
+        keys=order_ids,
+    )
+    now = timezone.now()
+    changed = []
+    orders = Order.objects.filter(id__in=order_ids).only(
+        'id', 'customer_id', 'payment_status', 'created_at', *TOTAL_FIELDS
+    )
+    for order in orders:
+        order_totals = totals[order.id]
+        if all(getattr(order, field) == getattr(order_totals, field) for field in TOTAL_FIELDS):
+            continue
+        for field in TOTAL_FIELDS:
+            setattr(order, field, getattr(order_totals, field))
+        # bulk_update skips auto_now
+        order.updated_at = now
+        changed.append(order)
+
+    if not changed:
+        return 0
+
+    with transaction.atomic():
+        Order.objects.bulk_update(changed, TOTAL_FIELDS + ['updated_at'], batch_size=500)
+        # bulk_update sends no signals; paid totals feed the revenue counters
+        paid = [order for order in changed if order.payment_status == 'paid']
+        refresh_customer_stats(*(order.customer_id for order in paid))
+        schedule_rollup_refresh(*(order.created_at for order in paid))
+    return len(changed)
+
+
+def recalculate_all_order_totals(batch_size=RECALCULATE_BATCH_SIZE):
+    """Recompute the totals of every order in primary-key batches"""
+    changed = 0
+    last_id = 0
+    while True:
+        order_ids = list(
+            Order.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not order_ids:
+            break
+        changed += recalculate_order_totals(order_ids)
+        last_id = order_ids[-1]
+    return changed
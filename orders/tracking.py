@@ -0,0 +1,107 @@
+"""
+Cached tracking snapshots for ``orders.views.order_tracking``.
+
+A snapshot is the full tracking payload of one order, stored in the Django
+cache under the order id and a per-order version number. Any change to the
+order, its status history or its schedules bumps the version once the
+transaction commits, so repeated polls of an unchanged order are answered from
+the cache without touching the database.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .serializers import PickupScheduleSerializer, DeliveryScheduleSerializer
+
+
+TRACKING_CACHE_PREFIX = 'orders:tracking'
+
+
+def _version_key(order_id):
+    return f'{TRACKING_CACHE_PREFIX}:version:{order_id}'
+
+
+def _snapshot_key(order_id, version):
+    return f'{TRACKING_CACHE_PREFIX}:{order_id}:v{version}'
+
+
+def _timeout():
+    return getattr(settings, 'ORDER_TRACKING_CACHE_TIMEOUT', 300)
+
+
+def get_tracking_version(order_id):
+    key = _version_key(order_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so an evicted version can never line up with
+        # a snapshot that is still cached under an old number.
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_tracking_snapshot(order_id):
+    """Bump the order's tracking version once the current transaction commits"""
+    def bump():
+        try:
+            cache.incr(_version_key(order_id))
+        except ValueError:
+            get_tracking_version(order_id)
+    transaction.on_commit(bump)
+
+
+def build_tracking_snapshot(order):
+    """
+    Build the tracking payload for ``order`` together with its owner id.
+
+    Load ``order`` with ``order_detail_queryset(fields=TRACKING_FIELDS)`` so the
+    history and schedules come from its joins and prefetches.
+    """
+    # Newest first, the model's default ordering
+    status_history = order.status_history.all()
+    pickup_schedule = getattr(order, 'pickup_schedule', None)
+    delivery_schedule = getattr(order, 'delivery_schedule', None)
+
+    return {
+        'customer_id': order.customer_id,
+        'data': {
+            'order': {
+                'id': order.id,
+                'order_number': order.order_number,
+                'status': order.status,
+                'status_display': order.get_status_display(),
+                'created_at': order.created_at,
+                'estimated_completion': order.estimated_completion,
+            },
+            'status_history': [
+                {
+                    'status': history.status,
+                    'status_display': history.get_status_display(),
+                    'notes': history.notes,
+                    'updated_by': history.updated_by.get_full_name() if history.updated_by else 'System',
+                    'created_at': history.created_at,
+                }
+                for history in status_history
+            ],
+            'pickup_schedule': dict(PickupScheduleSerializer(pickup_schedule).data) if pickup_schedule else None,
+            'delivery_schedule': dict(DeliveryScheduleSerializer(delivery_schedule).data) if delivery_schedule else None,
+        },
+    }
+
+
+def get_tracking_snapshot(order_id, load_order):
+    """
+    Return the cached snapshot for ``order_id``, building it with
+    ``load_order()`` on a miss. ``load_order`` may raise ``Order.DoesNotExist``.
+    """
+    version = get_tracking_version(order_id)
+    key = _snapshot_key(order_id, version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_tracking_snapshot(load_order())
+        # Stored under the version read before building, so a concurrent
+        # invalidation simply makes this entry unreachable.
+        cache.set(key, snapshot, timeout=_timeout())
+    return snapshot
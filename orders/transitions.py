@@ -0,0 +1,124 @@
+"""
+Order status state machine.
+
+``VALID_TRANSITIONS`` is the single source of truth for which status changes
+are allowed. ``apply_status_changes`` validates a whole batch of changes in
+memory against the current statuses, applies them with one UPDATE per target
+status and writes the history rows with one bulk insert.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .customer_stats import refresh_customer_stats
+from .events import publish_status_change
+from .models import Order, OrderStatusHistory
+from .slots import SLOT_FIELDS, release_order_slots
+
+
+VALID_TRANSITIONS = {
+    'pending': ['confirmed', 'cancelled'],
+    'confirmed': ['picked_up', 'cancelled'],
+    'picked_up': ['in_process', 'cancelled'],
+    'in_process': ['ready', 'cancelled'],
+    'ready': ['out_for_delivery', 'cancelled'],
+    'out_for_delivery': ['delivered', 'cancelled'],
+    'delivered': [],
+    'cancelled': [],
+}
+
+
+def can_transition(current_status, new_status):
+    return new_status in VALID_TRANSITIONS.get(current_status, [])
+
+
+def transition_error(current_status, new_status):
+    return f"Cannot transition from '{current_status}' to '{new_status}'"
+
+
+def apply_status_changes(changes, user=None, notes=''):
+    """
+    Apply a batch of status changes.
+
+    ``changes`` is an iterable of ``(order_id, status)`` or
+    ``(order_id, status, notes)`` tuples. Orders are locked and re-read in one
+    query so the transitions are checked against their committed status.
+    Returns ``{'applied': [...], 'rejected': [...]}``; rejected entries carry
+    the order id, the requested status and the reason.
+    """
+    requested = []
+    for change in changes:
+        order_id, new_status = change[0], change[1]
+        change_notes = change[2] if len(change) > 2 and change[2] else notes
+        requested.append((order_id, new_status, change_notes))
+
+    applied = []
+    rejected = []
+
+    with transaction.atomic():
+        orders = {
+            order['id']: order
+            for order in Order.objects.select_for_update()
+            .filter(id__in={order_id for order_id, _, _ in requested})
+            .values('id', 'order_number', 'status', 'customer_id', 'created_at', *SLOT_FIELDS)
+            .order_by()
+        }
+
+        # Validate in memory; later changes for the same order see earlier ones
+        current = {order_id: order['status'] for order_id, order in orders.items()}
+        accepted = {}
+        for order_id, new_status, change_notes in requested:
+            if order_id not in current:
+                rejected.append({'order_id': order_id, 'status': new_status, 'error': 'Order not found.'})
+                continue
+            if not can_transition(current[order_id], new_status):
+                rejected.append({
+                    'order_id': order_id,
+                    'status': new_status,
+                    'error': transition_error(current[order_id], new_status),
+                })
+                continue
+            current[order_id] = new_status
+            accepted.setdefault(order_id, []).append((new_status, change_notes))
+
+        if not accepted:
+            return {'applied': applied, 'rejected': rejected}
+
+        # One UPDATE per final status
+        now = timezone.now()
+        by_status = defaultdict(list)
+        for order_id in accepted:
+            by_status[current[order_id]].append(order_id)
+        for new_status, order_ids in by_status.items():
+            Order.objects.filter(id__in=order_ids).update(status=new_status, updated_at=now)
+
+        OrderStatusHistory.objects.bulk_create([
+            OrderStatusHistory(order_id=order_id, status=new_status, notes=change_notes, updated_by=user)
+            for order_id, steps in accepted.items()
+            for new_status, change_notes in steps
+        ])
+
+        release_order_slots(orders[order_id] for order_id in by_status.get('cancelled', []))
+        refresh_customer_stats(*{orders[order_id]['customer_id'] for order_id in accepted})
+
+        applied = [
+            {'order_id': order_id, 'status': current[order_id]}
+            for order_id in accepted
+        ]
+        _after_bulk_change([orders[order_id] for order_id in accepted])
+        for order_id in accepted:
+            order = orders[order_id]
+            publish_status_change(order_id, order['order_number'], order['customer_id'], current[order_id], now)
+
+    return {'applied': applied, 'rejected': rejected}
+
+
+def _after_bulk_change(orders):
+    """Run the post_save side effects that queryset.update() skips"""
+    from .rollups import schedule_rollup_refresh
+    from .tracking import invalidate_tracking_snapshot
+
+    schedule_rollup_refresh(*{order['created_at'] for order in orders})
+    for order in orders:
+        invalidate_tracking_snapshot(order['id'])
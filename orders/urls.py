@@ -10,12 +10,20 @@ urlpatterns = [
     path('<int:pk>/status/', views.UpdateOrderStatusView.as_view(), name='update_status'),
     path('<int:order_id>/tracking/', views.order_tracking, name='order_tracking'),
     path('<int:order_id>/cancel/', views.cancel_order, name='cancel_order'),
+    path('<int:order_id>/events/', views.order_events, name='order_events'),
+    path('events/', views.my_order_events, name='my_order_events'),
     path('history/', views.order_history, name='order_history'),
+    path('slots/availability/', views.time_slot_availability, name='time_slot_availability'),
     
     # Admin endpoints
     path('admin/', views.AdminOrderListView.as_view(), name='admin_order_list'),
     path('admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin/export/', views.export_orders, name='export_orders'),
+    path('admin/search/', views.admin_search, name='admin_search'),
+    path('admin/bulk-status/', views.bulk_update_order_status, name='bulk_update_order_status'),
     path('admin/<int:order_id>/assign-pickup/', views.assign_pickup_agent, name='assign_pickup_agent'),
     path('admin/<int:order_id>/assign-delivery/', views.assign_delivery_agent, name='assign_delivery_agent'),
     path('admin/assignments/', views.agent_assignments, name='agent_assignments'),
+    path('admin/auto-assign/', views.auto_assign_agents, name='auto_assign_agents'),
+    path('admin/manifest/', views.agent_manifest, name='agent_manifest'),
 ] 
\ No newline at end of file
@@ -1,22 +1,71 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from rest_framework import status, generics, permissions
+from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
-from django.db.models import Q, Count, Sum
+from django.db import transaction
 from django.utils import timezone
-from datetime import datetime, timedelta
+from django.utils.dateparse import parse_date
+from datetime import datetime, time, timedelta
 from .models import Order, OrderItem, OrderStatusHistory, PickupSchedule, DeliverySchedule
+from .customer_stats import get_customer_stats, refresh_customer_stats
+from .events import STAFF_TOPIC, customer_topic, get_broker, order_topic, publish_order_status, status_event
+from .querysets import TRACKING_FIELDS, order_detail_queryset
+from .rollups import dashboard_totals
+from .search import DEFAULT_LIMIT, MAX_LIMIT, get_search_backend, search_customers, search_orders
+from .slots import AVAILABILITY_DAYS, release_order_slots, slot_availability
+from .tracking import get_tracking_snapshot
+from .transitions import apply_status_changes
 from .serializers import (
     OrderSerializer, CreateOrderSerializer, OrderListSerializer,
     UpdateOrderStatusSerializer, OrderFilterSerializer, OrderItemSerializer,
-    PickupScheduleSerializer, DeliveryScheduleSerializer
+    PickupScheduleSerializer, DeliveryScheduleSerializer, BulkStatusUpdateSerializer
 )
 from notifications.tasks import send_order_notification
+from dryclean_project.conditional import ConditionalRetrieveMixin
+from dryclean_project.fieldsets import shape_queryset
+from dryclean_project.pagination import OptionalKeysetPagination
+
+
+def _start_of_day(value):
+    """Parse a YYYY-MM-DD string into an aware datetime at midnight, or None"""
+    try:
+        day = parse_date(value) if isinstance(value, str) else value
+    except ValueError:
+        return None
+    if day is None:
+        return None
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filter_created_between(queryset, date_from=None, date_to=None):
+    """
+    Filter on the creation date with a plain range on ``created_at``.
+
+    ``created_at__date`` wraps the column in a date cast, which stops the
+    database from using the ``created_at`` indexes.
+    """
+    start = _start_of_day(date_from) if date_from else None
+    end = _start_of_day(date_to) if date_to else None
+    if start is not None:
+        queryset = queryset.filter(created_at__gte=start)
+    if end is not None:
+        queryset = queryset.filter(created_at__lt=end + timedelta(days=1))
+    return queryset
 
 
 class OrderListView(generics.ListCreateAPIView):
     serializer_class = OrderListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
     
     def get_queryset(self):
         user = self.request.user
@@ -26,6 +75,8 @@ class OrderListView(generics.ListCreateAPIView):
         else:
             # Regular users can only see their own orders
             queryset = Order.objects.filter(customer=user)
+        # Only join what the requested fields render
+        queryset = shape_queryset(queryset, self.get_serializer_class(), self.request)
         
         # Apply filters
         status_filter = self.request.query_params.get('status')
@@ -40,10 +91,7 @@ class OrderListView(generics.ListCreateAPIView):
             queryset = queryset.filter(order_type=order_type)
         if payment_status:
             queryset = queryset.filter(payment_status=payment_status)
-        if date_from:
-            queryset = queryset.filter(created_at__date__gte=date_from)
-        if date_to:
-            queryset = queryset.filter(created_at__date__lte=date_to)
+        queryset = filter_created_between(queryset, date_from, date_to)
         
         return queryset.order_by('-created_at')
     
@@ -53,15 +101,27 @@ class OrderListView(generics.ListCreateAPIView):
         return OrderListSerializer
 
 
-class OrderDetailView(generics.RetrieveUpdateDestroyAPIView):
+class OrderDetailView(ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Everything OrderSerializer renders; user changes re-save the profile
+    version_timestamps = [
+        'updated_at', 'customer__userprofile__updated_at',
+        'items__updated_at', 'items__service__updated_at',
+        'items__service__category__updated_at', 'items__variant__updated_at',
+        'status_history__created_at', 'status_history__updated_by__userprofile__updated_at',
+        'pickup_schedule__updated_at', 'pickup_schedule__pickup_agent__userprofile__updated_at',
+        'delivery_schedule__updated_at', 'delivery_schedule__delivery_agent__userprofile__updated_at',
+    ]
+    version_counts = ['items', 'status_history']
     
     def get_queryset(self):
         user = self.request.user
         if user.is_staff:
-            return Order.objects.all()
-        return Order.objects.filter(customer=user)
+            queryset = Order.objects.all()
+        else:
+            queryset = Order.objects.filter(customer=user)
+        return order_detail_queryset(queryset, self.request)
 
 
 class UpdateOrderStatusView(generics.UpdateAPIView):
@@ -99,49 +159,22 @@ class UpdateOrderStatusView(generics.UpdateAPIView):
 @permission_classes([permissions.IsAuthenticated])
 def order_tracking(request, order_id):
     """Get detailed tracking information for an order"""
+    def load_order():
+        return order_detail_queryset(fields=TRACKING_FIELDS).get(id=order_id)
+    
     try:
-        user = request.user
-        if user.is_staff:
-            order = Order.objects.get(id=order_id)
-        else:
-            order = Order.objects.get(id=order_id, customer=user)
-        
-        # Get status history
-        status_history = order.status_history.order_by('-created_at')
-        
-        # Get pickup and delivery schedules
-        pickup_schedule = getattr(order, 'pickup_schedule', None)
-        delivery_schedule = getattr(order, 'delivery_schedule', None)
-        
-        tracking_data = {
-            'order': {
-                'id': order.id,
-                'order_number': order.order_number,
-                'status': order.status,
-                'status_display': order.get_status_display(),
-                'created_at': order.created_at,
-                'estimated_completion': order.estimated_completion,
-            },
-            'status_history': [
-                {
-                    'status': history.status,
-                    'status_display': history.get_status_display(),
-                    'notes': history.notes,
-                    'updated_by': history.updated_by.get_full_name() if history.updated_by else 'System',
-                    'created_at': history.created_at,
-                }
-                for history in status_history
-            ],
-            'pickup_schedule': PickupScheduleSerializer(pickup_schedule).data if pickup_schedule else None,
-            'delivery_schedule': DeliveryScheduleSerializer(delivery_schedule).data if delivery_schedule else None,
-        }
-        
-        return Response(tracking_data)
-        
+        # Served from the snapshot cache until the order changes
+        snapshot = get_tracking_snapshot(order_id, load_order)
     except Order.DoesNotExist:
+        snapshot = None
+    
+    user = request.user
+    if snapshot is None or (not user.is_staff and snapshot['customer_id'] != user.id):
         return Response({
             'error': 'Order not found.'
         }, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response(snapshot['data'])
 
 
 @api_view(['GET'])
@@ -153,23 +186,17 @@ def order_history(request):
     # Get all orders for the user
     orders = Order.objects.filter(customer=user).order_by('-created_at')
     
-    # Calculate statistics
-    total_orders = orders.count()
-    total_spent = orders.filter(payment_status='paid').aggregate(
-        total=Sum('total_amount')
-    )['total'] or 0
-    
-    status_counts = orders.values('status').annotate(count=Count('id'))
-    status_stats = {item['status']: item['count'] for item in status_counts}
+    # Maintained per customer, read by primary key
+    stats = get_customer_stats(user)
     
     # Get recent orders
-    recent_orders = orders[:10]
+    recent_orders = orders.select_related('customer')[:10]
     
     history_data = {
         'statistics': {
-            'total_orders': total_orders,
-            'total_spent': total_spent,
-            'status_breakdown': status_stats,
+            'total_orders': stats['total_orders'],
+            'total_spent': stats['total_spent'],
+            'status_breakdown': stats['status_breakdown'],
         },
         'recent_orders': OrderListSerializer(recent_orders, many=True).data
     }
@@ -177,6 +204,33 @@ def order_history(request):
     return Response(history_data)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def time_slot_availability(request):
+    """Free places per pickup or delivery time slot for the next 14 days"""
+    kind = request.query_params.get('kind', 'pickup')
+    if kind not in ('pickup', 'delivery'):
+        return Response({
+            'error': "kind must be 'pickup' or 'delivery'."
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    raw_start = request.query_params.get('date_from')
+    try:
+        start = parse_date(raw_start) if raw_start else timezone.localdate()
+    except ValueError:
+        start = None
+    if start is None:
+        return Response({
+            'error': 'Invalid date. Use YYYY-MM-DD.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    start = max(start, timezone.localdate())
+    
+    return Response({
+        'kind': kind,
+        'days': slot_availability(kind, start, AVAILABILITY_DAYS),
+    })
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def cancel_order(request, order_id):
@@ -194,17 +248,23 @@ def cancel_order(request, order_id):
                 'error': 'Order cannot be cancelled.'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Update order status
-        order.status = 'cancelled'
-        order.save()
-        
-        # Create status history
-        OrderStatusHistory.objects.create(
-            order=order,
-            status='cancelled',
-            notes='Order cancelled by customer' if not user.is_staff else 'Order cancelled by admin',
-            updated_by=user
-        )
+        with transaction.atomic():
+            # Update order status
+            order.status = 'cancelled'
+            order.save(update_fields=['status', 'updated_at'])
+            
+            # Give the pickup/delivery slot places back
+            release_order_slots([order])
+            
+            # Create status history
+            OrderStatusHistory.objects.create(
+                order=order,
+                status='cancelled',
+                notes='Order cancelled by customer' if not user.is_staff else 'Order cancelled by admin',
+                updated_by=user
+            )
+            refresh_customer_stats(order.customer_id)
+            publish_order_status(order)
         
         # Send notification
         send_order_notification.delay(
@@ -225,110 +285,245 @@ def cancel_order(request, order_id):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+# Live status events (server-sent events, ASGI only)
+async def _event_stream_user(request):
+    """Authenticate an event stream by session, or by ``Authorization: Token``"""
+    user = await request.auser()
+    if user.is_authenticated:
+        return user
+    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+    if keyword != 'Token' or not key.strip():
+        return None
+    try:
+        user, _ = await sync_to_async(TokenAuthentication().authenticate_credentials)(key.strip())
+    except AuthenticationFailed:
+        return None
+    return user
+
+
+def _sse_message(event):
+    return f"event: status\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def _status_event_stream(topics, load_initial=None):
+    """Subscribe to ``topics`` and yield SSE messages until the client goes away"""
+    keepalive = getattr(settings, 'ORDER_EVENTS_KEEPALIVE', 15)
+    subscription = await get_broker().subscribe(topics)
+    try:
+        yield 'retry: 5000\n\n'
+        if load_initial is not None:
+            # Read after subscribing so no change can fall in between
+            yield _sse_message(await load_initial())
+        while True:
+            event = await subscription.get(keepalive)
+            if event is None:
+                yield ': keepalive\n\n'
+            else:
+                yield _sse_message(event)
+    finally:
+        await subscription.close()
+
+
+def _event_stream_response(request, stream):
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be held by the stream for as long as it is open
+        return JsonResponse({
+            'error': 'Event streams are only served by the ASGI application.'
+        }, status=status.HTTP_501_NOT_IMPLEMENTED)
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def order_events(request, order_id):
+    """Stream status changes of one order, starting with its current status"""
+    user = await _event_stream_user(request)
+    if user is None:
+        return JsonResponse({
+            'detail': 'Authentication credentials were not provided.'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    
+    orders = Order.objects.only('id', 'order_number', 'customer_id', 'status', 'updated_at')
+    if not user.is_staff:
+        orders = orders.filter(customer=user)
+    if not await orders.filter(id=order_id).aexists():
+        return JsonResponse({
+            'error': 'Order not found.'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    async def load_initial():
+        order = await orders.aget(id=order_id)
+        return status_event(order.id, order.order_number, order.customer_id, order.status, order.updated_at)
+    
+    return _event_stream_response(request, _status_event_stream([order_topic(order_id)], load_initial))
+
+
+async def my_order_events(request):
+    """Stream status changes of the user's orders (all orders for staff)"""
+    user = await _event_stream_user(request)
+    if user is None:
+        return JsonResponse({
+            'detail': 'Authentication credentials were not provided.'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    
+    topic = STAFF_TOPIC if user.is_staff else customer_topic(user.id)
+    return _event_stream_response(request, _status_event_stream([topic]))
+
+
 # Admin views
+def filter_admin_orders(queryset, params):
+    """Apply the admin order list filters from ``params`` to ``queryset``"""
+    status_filter = params.get('status')
+    order_type = params.get('order_type')
+    payment_status = params.get('payment_status')
+    customer_id = params.get('customer_id')
+    date_from = params.get('date_from')
+    date_to = params.get('date_to')
+    search = params.get('search')
+    
+    if search:
+        queryset = queryset.filter(get_search_backend().order_filter(search))
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+    if order_type:
+        queryset = queryset.filter(order_type=order_type)
+    if payment_status:
+        queryset = queryset.filter(payment_status=payment_status)
+    if customer_id:
+        queryset = queryset.filter(customer_id=customer_id)
+    return filter_created_between(queryset, date_from, date_to)
+
+
 class AdminOrderListView(generics.ListAPIView):
     serializer_class = OrderListSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = OptionalKeysetPagination
     
     def get_queryset(self):
-        queryset = Order.objects.all()
-        
-        # Apply filters
-        status_filter = self.request.query_params.get('status')
-        order_type = self.request.query_params.get('order_type')
-        payment_status = self.request.query_params.get('payment_status')
-        customer_id = self.request.query_params.get('customer_id')
-        date_from = self.request.query_params.get('date_from')
-        date_to = self.request.query_params.get('date_to')
-        
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-        if order_type:
-            queryset = queryset.filter(order_type=order_type)
-        if payment_status:
-            queryset = queryset.filter(payment_status=payment_status)
-        if customer_id:
-            queryset = queryset.filter(customer_id=customer_id)
-        if date_from:
-            queryset = queryset.filter(created_at__date__gte=date_from)
-        if date_to:
-            queryset = queryset.filter(created_at__date__lte=date_to)
-        
+        queryset = shape_queryset(Order.objects.all(), self.get_serializer_class(), self.request)
+        queryset = filter_admin_orders(queryset, self.request.query_params)
         return queryset.order_by('-created_at')
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def export_orders(request):
+    """
+    Stream all orders matching the admin list filters, with items and payments.
+
+    ``?output=csv`` (default) writes one line per order item; ``?output=ndjson``
+    writes one JSON object per order.
+    """
+    from .export import iter_csv, iter_ndjson
+    
+    output = request.query_params.get('output', 'csv')
+    if output not in ('csv', 'ndjson'):
+        return Response({
+            'error': "output must be 'csv' or 'ndjson'."
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    queryset = filter_admin_orders(Order.objects.all(), request.query_params)
+    
+    if output == 'csv':
+        response = StreamingHttpResponse(iter_csv(queryset), content_type='text/csv')
+    else:
+        response = StreamingHttpResponse(iter_ndjson(queryset), content_type='application/x-ndjson')
+    filename = f"orders-{timezone.localdate().isoformat()}.{output}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def admin_search(request):
+    """Orders and customers matching ``?q=``, best match first"""
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({
+            'error': 'q is required.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        limit = min(int(request.query_params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    limit = max(limit, 1)
+    
+    orders = search_orders(
+        query, limit, shape_queryset(Order.objects.all(), OrderListSerializer, request)
+    )
+    customers = search_customers(query, limit)
+    
+    return Response({
+        'query': query,
+        'orders': OrderListSerializer(orders, many=True, context={'request': request}).data,
+        'customers': [
+            {
+                'id': customer.id,
+                'username': customer.username,
+                'email': customer.email,
+                'full_name': customer.get_full_name(),
+            }
+            for customer in customers
+        ],
+    })
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def bulk_update_order_status(request):
+    """Apply many status changes at once, e.g. from a scanning station"""
+    serializer = BulkStatusUpdateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    updates = serializer.validated_data['updates']
+    
+    # Resolve scanned order numbers with a single query
+    order_numbers = {update['order_number'] for update in updates if not update.get('order_id')}
+    ids_by_number = dict(
+        Order.objects.filter(order_number__in=order_numbers).values_list('order_number', 'id')
+    ) if order_numbers else {}
+    
+    changes = []
+    unknown = []
+    for update in updates:
+        order_id = update.get('order_id') or ids_by_number.get(update['order_number'])
+        if order_id is None:
+            unknown.append({
+                'order_number': update['order_number'],
+                'status': update['status'],
+                'error': 'Order not found.',
+            })
+            continue
+        changes.append((order_id, update['status'], update.get('notes', '')))
+    
+    result = apply_status_changes(
+        changes,
+        user=request.user,
+        notes=serializer.validated_data.get('notes', '')
+    )
+    
+    return Response({
+        'updated': len(result['applied']),
+        'applied': result['applied'],
+        'rejected': unknown + result['rejected'],
+    })
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
 def admin_dashboard(request):
     """Admin dashboard with order statistics"""
-    today = timezone.now().date()
-    last_week = today - timedelta(days=7)
-    last_month = today - timedelta(days=30)
-    
-    # Order statistics
-    total_orders = Order.objects.count()
-    today_orders = Order.objects.filter(created_at__date=today).count()
-    week_orders = Order.objects.filter(created_at__date__gte=last_week).count()
-    month_orders = Order.objects.filter(created_at__date__gte=last_month).count()
-    
-    # Revenue statistics
-    total_revenue = Order.objects.filter(payment_status='paid').aggregate(
-        total=Sum('total_amount')
-    )['total'] or 0
-    
-    today_revenue = Order.objects.filter(
-        created_at__date=today,
-        payment_status='paid'
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-    
-    week_revenue = Order.objects.filter(
-        created_at__date__gte=last_week,
-        payment_status='paid'
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-    
-    month_revenue = Order.objects.filter(
-        created_at__date__gte=last_month,
-        payment_status='paid'
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-    
-    # Status breakdown
-    status_counts = Order.objects.values('status').annotate(count=Count('id'))
-    status_breakdown = {item['status']: item['count'] for item in status_counts}
+    # Counters come from the daily rollup rows instead of scanning all orders
+    statistics = dashboard_totals()
     
     # Recent orders
     recent_orders = Order.objects.select_related('customer').order_by('-created_at')[:10]
     
-    # Pending actions
-    pending_pickups = PickupSchedule.objects.filter(
-        is_completed=False,
-        scheduled_date__gte=today
-    ).count()
-    
-    pending_deliveries = DeliverySchedule.objects.filter(
-        is_completed=False,
-        scheduled_date__gte=today
-    ).count()
-    
     dashboard_data = {
-        'statistics': {
-            'orders': {
-                'total': total_orders,
-                'today': today_orders,
-                'week': week_orders,
-                'month': month_orders,
-            },
-            'revenue': {
-                'total': total_revenue,
-                'today': today_revenue,
-                'week': week_revenue,
-                'month': month_revenue,
-            },
-            'status_breakdown': status_breakdown,
-            'pending_actions': {
-                'pickups': pending_pickups,
-                'deliveries': pending_deliveries,
-            }
-        },
+        'statistics': statistics,
         'recent_orders': OrderListSerializer(recent_orders, many=True).data
     }
     
@@ -434,12 +629,12 @@ def agent_assignments(request):
     pickup_assignments = PickupSchedule.objects.filter(
         scheduled_date=today,
         is_completed=False
-    ).select_related('order', 'pickup_agent')
+    ).select_related('order__customer', 'pickup_agent')
     
     delivery_assignments = DeliverySchedule.objects.filter(
         scheduled_date=today,
         is_completed=False
-    ).select_related('order', 'delivery_agent')
+    ).select_related('order__customer', 'delivery_agent')
     
     assignments_data = {
         'pickup_assignments': [
@@ -469,3 +664,111 @@ def agent_assignments(request):
     }
     
     return Response(assignments_data)
+
+
+MANIFEST_MAX_DAYS = 14
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def agent_manifest(request):
+    """
+    Pickup and delivery stops per agent for a date range.
+
+    Query parameters: ``date_from`` (default today), ``date_to`` (default
+    ``date_from``), ``agent_id``, ``include_completed`` and ``stream``.
+    With ``stream=true`` the stops are written as newline-delimited JSON while
+    they are read, instead of being grouped into one response.
+    """
+    from .manifest import build_manifest, iter_manifest_stops
+
+    raw_from = request.query_params.get('date_from')
+    raw_to = request.query_params.get('date_to')
+    try:
+        date_from = parse_date(raw_from) if raw_from else timezone.localdate()
+        date_to = parse_date(raw_to) if raw_to else date_from
+    except ValueError:
+        date_from = date_to = None
+    if date_from is None or date_to is None:
+        return Response({
+            'error': 'Invalid date. Use YYYY-MM-DD.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if date_to < date_from:
+        return Response({
+            'error': 'date_to must not be before date_from.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if (date_to - date_from).days >= MANIFEST_MAX_DAYS:
+        return Response({
+            'error': f'Date range cannot exceed {MANIFEST_MAX_DAYS} days.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    agent_id = request.query_params.get('agent_id')
+    if agent_id is not None:
+        try:
+            agent_id = int(agent_id)
+        except ValueError:
+            return Response({
+                'error': 'agent_id must be an integer.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    include_completed = request.query_params.get('include_completed', '').lower() == 'true'
+
+    if request.query_params.get('stream', '').lower() == 'true':
+        stops = iter_manifest_stops(date_from, date_to, agent_id, include_completed)
+        lines = (json.dumps(stop, cls=DjangoJSONEncoder) + '\n' for stop in stops)
+        return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+    return Response(build_manifest(date_from, date_to, agent_id, include_completed))
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def auto_assign_agents(request):
+    """
+    Assign all unassigned pickups and/or deliveries for a date in one batch.
+
+    Body: ``date`` (default today), ``kind`` (``pickup``, ``delivery`` or
+    ``both``), optional ``time_slot``, ``agent_ids`` and ``dry_run``.
+    """
+    from .assignment import auto_assign
+
+    raw_date = request.data.get('date')
+    try:
+        day = parse_date(raw_date) if raw_date else timezone.localdate()
+    except ValueError:
+        day = None
+    if day is None:
+        return Response({
+            'error': 'Invalid date. Use YYYY-MM-DD.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    kind = request.data.get('kind', 'both')
+    if kind not in ('pickup', 'delivery', 'both'):
+        return Response({
+            'error': "kind must be 'pickup', 'delivery' or 'both'."
+        }, status=status.HTTP_400_BAD_REQUEST)
+    kinds = ('pickup', 'delivery') if kind == 'both' else (kind,)
+
+    agent_ids = request.data.get('agent_ids')
+    if agent_ids is not None:
+        if not isinstance(agent_ids, list) or not all(isinstance(agent_id, int) for agent_id in agent_ids):
+            return Response({
+                'error': 'agent_ids must be a list of user IDs.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    dry_run = request.data.get('dry_run') in (True, 'true', 'True', '1')
+
+    summary = auto_assign(
+        day,
+        kinds=kinds,
+        time_slot=request.data.get('time_slot') or None,
+        agent_ids=agent_ids,
+        dry_run=dry_run,
+    )
+    if not summary['agents']:
+        return Response({
+            'error': 'No active staff agents available.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(summary)
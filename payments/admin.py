@@ -1,6 +1,8 @@
 from django.contrib import admin
 from .models import Payment, PaymentTransaction, Refund, PaymentMethod
+from django.db import transaction
 from django.utils import timezone
+from orders.customer_stats import refresh_customer_stats
 
 
 class PaymentTransactionInline(admin.TabularInline):
@@ -44,14 +46,16 @@ class PaymentAdmin(admin.ModelAdmin):
     def mark_as_completed(self, request, queryset):
         for payment in queryset:
             if payment.status == 'pending':
-                payment.status = 'completed'
-                payment.completed_at = timezone.now()
-                payment.save()
-                
-                # Update order payment status
-                payment.order.payment_status = 'paid'
-                payment.order.payment_method = payment.payment_method
-                payment.order.save()
+                with transaction.atomic():
+                    payment.status = 'completed'
+                    payment.completed_at = timezone.now()
+                    payment.save()
+                    
+                    # Update order payment status
+                    payment.order.payment_status = 'paid'
+                    payment.order.payment_method = payment.payment_method
+                    payment.order.save(update_fields=['payment_status', 'payment_method', 'updated_at'])
+                    refresh_customer_stats(payment.order.customer_id)
         self.message_user(request, f"{queryset.count()} payments marked as completed.")
     mark_as_completed.short_description = "Mark selected payments as completed"
     
@@ -48,6 +48,14 @@ class Payment(models.Model):
         verbose_name = "Payment"
         verbose_name_plural = "Payments"
         ordering = ['-created_at']
+        indexes = [
+            # User payment list and stats
+            models.Index(fields=['user', '-created_at'], name='payment_user_created_idx'),
+            models.Index(fields=['user', 'status'], name='payment_user_status_idx'),
+            models.Index(fields=['-created_at', '-id'], name='payment_created_id_idx'),
+            # Webhook lookups
+            models.Index(fields=['gateway_order_id'], name='payment_gateway_order_idx'),
+        ]
 
 
 class PaymentTransaction(models.Model):
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Payment, PaymentTransaction, Refund, PaymentMethod
 from orders.models import Order
+from dryclean_project.fieldsets import SparseFieldsetMixin
 from django.db import models
 
 
@@ -24,11 +25,20 @@ class PaymentTransactionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     transactions = PaymentTransactionSerializer(many=True, read_only=True)
     order_number = serializers.CharField(source='order.order_number', read_only=True)
     customer_name = serializers.CharField(source='user.get_full_name', read_only=True)
     
+    expandable_fields = {
+        'transactions': False,
+    }
+    related_lookups = {
+        'order_number': (['order'], []),
+        'customer_name': (['user'], []),
+        'transactions': ([], ['transactions']),
+    }
+    
     class Meta:
         model = Payment
         fields = [
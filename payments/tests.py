@@ -1,3 +1,53 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
 from django.test import TestCase
 
-# Create your tests here.
+from dryclean_project.testing import APIGetMixin, QueryPlanAssertions
+from orders.models import Order
+from .models import Payment
+
+
+class PaymentQueryPlanTests(APIGetMixin, QueryPlanAssertions, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        order = Order.objects.create(
+            customer=cls.customer, pickup_address='12 Main Street',
+            pickup_date=date(2026, 1, 5), pickup_time_slot='9:00 AM - 12:00 PM',
+        )
+        Payment.objects.create(order=order, user=cls.customer, payment_method='cod', amount=Decimal('100.00'))
+
+    def test_list_and_stats_use_indexes(self):
+        with self.assertNoFullScans('payments_payment'):
+            self.get(self.customer, '/api/payments/')
+            self.get(self.customer, '/api/payments/', {'cursor': ''})
+            self.get(self.customer, '/api/payments/stats/')
+            self.get(self.staff, '/api/payments/', {'cursor': ''})
+
+
+class PaymentStatsQueryCountTests(APIGetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        order = Order.objects.create(
+            customer=cls.customer, pickup_address='12 Main Street',
+            pickup_date=date(2026, 1, 5), pickup_time_slot='9:00 AM - 12:00 PM',
+        )
+        for amount, status in [('100.00', 'completed'), ('250.50', 'completed'), ('80.00', 'pending'), ('40.00', 'failed')]:
+            Payment.objects.create(
+                order=order, user=cls.customer, payment_method='cod', amount=Decimal(amount), status=status
+            )
+
+    def test_stats_take_a_single_query(self):
+        with self.assertNumQueries(1):
+            data = self.get(self.customer, '/api/payments/stats/')
+        self.assertEqual(data, {
+            'total_payments': 4,
+            'total_amount': Decimal('350.50'),
+            'pending_payments': 1,
+            'failed_payments': 1,
+            'completed_payments': 2,
+        })
@@ -3,6 +3,7 @@ from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 import stripe
 import razorpay
@@ -12,8 +13,11 @@ from .serializers import (
     PaymentMethodCreateSerializer, PaymentMethodUpdateSerializer,
     RefundSerializer, CreateRefundSerializer
 )
+from orders.customer_stats import refresh_customer_stats
 from orders.models import Order
-from django.db.models import Sum
+from dryclean_project.fieldsets import shape_queryset
+from dryclean_project.pagination import OptionalKeysetPagination
+from dryclean_project.stats import StatsQuery
 
 # Initialize payment gateways
 stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -23,12 +27,15 @@ razorpay_client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZOR
 class PaymentListView(generics.ListCreateAPIView):
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
     
     def get_queryset(self):
         user = self.request.user
         if user.is_staff:
-            return Payment.objects.all()
-        return Payment.objects.filter(user=user)
+            queryset = Payment.objects.all()
+        else:
+            queryset = Payment.objects.filter(user=user)
+        return shape_queryset(queryset, self.get_serializer_class(), self.request)
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -43,8 +50,10 @@ class PaymentDetailView(generics.RetrieveAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.is_staff:
-            return Payment.objects.all()
-        return Payment.objects.filter(user=user)
+            queryset = Payment.objects.all()
+        else:
+            queryset = Payment.objects.filter(user=user)
+        return shape_queryset(queryset, self.get_serializer_class(), self.request)
 
 
 class PaymentMethodListView(generics.ListCreateAPIView):
@@ -221,26 +230,28 @@ def handle_stripe_payment_success(payment_intent):
     """Handle successful Stripe payment"""
     try:
         payment = Payment.objects.get(gateway_order_id=payment_intent['id'])
-        payment.status = 'completed'
-        payment.gateway_payment_id = payment_intent['id']
-        payment.completed_at = timezone.now()
-        payment.save()
-        
-        # Update order payment status
-        order = payment.order
-        order.payment_status = 'paid'
-        order.payment_method = 'stripe'
-        order.save()
-        
-        # Create payment transaction
-        PaymentTransaction.objects.create(
-            payment=payment,
-            transaction_id=payment_intent['id'],
-            amount=payment.amount,
-            currency=payment.currency,
-            status='completed',
-            gateway_response=payment_intent,
-        )
+        with transaction.atomic():
+            payment.status = 'completed'
+            payment.gateway_payment_id = payment_intent['id']
+            payment.completed_at = timezone.now()
+            payment.save()
+            
+            # Update order payment status
+            order = payment.order
+            order.payment_status = 'paid'
+            order.payment_method = 'stripe'
+            order.save(update_fields=['payment_status', 'payment_method', 'updated_at'])
+            refresh_customer_stats(order.customer_id)
+            
+            # Create payment transaction
+            PaymentTransaction.objects.create(
+                payment=payment,
+                transaction_id=payment_intent['id'],
+                amount=payment.amount,
+                currency=payment.currency,
+                status='completed',
+                gateway_response=payment_intent,
+            )
         
     except Payment.DoesNotExist:
         pass
@@ -272,26 +283,28 @@ def handle_razorpay_payment_success(payment_data):
     """Handle successful Razorpay payment"""
     try:
         payment = Payment.objects.get(gateway_order_id=payment_data['order_id'])
-        payment.status = 'completed'
-        payment.gateway_payment_id = payment_data['id']
-        payment.completed_at = timezone.now()
-        payment.save()
-        
-        # Update order payment status
-        order = payment.order
-        order.payment_status = 'paid'
-        order.payment_method = 'razorpay'
-        order.save()
-        
-        # Create payment transaction
-        PaymentTransaction.objects.create(
-            payment=payment,
-            transaction_id=payment_data['id'],
-            amount=payment.amount,
-            currency=payment.currency,
-            status='completed',
-            gateway_response=payment_data,
-        )
+        with transaction.atomic():
+            payment.status = 'completed'
+            payment.gateway_payment_id = payment_data['id']
+            payment.completed_at = timezone.now()
+            payment.save()
+            
+            # Update order payment status
+            order = payment.order
+            order.payment_status = 'paid'
+            order.payment_method = 'razorpay'
+            order.save(update_fields=['payment_status', 'payment_method', 'updated_at'])
+            refresh_customer_stats(order.customer_id)
+            
+            # Create payment transaction
+            PaymentTransaction.objects.create(
+                payment=payment,
+                transaction_id=payment_data['id'],
+                amount=payment.amount,
+                currency=payment.currency,
+                status='completed',
+                gateway_response=payment_data,
+            )
         
     except Payment.DoesNotExist:
         pass
@@ -443,14 +456,12 @@ def payment_stats(request):
     
     payments = Payment.objects.filter(user=user)
     
-    stats = {
-        'total_payments': payments.count(),
-        'total_amount': payments.filter(status='completed').aggregate(
-            total=Sum('amount')
-        )['total'] or 0,
-        'pending_payments': payments.filter(status='pending').count(),
-        'failed_payments': payments.filter(status='failed').count(),
-        'completed_payments': payments.filter(status='completed').count(),
-    }
+    stats = (StatsQuery()
+             .count('total_payments')
+             .sum('total_amount', 'amount', status='completed')
+             .count('pending_payments', status='pending')
+             .count('failed_payments', status='failed')
+             .count('completed_payments', status='completed')
+             .evaluate(payments))
     
     return Response(stats)
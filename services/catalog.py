@@ -0,0 +1,146 @@
+"""
+In-process cache of the active service catalog.
+
+Each worker keeps one ``CatalogSnapshot``: the serialized categories with
+their services, the active services and the popular list, built together from
+a handful of queries. Snapshots are keyed by a catalog version number held in
+the Django cache. Saving or deleting a category, service, variant or pricing
+rule bumps the version once the transaction commits.
+
+The compiled price table in ``services.pricing`` is keyed by the same version.
+A worker compares its snapshots with the shared version at most every
+``SERVICE_CATALOG_CHECK_INTERVAL`` seconds, so a change reaches every worker
+within that interval when the cache is shared (Redis). Snapshots are also
+rebuilt once they are ``SERVICE_CATALOG_MAX_AGE`` seconds old, which bounds
+staleness when each worker has its own local-memory cache.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .models import Service, ServiceCategory, ServiceVariant
+from .serializers import ServiceCategorySerializer, ServiceSerializer
+
+
+CATALOG_VERSION_KEY = 'services:catalog:version'
+
+POPULAR_SERVICE_COUNT = 6
+
+
+def _check_interval():
+    return getattr(settings, 'SERVICE_CATALOG_CHECK_INTERVAL', 5)
+
+
+def _max_age():
+    return getattr(settings, 'SERVICE_CATALOG_MAX_AGE', 300)
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Start from the clock so an evicted version never repeats an old one
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def _bump_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        get_catalog_version()
+    # This worker made the change, so it does not wait for its next check
+    for store in _stores:
+        store.clear()
+
+
+def invalidate_catalog():
+    """Bump the catalog version once the current transaction commits"""
+    transaction.on_commit(_bump_version)
+
+
+class CatalogSnapshot:
+    """The serialized active catalog at one version; treat it as read-only"""
+
+    def __init__(self, version):
+        self.version = version
+
+        services = Prefetch('services', Service.objects.prefetch_related('variants'))
+        self.categories = ServiceCategorySerializer(
+            ServiceCategory.objects.filter(is_active=True).prefetch_related(services), many=True
+        ).data
+
+        active = list(Service.objects.filter(is_active=True).prefetch_related(
+            Prefetch('variants', ServiceVariant.objects.all())
+        ))
+        self.services = ServiceSerializer(active, many=True).data
+        self.services_by_id = {service['id']: service for service in self.services}
+        self.category_names = {
+            category.id: category.name for category in ServiceCategory.objects.all()
+        }
+        newest = sorted(
+            range(len(active)), key=lambda index: active[index].created_at, reverse=True
+        )[:POPULAR_SERVICE_COUNT]
+        self.popular = [self.services[index] for index in newest]
+
+    def services_in_category(self, category_id):
+        return [service for service in self.services if str(service['category']) == str(category_id)]
+
+    def search_services(self, query):
+        """Active services whose name, description or category name contains ``query``"""
+        query = query.lower()
+        return [
+            service for service in self.services
+            if query in service['name'].lower()
+            or query in (service['description'] or '').lower()
+            or query in self.category_names.get(service['category'], '').lower()
+        ]
+
+
+class VersionedStore:
+    """
+    One worker-local object built by ``build(version)`` for the current
+    catalog version, checked against the shared version at most every
+    ``SERVICE_CATALOG_CHECK_INTERVAL`` seconds.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self.snapshot = None
+        self.built_at = 0.0
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+        _stores.append(self)
+
+    def clear(self):
+        with self.lock:
+            self.snapshot = None
+
+    def get(self):
+        now = time.monotonic()
+        snapshot = self.snapshot
+        if snapshot is not None and now - self.checked_at < _check_interval():
+            return snapshot
+
+        with self.lock:
+            snapshot = self.snapshot
+            version = get_catalog_version()
+            if snapshot is None or snapshot.version != version or now - self.built_at >= _max_age():
+                snapshot = self.build(version)
+                self.snapshot = snapshot
+                self.built_at = now
+            self.checked_at = now
+            return snapshot
+
+
+_stores = []
+_catalog_store = VersionedStore(CatalogSnapshot)
+
+
+def get_catalog():
+    """This worker's snapshot of the active catalog, rebuilt when it is out of date"""
+    return _catalog_store.get()
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-17 00:05
+
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    """Create and fill the FTS5 service search table on SQLite"""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS services_service_search USING fts5("
+        "name, description, category, "
+        "tokenize = 'porter unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO services_service_search (rowid, name, description, category) "
+        "SELECT s.id, s.name, coalesce(s.description, ''), c.name "
+        "FROM services_service s JOIN services_servicecategory c ON c.id = s.category_id "
+        "WHERE s.is_active"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS services_service_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("services", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -1,4 +1,7 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 
 class ServiceCategory(models.Model):
@@ -69,6 +72,61 @@ class PricingRule(models.Model):
             return f"{self.service.name} - {self.variant.name} ({self.min_quantity}-{self.max_quantity or '∞'})"
         return f"{self.service.name} ({self.min_quantity}-{self.max_quantity or '∞'})"
 
+    def overlapping_rules(self):
+        """Other active rules of the same service and variant whose quantities overlap this one"""
+        rules = PricingRule.objects.filter(
+            service_id=self.service_id, variant_id=self.variant_id, is_active=True
+        ).filter(models.Q(max_quantity__isnull=True) | models.Q(max_quantity__gte=self.min_quantity))
+        if self.max_quantity is not None:
+            rules = rules.filter(min_quantity__lte=self.max_quantity)
+        if self.pk:
+            rules = rules.exclude(pk=self.pk)
+        return rules
+
+    def clean(self):
+        if self.max_quantity is not None and self.max_quantity < self.min_quantity:
+            raise ValidationError({'max_quantity': "Maximum quantity cannot be below the minimum quantity."})
+        if self.is_active and self.service_id is not None:
+            overlapping = self.overlapping_rules().select_related('service', 'variant').first()
+            if overlapping is not None:
+                raise ValidationError(f"Quantities overlap the active pricing rule {overlapping}.")
+
     class Meta:
         verbose_name = "Pricing Rule"
         verbose_name_plural = "Pricing Rules"
+
+
+@receiver(post_save, sender=ServiceCategory)
+@receiver(post_delete, sender=ServiceCategory)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=ServiceVariant)
+@receiver(post_delete, sender=ServiceVariant)
+@receiver(post_save, sender=PricingRule)
+@receiver(post_delete, sender=PricingRule)
+def invalidate_service_catalog(sender, instance, **kwargs):
+    from .catalog import invalidate_catalog
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Service)
+def index_service_for_search(sender, instance, update_fields=None, **kwargs):
+    from .search import SERVICE_INDEXED_FIELDS, get_search_backend
+    if update_fields is not None and not SERVICE_INDEXED_FIELDS & set(update_fields):
+        return
+    get_search_backend().index_services([instance.pk])
+
+
+@receiver(post_delete, sender=Service)
+def remove_service_from_search(sender, instance, **kwargs):
+    from .search import get_search_backend
+    get_search_backend().remove_services([instance.pk])
+
+
+@receiver(post_save, sender=ServiceCategory)
+def index_category_for_search(sender, instance, created, update_fields=None, **kwargs):
+    from .search import CATEGORY_INDEXED_FIELDS, get_search_backend
+    # A new category has no services yet
+    if created or (update_fields is not None and not CATEGORY_INDEXED_FIELDS & set(update_fields)):
+        return
+    get_search_backend().index_categories([instance.pk])
@@ -0,0 +1,200 @@
+"""
+Pricing: the compiled price table for estimates, quantity tiers and totals.
+
+``PriceMatrix`` holds the unit price of every active service and variant and
+their active quantity tiers, built from ``Service.base_price``,
+``ServiceVariant.price_modifier`` and ``PricingRule`` with three queries.
+Each worker keeps one per catalog version (see ``services.catalog``), so
+quoting a cart line is a couple of dictionary lookups.
+
+The tiers of one (service, variant) pair are held in a ``TierIndex`` and
+searched by bisection. Orders build theirs with ``load_tier_indexes`` from the
+current rules rather than the cached table, so an order is always priced from
+committed data.
+
+``cart_totals`` and ``batch_totals`` turn line totals into the subtotal, GST
+and delivery fee, in Decimal, for estimates, ``Order.calculate_totals`` and
+batch recalculation alike.
+"""
+from bisect import bisect_right
+from collections import namedtuple
+from decimal import ROUND_HALF_UP, Decimal
+
+from .catalog import VersionedStore
+from .models import PricingRule, Service, ServiceVariant
+
+
+ServicePrice = namedtuple('ServicePrice', ['name', 'unit_price'])
+VariantPrice = namedtuple('VariantPrice', ['service_id', 'name', 'unit_price'])
+Tier = namedtuple('Tier', ['min_quantity', 'max_quantity', 'price_per_unit'])
+Totals = namedtuple('Totals', ['item_count', 'subtotal', 'tax', 'delivery_fee', 'total_amount'])
+Quote = namedtuple('Quote', [
+    'service_id', 'variant_id', 'quantity', 'unit_price', 'total_price', 'service_name', 'variant_name',
+])
+
+
+# 5% GST, rounded to the paisa
+TAX_RATE = Decimal('0.05')
+# Delivery is free from this subtotal on
+FREE_DELIVERY_THRESHOLD = Decimal('500.00')
+DELIVERY_FEE = Decimal('50.00')
+
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+
+
+class PriceNotFound(LookupError):
+    """The service, or the variant for that service, is missing or inactive"""
+
+
+class TierIndex:
+    """
+    Non-overlapping quantity tiers sorted by their lower bound.
+
+    A ``max_quantity`` of None is open-ended. Overlapping rules are rejected
+    when they are saved; any that predate that check are resolved in favour
+    of the older rule.
+    """
+
+    def __init__(self, tiers):
+        kept = []
+        for tier in tiers:
+            if not any(_overlaps(tier, other) for other in kept):
+                kept.append(tier)
+        kept.sort(key=lambda tier: tier.min_quantity)
+        self.starts = [tier.min_quantity for tier in kept]
+        self.tiers = kept
+
+    def price_for(self, quantity):
+        """The per-unit price of the tier covering ``quantity``, or None"""
+        index = bisect_right(self.starts, quantity) - 1
+        if index < 0:
+            return None
+        tier = self.tiers[index]
+        if tier.max_quantity is not None and quantity > tier.max_quantity:
+            return None
+        return tier.price_per_unit
+
+
+def _overlaps(tier, other):
+    return (
+        (other.max_quantity is None or tier.min_quantity <= other.max_quantity)
+        and (tier.max_quantity is None or other.min_quantity <= tier.max_quantity)
+    )
+
+
+def build_tier_indexes(rows):
+    """
+    ``{(service_id, variant_id): TierIndex}`` from ``(service_id, variant_id,
+    min_quantity, max_quantity, price_per_unit)`` rows, oldest rule first.
+    """
+    tiers = {}
+    for service_id, variant_id, min_quantity, max_quantity, price in rows:
+        tiers.setdefault((service_id, variant_id), []).append(Tier(min_quantity, max_quantity, price))
+    return {key: TierIndex(key_tiers) for key, key_tiers in tiers.items()}
+
+
+def _rule_rows(rules):
+    return rules.filter(is_active=True).order_by('id').values_list(
+        'service_id', 'variant_id', 'min_quantity', 'max_quantity', 'price_per_unit'
+    )
+
+
+def load_tier_indexes(service_ids):
+    """The tier indexes of ``service_ids`` from the database, in one query"""
+    return build_tier_indexes(_rule_rows(PricingRule.objects.filter(service_id__in=service_ids)))
+
+
+def tier_unit_price(list_price, tiers, quantity):
+    """The tier price for ``quantity`` if a tier covers it, else ``list_price``"""
+    price = tiers.price_for(quantity) if tiers is not None else None
+    return list_price if price is None else price
+
+
+def _totals(item_count, subtotal):
+    tax = (subtotal * TAX_RATE).quantize(CENT, rounding=ROUND_HALF_UP)
+    delivery_fee = ZERO if subtotal >= FREE_DELIVERY_THRESHOLD else DELIVERY_FEE
+    return Totals(item_count, subtotal, tax, delivery_fee, subtotal + tax + delivery_fee)
+
+
+def cart_totals(line_totals):
+    """``Totals`` of one cart from the total price of each of its lines"""
+    subtotal = ZERO
+    item_count = 0
+    for line_total in line_totals:
+        subtotal += line_total
+        item_count += 1
+    return _totals(item_count, subtotal)
+
+
+def batch_totals(rows, keys=()):
+    """
+    ``{key: Totals}`` from ``(key, line_total)`` rows, in one pass.
+
+    ``keys`` without any row, e.g. orders whose items were all removed, get
+    the totals of an empty cart.
+    """
+    subtotals = dict.fromkeys(keys, ZERO)
+    counts = dict.fromkeys(keys, 0)
+    for key, line_total in rows:
+        subtotals[key] = subtotals.get(key, ZERO) + line_total
+        counts[key] = counts.get(key, 0) + 1
+    return {key: _totals(counts[key], subtotal) for key, subtotal in subtotals.items()}
+
+
+class PriceMatrix:
+    """Unit prices per (service, variant) and their quantity tiers at one catalog version"""
+
+    def __init__(self, version):
+        self.version = version
+        self.services = {
+            service_id: ServicePrice(name, base_price)
+            for service_id, name, base_price in Service.objects.filter(is_active=True)
+            .values_list('id', 'name', 'base_price')
+        }
+        self.variants = {
+            variant_id: VariantPrice(service_id, name, self.services[service_id].unit_price + modifier)
+            for variant_id, service_id, name, modifier in ServiceVariant.objects.filter(
+                is_active=True, service__is_active=True
+            ).values_list('id', 'service_id', 'name', 'price_modifier')
+        }
+        # (service_id, variant_id or None) -> TierIndex
+        self.tiers = build_tier_indexes(_rule_rows(PricingRule.objects.all()))
+
+    def has_service(self, service_id):
+        return service_id in self.services
+
+    def has_variant(self, variant_id):
+        return variant_id in self.variants
+
+    def quote(self, service_id, variant_id, quantity):
+        """
+        Price ``quantity`` of a service, optionally in a variant.
+
+        ``unit_price`` is the tier price when a tier covers the quantity, else
+        the list price, as on an order item. Raises ``PriceNotFound``.
+        """
+        service = self.services.get(service_id)
+        if service is None:
+            raise PriceNotFound(service_id)
+        list_price = service.unit_price
+        variant_name = None
+        if variant_id:
+            variant = self.variants.get(variant_id)
+            if variant is None or variant.service_id != service_id:
+                raise PriceNotFound(variant_id)
+            list_price = variant.unit_price
+            variant_name = variant.name
+
+        unit_price = tier_unit_price(list_price, self.tiers.get((service_id, variant_id or None)), quantity)
+        return Quote(
+            service_id, variant_id, quantity, unit_price, unit_price * quantity, service.name, variant_name
+        )
+
+
+_matrix_store = VersionedStore(PriceMatrix)
+
+
+def get_price_matrix():
+    """This worker's price table, rebuilt when the catalog version moves"""
+    return _matrix_store.get()
@@ -0,0 +1,132 @@
+"""
+Service search for the catalog pages and the order form's autocomplete.
+
+``SERVICE_SEARCH_BACKEND`` selects where the search runs:
+
+- ``fts5`` (default) keeps an SQLite FTS5 table with one row per active
+  service: its name, description and category name. Words are stemmed with
+  the Porter stemmer and every query word is matched as a prefix, so ``iron``
+  and ``ironed`` both find "Shirt Ironing". Results are ranked by BM25 with
+  the name weighted highest. Rows are rewritten in the transaction that saves
+  the service or its category.
+- ``database`` filters the cached catalog with the substring matching the
+  service list used to do, without ranking.
+"""
+from django.db import connection
+
+from dryclean_project.fts import FTS5Backend, backend_getter, placeholders, query_words
+from .catalog import get_catalog
+
+
+SERVICE_TABLE = 'services_service_search'
+
+# Fields whose change needs the service row to be rewritten
+SERVICE_INDEXED_FIELDS = {'name', 'description', 'category', 'is_active'}
+CATEGORY_INDEXED_FIELDS = {'name'}
+
+AUTOCOMPLETE_LIMIT = 8
+
+
+class DatabaseSearchBackend:
+    """Unranked substring search over the cached catalog"""
+
+    def index_services(self, service_ids):
+        pass
+
+    def index_categories(self, category_ids):
+        pass
+
+    def remove_services(self, service_ids):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def search(self, query, limit=None):
+        if not query_words(query):
+            return []
+        ids = [service['id'] for service in get_catalog().search_services(query)]
+        return ids if limit is None else ids[:limit]
+
+
+class FTS5SearchBackend(FTS5Backend):
+    """SQLite FTS5 table keyed by the service primary key"""
+
+    # BM25 weights per column: name, description, category
+    weights = (10.0, 1.0, 4.0)
+
+    def _write(self, where, params):
+        self._execute(
+            f"DELETE FROM {SERVICE_TABLE} WHERE rowid IN (SELECT s.id FROM services_service s WHERE {where})",
+            params,
+        )
+        self._execute(
+            f"""
+            INSERT INTO {SERVICE_TABLE} (rowid, name, description, category)
+            SELECT s.id, s.name, coalesce(s.description, ''), c.name
+            FROM services_service s JOIN services_servicecategory c ON c.id = s.category_id
+            WHERE s.is_active AND {where}
+            """,
+            params,
+        )
+
+    def index_services(self, service_ids):
+        service_ids = list(service_ids)
+        if service_ids:
+            self._write(f"s.id IN ({placeholders(service_ids)})", service_ids)
+
+    def index_categories(self, category_ids):
+        """Rewrite the rows of every service in ``category_ids``"""
+        category_ids = list(category_ids)
+        if category_ids:
+            self._write(f"s.category_id IN ({placeholders(category_ids)})", category_ids)
+
+    def remove_services(self, service_ids):
+        service_ids = list(service_ids)
+        if service_ids:
+            self._execute(f"DELETE FROM {SERVICE_TABLE} WHERE rowid IN ({placeholders(service_ids)})", service_ids)
+
+    def rebuild(self):
+        """Rewrite the table from scratch; returns the number of services indexed"""
+        self._execute(f"DELETE FROM {SERVICE_TABLE}")
+        self._write('1 = 1', [])
+        self._optimize(SERVICE_TABLE)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {SERVICE_TABLE}")
+            return cursor.fetchone()[0]
+
+    def search(self, query, limit=None):
+        """Ids of the matching active services, best match first"""
+        match = self.match_expression(query)
+        if match is None:
+            return []
+        sql = (
+            f"SELECT rowid FROM {SERVICE_TABLE} WHERE {SERVICE_TABLE} MATCH %s "
+            f"ORDER BY bm25({SERVICE_TABLE}, {', '.join(str(weight) for weight in self.weights)}), rowid"
+        )
+        params = [match]
+        if limit is not None:
+            sql += " LIMIT %s"
+            params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+get_search_backend = backend_getter(
+    'SERVICE_SEARCH_BACKEND', {'fts5': FTS5SearchBackend, 'database': DatabaseSearchBackend}
+)
+
+
+def search_services(query, limit=None):
+    """
+    Serialized active services matching ``query``, best match first.
+
+    Only the ids come from the search; the services themselves are read from
+    the worker's catalog snapshot.
+    """
+    ids = get_search_backend().search(query, limit)
+    if not ids:
+        return []
+    services = get_catalog().services_by_id
+    return [services[service_id] for service_id in ids if service_id in services]
@@ -1,3 +1,4 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 from .models import ServiceCategory, Service, ServiceVariant, PricingRule
 
@@ -56,6 +57,20 @@ class PricingRuleSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate(self, attrs):
+        # Reject tiers that overlap another active tier of the same service and variant
+        values = {
+            field: attrs[field] if field in attrs else getattr(self.instance, field)
+            for field in ('service', 'variant', 'min_quantity', 'max_quantity', 'is_active')
+            if field in attrs or self.instance is not None
+        }
+        rule = PricingRule(pk=getattr(self.instance, 'pk', None), **values)
+        try:
+            rule.clean()
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.message_dict if hasattr(e, 'error_dict') else e.messages)
+        return attrs
 
 
 class ServiceWithPricingSerializer(serializers.ModelSerializer):
@@ -77,18 +92,15 @@ class ServiceEstimateSerializer(serializers.Serializer):
     quantity = serializers.IntegerField(min_value=1)
     
     def validate_service_id(self, value):
-        try:
-            Service.objects.get(id=value, is_active=True)
-        except Service.DoesNotExist:
+        from .pricing import get_price_matrix
+        if not get_price_matrix().has_service(value):
             raise serializers.ValidationError("Service not found or inactive.")
         return value
     
     def validate_variant_id(self, value):
-        if value:
-            try:
-                ServiceVariant.objects.get(id=value, is_active=True)
-            except ServiceVariant.DoesNotExist:
-                raise serializers.ValidationError("Service variant not found or inactive.")
+        from .pricing import get_price_matrix
+        if value and not get_price_matrix().has_variant(value):
+            raise serializers.ValidationError("Service variant not found or inactive.")
         return value
 
 
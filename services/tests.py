@@ -1,3 +1,261 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from orders.models import Order, OrderItem
+
+from . import catalog
+from .catalog import CATALOG_VERSION_KEY, get_catalog, get_catalog_version
+from .models import PricingRule, Service, ServiceCategory, ServiceVariant
+from .pricing import PriceNotFound, Tier, TierIndex, Totals, batch_totals, cart_totals, get_price_matrix
+from .search import get_search_backend
+
+
+class CatalogTestCase(TestCase):
+    """Starts every test from a fresh catalog version and empty worker stores"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.delete(CATALOG_VERSION_KEY)
+        for store in catalog._stores:
+            store.clear()
+
+
+class ServiceCatalogCacheTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = ServiceCategory.objects.create(name='Laundry')
+        cls.hidden = ServiceCategory.objects.create(name='Hidden', is_active=False)
+        cls.shirt = Service.objects.create(
+            category=cls.category, name='Shirt', description='Wash and iron', base_price=Decimal('40.00')
+        )
+        cls.suit = Service.objects.create(category=cls.category, name='Suit', base_price=Decimal('250.00'))
+        ServiceVariant.objects.create(service=cls.shirt, name='Silk', price_modifier=Decimal('20.00'))
+        Service.objects.create(category=cls.category, name='Retired', base_price=Decimal('10.00'), is_active=False)
+
+    def test_cached_lists_are_served_without_queries(self):
+        self.client.get('/api/services/')
+        with self.assertNumQueries(0):
+            services = self.client.get('/api/services/').data['results']
+            categories = self.client.get('/api/services/categories-with-services/').data
+            popular = self.client.get('/api/services/popular/').data
+        self.assertEqual([service['name'] for service in services], ['Shirt', 'Suit'])
+        self.assertEqual(services[0]['variants'][0]['final_price'], 60.0)
+        self.assertEqual([category['name'] for category in categories], ['Laundry'])
+        self.assertEqual([service['name'] for service in popular], ['Suit', 'Shirt'])
+
+    def test_search_and_category_filters(self):
+        response = self.client.get('/api/services/', {'search': 'iron'})
+        self.assertEqual([service['name'] for service in response.data['results']], ['Shirt'])
+        response = self.client.get('/api/services/', {'search': 'laundry', 'category': self.hidden.id})
+        self.assertEqual(response.data['results'], [])
+
+    def test_saving_a_service_bumps_the_version(self):
+        version = get_catalog().version
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shirt.name = 'Formal Shirt'
+            self.shirt.save()
+            PricingRule.objects.create(service=self.suit, min_quantity=5, price_per_unit=Decimal('200.00'))
+        self.assertGreater(get_catalog_version(), version)
+        names = [service['name'] for service in self.client.get('/api/services/').data['results']]
+        self.assertEqual(names, ['Formal Shirt', 'Suit'])
+
+    @override_settings(SERVICE_CATALOG_CHECK_INTERVAL=0)
+    def test_workers_pick_up_a_version_bumped_elsewhere(self):
+        snapshot = get_catalog()
+        self.assertIs(get_catalog(), snapshot)
+        # Another worker saved a row: only the shared version moves here
+        cache.incr(CATALOG_VERSION_KEY)
+        self.assertIsNot(get_catalog(), snapshot)
+
+
+class PriceMatrixTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = ServiceCategory.objects.create(name='Laundry')
+        cls.shirt = Service.objects.create(category=category, name='Shirt', base_price=Decimal('40.00'))
+        cls.silk = ServiceVariant.objects.create(service=cls.shirt, name='Silk', price_modifier=Decimal('20.00'))
+        cls.suit = Service.objects.create(category=category, name='Suit', base_price=Decimal('250.00'))
+        PricingRule.objects.create(
+            service=cls.shirt, min_quantity=10, max_quantity=49, price_per_unit=Decimal('35.00')
+        )
+        PricingRule.objects.create(
+            service=cls.shirt, variant=cls.silk, min_quantity=5, max_quantity=20, price_per_unit=Decimal('55.00')
+        )
+
+    def test_quotes_use_variant_and_tier_prices(self):
+        matrix = get_price_matrix()
+        self.assertEqual(matrix.quote(self.shirt.id, None, 2).total_price, Decimal('80.00'))
+        quote = matrix.quote(self.shirt.id, None, 10)
+        self.assertEqual((quote.unit_price, quote.total_price), (Decimal('35.00'), Decimal('350.00')))
+        quote = matrix.quote(self.shirt.id, self.silk.id, 5)
+        self.assertEqual((quote.unit_price, quote.total_price), (Decimal('55.00'), Decimal('275.00')))
+        with self.assertRaises(PriceNotFound):
+            matrix.quote(self.suit.id, self.silk.id, 1)
+
+    def test_bulk_estimate_needs_no_queries(self):
+        items = [
+            {'service_id': self.shirt.id, 'variant_id': self.silk.id, 'quantity': 1 + index % 7}
+            if index % 2 else {'service_id': self.suit.id, 'quantity': 1}
+            for index in range(200)
+        ]
+        get_price_matrix()
+        with self.assertNumQueries(0):
+            response = self.client.post('/api/services/estimate/bulk/', {'items': items}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['items']), 200)
+        self.assertEqual(response.data['subtotal'], sum(item['total_price'] for item in response.data['items']))
+
+    def test_unknown_variant_for_service(self):
+        response = self.client.post('/api/services/estimate/', {
+            'service_id': self.suit.id, 'variant_id': self.silk.id, 'quantity': 1,
+        }, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_rule_changes_rebuild_the_matrix(self):
+        self.assertEqual(get_price_matrix().quote(self.suit.id, None, 3).total_price, Decimal('750.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            PricingRule.objects.create(
+                service=self.suit, min_quantity=2, max_quantity=5, price_per_unit=Decimal('200.00')
+            )
+        self.assertEqual(get_price_matrix().quote(self.suit.id, None, 3).total_price, Decimal('600.00'))
+
+
+class PricingTierTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        category = ServiceCategory.objects.create(name='Laundry')
+        cls.shirt = Service.objects.create(category=category, name='Shirt', base_price=Decimal('40.00'))
+        PricingRule.objects.create(
+            service=cls.shirt, min_quantity=5, max_quantity=9, price_per_unit=Decimal('35.00')
+        )
+        PricingRule.objects.create(service=cls.shirt, min_quantity=10, price_per_unit=Decimal('30.00'))
+
+    def test_index_lookup_with_open_ended_tier(self):
+        index = TierIndex([
+            Tier(10, None, Decimal('30.00')),
+            Tier(5, 9, Decimal('35.00')),
+            Tier(8, 12, Decimal('1.00')),
+        ])
+        self.assertEqual(
+            [index.price_for(quantity) for quantity in (1, 5, 9, 10, 1000)],
+            [None, Decimal('35.00'), Decimal('35.00'), Decimal('30.00'), Decimal('30.00')],
+        )
+
+    def test_order_items_are_priced_from_tiers(self):
+        customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        order = Order.objects.create(
+            customer=customer, pickup_address='1 Main Street',
+            pickup_date=date(2026, 1, 5), pickup_time_slot='9:00 AM - 12:00 PM',
+        )
+        item = OrderItem.objects.create(order=order, service=self.shirt, quantity=12)
+        self.assertEqual((item.unit_price, item.total_price), (Decimal('30.00'), Decimal('360.00')))
+        self.assertEqual(get_price_matrix().quote(self.shirt.id, None, 12).total_price, item.total_price)
+
+    def test_overlapping_tiers_are_rejected(self):
+        with self.assertRaises(ValidationError):
+            PricingRule(service=self.shirt, min_quantity=20, max_quantity=30, price_per_unit=Decimal('1.00')).clean()
+        PricingRule(
+            service=self.shirt, min_quantity=20, price_per_unit=Decimal('1.00'), is_active=False
+        ).clean()
+
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        response = client.post(f'/api/services/admin/{self.shirt.id}/pricing/', {
+            'service': self.shirt.id, 'min_quantity': 1, 'max_quantity': 5, 'price_per_unit': '38.00',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = client.post(f'/api/services/admin/{self.shirt.id}/pricing/', {
+            'service': self.shirt.id, 'min_quantity': 1, 'max_quantity': 4, 'price_per_unit': '38.00',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+class OrderTotalsTests(TestCase):
+    def test_cart_totals_stay_in_decimal(self):
+        totals = cart_totals([Decimal('40.10'), Decimal('33.35')])
+        self.assertEqual(totals, Totals(2, Decimal('73.45'), Decimal('3.67'), Decimal('50.00'), Decimal('127.12')))
+        self.assertEqual(cart_totals([Decimal('500.00')]).delivery_fee, Decimal('0.00'))
+        self.assertEqual(cart_totals([]).total_amount, Decimal('50.00'))
+
+    def test_batch_totals_in_one_pass(self):
+        rows = [(1, Decimal('300.00')), (2, Decimal('10.00')), (1, Decimal('250.00'))]
+        totals = batch_totals(rows, keys=[1, 2, 3])
+        self.assertEqual(totals[1], cart_totals([Decimal('300.00'), Decimal('250.00')]))
+        self.assertEqual(totals[2].total_amount, Decimal('60.50'))
+        self.assertEqual(totals[3], cart_totals([]))
+
+
+class ServiceDetailConditionalTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = ServiceCategory.objects.create(name='Laundry')
+        cls.service = Service.objects.create(category=category, name='Shirt', base_price=Decimal('40.00'))
+        cls.variant = ServiceVariant.objects.create(service=cls.service, name='Silk', price_modifier=Decimal('10.00'))
+
+    def detail(self, **headers):
+        return self.client.get(f'/api/services/{self.service.id}/', headers=headers)
+
+    def test_matching_if_none_match_is_not_modified(self):
+        etag = self.detail()['ETag']
+        self.assertEqual(self.detail(if_none_match=etag).status_code, 304)
+
+    def test_editing_a_variant_changes_the_etag(self):
+        etag = self.detail()['ETag']
+        self.variant.price_modifier = Decimal('15.00')
+        self.variant.save()
+        response = self.detail(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ServiceSearchTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.pressing = ServiceCategory.objects.create(name='Pressing')
+        cls.ironing = Service.objects.create(
+            category=cls.pressing, name='Shirt Ironing', description='Crisp collars', base_price=Decimal('20.00')
+        )
+        cls.suit = Service.objects.create(
+            category=cls.pressing, name='Suit Steaming', description='Ironed by hand', base_price=Decimal('90.00')
+        )
+        cls.curtains = Service.objects.create(
+            category=ServiceCategory.objects.create(name='Home'), name='Curtains',
+            description='Washed panels', base_price=Decimal('150.00'),
+        )
+
+    def names(self, url, query):
+        response = self.client.get(url, query)
+        self.assertEqual(response.status_code, 200)
+        data = response.data['results'] if 'results' in response.data else response.data
+        return [service['name'] for service in data]
+
+    def test_prefix_stemming_and_ranking(self):
+        self.assertEqual(self.names('/api/services/search/', {'q': 'iron'}), ['Shirt Ironing', 'Suit Steaming'])
+        self.assertEqual(self.names('/api/services/search/', {'q': 'wash'}), ['Curtains'])
+        self.assertEqual(self.names('/api/services/', {'search': 'press'}), ['Shirt Ironing', 'Suit Steaming'])
+
+    def test_autocomplete_is_compact(self):
+        response = self.client.get('/api/services/autocomplete/', {'q': 'cur'})
+        self.assertEqual(response.data, [{
+            'id': self.curtains.id, 'name': 'Curtains', 'category': self.curtains.category_id,
+            'category_name': 'Home', 'base_price': '150.00',
+        }])
+
+    def test_index_follows_service_and_category_saves(self):
+        self.curtains.name = 'Drapes'
+        self.curtains.save()
+        self.pressing.name = 'Garment Care'
+        self.pressing.save()
+        self.suit.is_active = False
+        self.suit.save()
+        self.assertEqual(get_search_backend().search('drape'), [self.curtains.id])
+        self.assertEqual(get_search_backend().search('garment'), [self.ironing.id])
+        self.curtains.delete()
+        self.assertEqual(get_search_backend().search('drape'), [])
@@ -21,6 +21,7 @@ urlpatterns = [
     
     # Search and popular services
     path('search/', views.service_search, name='service_search'),
+    path('autocomplete/', views.service_autocomplete, name='service_autocomplete'),
     path('popular/', views.popular_services, name='popular_services'),
     path('categories-with-services/', views.service_categories_with_services, name='categories_with_services'),
     
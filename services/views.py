@@ -1,7 +1,10 @@
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Q
+from dryclean_project.conditional import ConditionalRetrieveMixin
+from .catalog import get_catalog
+from .pricing import PriceNotFound, cart_totals, get_price_matrix
+from .search import AUTOCOMPLETE_LIMIT, get_search_backend, search_services
 from .models import ServiceCategory, Service, ServiceVariant, PricingRule
 from .serializers import (
     ServiceCategorySerializer, ServiceSerializer, ServiceVariantSerializer,
@@ -31,6 +34,14 @@ class ServiceCategoryListView(generics.ListAPIView):
     queryset = ServiceCategory.objects.filter(is_active=True)
     serializer_class = ServiceCategorySerializer
     permission_classes = [permissions.AllowAny]
+    
+    def list(self, request, *args, **kwargs):
+        # Serialized categories come from the worker's catalog snapshot
+        categories = get_catalog().categories
+        page = self.paginate_queryset(categories)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(categories)
 
 
 class ServiceCategoryDetailView(generics.RetrieveAPIView):
@@ -44,37 +55,39 @@ class ServiceListView(generics.ListAPIView):
     permission_classes = [permissions.AllowAny]
     
     def get_queryset(self):
+        return Service.objects.filter(is_active=True)
+    
+    def list(self, request, *args, **kwargs):
         try:
-            queryset = Service.objects.filter(is_active=True)
+            catalog = get_catalog()
             category_id = self.request.query_params.get('category', None)
             search = self.request.query_params.get('search', None)
             
+            services = catalog.services
             if category_id:
-                queryset = queryset.filter(category_id=category_id)
-            
+                services = catalog.services_in_category(category_id)
             if search:
-                queryset = queryset.filter(
-                    Q(name__icontains=search) | 
-                    Q(description__icontains=search) |
-                    Q(category__name__icontains=search)
+                # Best match first
+                rank = {service_id: index for index, service_id in enumerate(get_search_backend().search(search))}
+                services = sorted(
+                    (service for service in services if service['id'] in rank),
+                    key=lambda service: rank[service['id']],
                 )
             
-            return queryset
-        except Exception as e:
-            # Return empty queryset if there's an error
-            return Service.objects.none()
-    
-    def list(self, request, *args, **kwargs):
-        try:
-            return super().list(request, *args, **kwargs)
+            page = self.paginate_queryset(services)
+            if page is not None:
+                return self.get_paginated_response(page)
+            return Response(services)
         except Exception as e:
             return Response({'error': f'Failed to load services: {str(e)}'}, status=500)
 
 
-class ServiceDetailView(generics.RetrieveAPIView):
+class ServiceDetailView(ConditionalRetrieveMixin, generics.RetrieveAPIView):
     queryset = Service.objects.filter(is_active=True)
     serializer_class = ServiceWithPricingSerializer
     permission_classes = [permissions.AllowAny]
+    version_timestamps = ['updated_at', 'variants__updated_at', 'pricing_rules__updated_at']
+    version_counts = ['variants', 'pricing_rules']
 
 
 class ServiceVariantListView(generics.ListAPIView):
@@ -114,45 +127,13 @@ def estimate_service(request):
         quantity = serializer.validated_data['quantity']
         
         try:
-            service = Service.objects.get(id=service_id, is_active=True)
-            unit_price = service.base_price
-            
-            if variant_id:
-                variant = ServiceVariant.objects.get(
-                    id=variant_id,
-                    service=service,
-                    is_active=True
-                )
-                unit_price = variant.final_price
-            
-            total_price = unit_price * quantity
-            
-            # Check for bulk pricing rules
-            pricing_rule = PricingRule.objects.filter(
-                service=service,
-                variant_id=variant_id,
-                min_quantity__lte=quantity,
-                max_quantity__gte=quantity,
-                is_active=True
-            ).first()
-            
-            if pricing_rule:
-                total_price = pricing_rule.price_per_unit * quantity
-            
-            return Response({
-                'service_id': service_id,
-                'variant_id': variant_id,
-                'quantity': quantity,
-                'unit_price': unit_price,
-                'total_price': total_price,
-                'service_name': service.name,
-                'variant_name': variant.name if variant_id else None,
-            })
-            
-        except (Service.DoesNotExist, ServiceVariant.DoesNotExist):
+            quote = get_price_matrix().quote(service_id, variant_id, quantity)
+        except PriceNotFound:
             return Response({
                 'error': 'Service or variant not found.'
             }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response(quote._asdict())
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -164,63 +145,28 @@ def estimate_bulk_services(request):
     serializer = BulkEstimateSerializer(data=request.data)
     if serializer.is_valid():
         items = serializer.validated_data['items']
+        # One table for the whole cart, even if the catalog changes meanwhile
+        matrix = get_price_matrix()
         estimates = []
-        total_amount = 0
         
         for item in items:
-            service_id = item['service_id']
-            variant_id = item.get('variant_id')
-            quantity = item['quantity']
-            
             try:
-                service = Service.objects.get(id=service_id, is_active=True)
-                unit_price = service.base_price
-                
-                if variant_id:
-                    variant = ServiceVariant.objects.get(
-                        id=variant_id,
-                        service=service,
-                        is_active=True
-                    )
-                    unit_price = variant.final_price
-                
-                item_total = unit_price * quantity
-                
-                # Check for bulk pricing rules
-                pricing_rule = PricingRule.objects.filter(
-                    service=service,
-                    variant_id=variant_id,
-                    min_quantity__lte=quantity,
-                    max_quantity__gte=quantity,
-                    is_active=True
-                ).first()
-                
-                if pricing_rule:
-                    item_total = pricing_rule.price_per_unit * quantity
-                
-                estimates.append({
-                    'service_id': service_id,
-                    'variant_id': variant_id,
-                    'quantity': quantity,
-                    'unit_price': unit_price,
-                    'total_price': item_total,
-                    'service_name': service.name,
-                    'variant_name': variant.name if variant_id else None,
-                })
-                
-                total_amount += item_total
-                
-            except (Service.DoesNotExist, ServiceVariant.DoesNotExist):
+                quote = matrix.quote(item['service_id'], item.get('variant_id'), item['quantity'])
+            except PriceNotFound:
                 return Response({
                     'error': f'Service or variant not found for item: {item}'
                 }, status=status.HTTP_404_NOT_FOUND)
+            
+            estimates.append(quote._asdict())
         
+        # Same subtotal, GST and delivery fee as the order would get
+        totals = cart_totals(estimate['total_price'] for estimate in estimates)
         return Response({
             'items': estimates,
-            'subtotal': total_amount,
-            'tax': total_amount * 0.05,  # 5% GST
-            'delivery_fee': 0 if total_amount >= 500 else 50,
-            'total_amount': total_amount * 1.05 + (0 if total_amount >= 500 else 50)
+            'subtotal': totals.subtotal,
+            'tax': totals.tax,
+            'delivery_fee': totals.delivery_fee,
+            'total_amount': totals.total_amount
         })
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -236,33 +182,40 @@ def service_search(request):
             'error': 'Search query is required.'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    services = Service.objects.filter(
-        Q(name__icontains=query) | 
-        Q(description__icontains=query) |
-        Q(category__name__icontains=query),
-        is_active=True
-    )[:10]
-    
-    serializer = ServiceSerializer(services, many=True)
-    return Response(serializer.data)
+    return Response(search_services(query, limit=10))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def service_autocomplete(request):
+    """Compact best matches for the order form's service search box"""
+    query = request.query_params.get('q', '')
+    catalog = get_catalog()
+    suggestions = [
+        {
+            'id': service['id'],
+            'name': service['name'],
+            'category': service['category'],
+            'category_name': catalog.category_names.get(service['category']),
+            'base_price': service['base_price'],
+        }
+        for service in search_services(query, limit=AUTOCOMPLETE_LIMIT)
+    ]
+    return Response(suggestions)
 
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def popular_services(request):
     """Get popular services (can be based on order count in the future)"""
-    services = Service.objects.filter(is_active=True).order_by('-created_at')[:6]
-    serializer = ServiceSerializer(services, many=True)
-    return Response(serializer.data)
+    return Response(get_catalog().popular)
 
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def service_categories_with_services(request):
     """Get all categories with their services"""
-    categories = ServiceCategory.objects.filter(is_active=True)
-    serializer = ServiceCategorySerializer(categories, many=True)
-    return Response(serializer.data)
+    return Response(get_catalog().categories)
 
 
 # Admin views for managing services